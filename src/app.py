@@ -3,15 +3,26 @@ from btcbot import utils
 from bot import Bot
 import sys
 import signal
+import threading
 
 config = utils.load_config('app.yml')
 ConfigData().init(config)
 utils.make_logger(config)
 
 _bot = Bot()
+if len(sys.argv) > 1 and sys.argv[1] == 'replay':
+    from btcbot import replay
+    replay.main(_bot, sys.argv[2:])
+    sys.exit(0)
+
 def signal_handler(signal, frame):
     _bot.stop()
     sys.exit(0)
 
+def profile_handler(signal, frame):
+    # off the main thread, stopping joins the sampler
+    threading.Thread(target=_bot.profiler.toggle, name='profile_handler').start()
+
 signal.signal(signal.SIGINT, signal_handler)
+signal.signal(signal.SIGUSR2, profile_handler)
 _bot.start()
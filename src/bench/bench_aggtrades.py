@@ -0,0 +1,109 @@
+"""Client.aggregate_trade_iter against AggTradeIngestor.
+
+Runs mockex.binance with every REST answer delayed by a fixed latency and
+DAYS days of aggregate trades, and reads the whole tape: into a list of
+dicts through aggregate_trade_iter, then into a store page by page,
+without and with the next request sent before a page is written. Then
+times a catch-up of a tape already stored, and the volume weighted price
+of the last day computed from the list and from the memory-mapped tape.
+Reports wall time, requests and the peak of Python memory allocated
+(tracemalloc, which slows the allocations it traces, compare times
+within a column), and checks the stored ids against the list.
+
+    cd src && python -m bench.bench_aggtrades
+"""
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from bench.bench_mock_binance import start_mock
+from binance.client import Client
+from btcbot.history import AggTradeIngestor, agg_trade_arrays
+
+LATENCY = 0.05
+DAYS = 7
+TRADES_PER_MINUTE = 20
+
+
+def measure(func):
+    tracemalloc.start()
+    begin = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - begin
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def catch_up_in_turn(ingestor, symbol):
+    # catch_up without sending the next request early
+    store = ingestor.store(symbol)
+    from_id = 0
+    while True:
+        trades = ingestor._get_agg_trades(symbol, fromId=from_id, limit=ingestor.limit)
+        if trades:
+            store.extend(**agg_trade_arrays(trades))
+            store.flush()
+            from_id = trades[-1][Client.AGG_ID] + 1
+        if len(trades) < ingestor.limit:
+            return store
+
+
+def main():
+    process, api_url, _ = start_mock(0, '--latency', str(LATENCY), '--listed-days', str(DAYS),
+                                     '--trades-per-minute', str(TRADES_PER_MINUTE))
+    directory = tempfile.mkdtemp(prefix='btcbot-aggtrades-')
+    results = []
+    try:
+        client = Client('key', 'secret', api_url=api_url)
+        trades, elapsed, peak = measure(lambda: list(client.aggregate_trade_iter('EOSBTC')))
+        results.append(('aggregate_trade_iter', elapsed, len(trades) // 500 + 1, len(trades), peak))
+
+        ingestor = AggTradeIngestor(client, '%s/in_turn' % directory)
+        store, elapsed, peak = measure(lambda: catch_up_in_turn(ingestor, 'EOSBTC'))
+        results.append(('store, in turn', elapsed, ingestor.request_count, len(store), peak))
+
+        ingestor = AggTradeIngestor(client, '%s/pipelined' % directory)
+        store, elapsed, peak = measure(lambda: ingestor.catch_up('EOSBTC'))
+        results.append(('store, pipelined', elapsed, ingestor.request_count, len(store), peak))
+        stored = store.column('id')
+        same = np.array_equal(stored[:len(trades)], [trade[Client.AGG_ID] for trade in trades])
+
+        time.sleep(60 / TRADES_PER_MINUTE)
+        ingestor.request_count = 0
+        store, elapsed, peak = measure(lambda: ingestor.catch_up('EOSBTC'))
+        results.append(('catch-up, stored', elapsed, ingestor.request_count, len(store), peak))
+
+        day_ago = trades[-1][Client.AGG_TIME] - 86400 * 1000
+
+        def list_vwap():
+            last_day = [trade for trade in trades if trade[Client.AGG_TIME] >= day_ago]
+            volume = sum(float(trade[Client.AGG_QUANTITY]) for trade in last_day)
+            return sum(float(trade[Client.AGG_PRICE]) * float(trade[Client.AGG_QUANTITY]) for trade in last_day) / volume
+
+        def tape_vwap():
+            last_day = ingestor.tape('EOSBTC').slice(day_ago, trades[-1][Client.AGG_TIME] + 1, by='time')
+            return np.dot(last_day['price'], last_day['qty']) / last_day['qty'].sum()
+
+        vwaps = []
+        for name, func in (('vwap, list', list_vwap), ('vwap, tape', tape_vwap)):
+            vwap, elapsed, peak = measure(func)
+            vwaps.append(vwap)
+            results.append((name, elapsed, 0, 0, peak))
+    finally:
+        process.terminate()
+        process.wait()
+        shutil.rmtree(directory)
+
+    print('%d days of aggregate trades, %d ms per request, stored ids match the list: %s, vwaps %.10f %.10f' % (
+        DAYS, LATENCY * 1000, same, vwaps[0], vwaps[1]))
+    print('%22s %10s %10s %10s %12s' % ('', 'seconds', 'requests', 'trades', 'peak KiB'))
+    for name, elapsed, requests, count, peak in results:
+        print('%22s %10.3f %10d %10d %12d' % (name, elapsed, requests, count, peak // 1024))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""binance Client against AsyncClient, sequential and concurrent REST calls.
+
+Runs mockex.binance with every REST answer delayed by a fixed latency and
+times, with the threaded Client and with AsyncClient on an EventLoopThread:
+one call after another on a warm connection, the two calls of
+Binance._load_init_data (one after the other, gathered), and the two
+order legs of a trade (a thread per leg like OrderExecutor, gathered on
+the loop).
+
+    cd src && python -m bench.bench_async_client
+"""
+import asyncio
+import time
+from threading import Thread
+
+from bench.bench_mock_binance import start_mock
+from binance.client import Client
+from binance.async_client import AsyncClient
+from btcbot.aio import EventLoopThread
+from btcbot.stats import Histogram
+
+LATENCIES = (0, 0.005, 0.02)
+ROUNDS = 50
+PRICE = 0.0009
+QUANTITY = 1
+
+
+def order(client, side):
+    return client.create_order(symbol='EOSBTC', side=side, type='LIMIT', timeInForce='FOK', price=PRICE, quantity=QUANTITY)
+
+
+async def gather(*coros):
+    return await asyncio.gather(*coros)
+
+
+def timed(histogram, func):
+    begin = time.perf_counter()
+    func()
+    histogram.record(time.perf_counter() - begin)
+
+
+def threaded_legs(client):
+    threads = [Thread(target=order, args=(client, side)) for side in ('BUY', 'SELL')]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def run(latency):
+    process, api_url, _ = start_mock(0, '--latency', str(latency))
+    loop = EventLoopThread(name='bench')
+    loop.start()
+    try:
+        client = Client('key', 'secret', api_url=api_url)
+        async_client = loop.call(AsyncClient.create('key', 'secret', api_url=api_url))
+        results = {}
+        for name in ('call', 'init data', 'order legs'):
+            results[name] = (Histogram(), Histogram())
+        for _ in range(ROUNDS):
+            sync, concurrent = results['call']
+            timed(sync, client.get_account)
+            timed(concurrent, lambda: loop.call(async_client.get_account()))
+
+            sync, concurrent = results['init data']
+            timed(sync, lambda: (client.get_open_orders(), client.get_account()))
+            timed(concurrent, lambda: loop.call(gather(async_client.get_open_orders(), async_client.get_account())))
+
+            sync, concurrent = results['order legs']
+            timed(sync, lambda: threaded_legs(client))
+            timed(concurrent, lambda: loop.call(gather(order(async_client, 'BUY'), order(async_client, 'SELL'))))
+        loop.call(async_client.close())
+        return results
+    finally:
+        loop.stop()
+        process.terminate()
+        process.wait()
+
+
+def main():
+    print('%d rounds per latency, p50 and p99 in us' % ROUNDS)
+    print('%8s %12s %12s %12s %12s %12s' % ('latency', '', 'Client p50', 'p99', 'Async p50', 'p99'))
+    for latency in LATENCIES:
+        for name, (sync, concurrent) in run(latency).items():
+            print('%8s %12s %12d %12d %12d %12d' % ('%d ms' % (latency * 1000), name, sync.percentile(50), sync.percentile(99),
+                                                     concurrent.percentile(50), concurrent.percentile(99)))
+
+
+if __name__ == '__main__':
+    main()
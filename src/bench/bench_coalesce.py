@@ -0,0 +1,89 @@
+"""Arbitrage scans per Bitfinex book burst, one per level against one per drain.
+
+Feeds the Bitfinex book handlers a 50 level snapshot and then bursts of
+book levels the way a queue drain hands them over, with a scan of both
+directions against a fixed Binance book hooked to the notification.
+Per level is the old path (one item, one notification), per drain the
+batched one. Reports the scans run and the time from a burst being
+dequeued to the last scan done, the decision that counts.
+
+    cd src && python -m bench.bench_coalesce
+"""
+import random
+import time
+
+from btcbot import scanner
+from btcbot.config import ConfigData
+from btcbot.exchange import OrderBook
+from btcbot.stats import Histogram
+
+BURSTS = 2000
+BURST_SIZES = (1, 5, 25)
+FEE = 0.002
+
+
+def make_bitfinex():
+    ConfigData().init({
+        'target_token': 'EOS', 'curency_token': 'BTC',
+        'exchange_list': {'bitfinex': {'api_key': 'key', 'api_secret': 'secret', 'fee': FEE}},
+    })
+    from btcbot.bitfinex import Bitfinex
+    return Bitfinex()
+
+
+def make_other_books(rnd):
+    asks, bids = OrderBook(True), OrderBook(False)
+    for level in range(1, 101):
+        asks.add_or_update(0.00085 + level * 1e-7, rnd.uniform(1, 900))
+        bids.add_or_update(0.00085 - level * 1e-7, rnd.uniform(1, 900))
+    return asks, bids
+
+
+def level(rnd, side):
+    price = round(0.00085 + side * rnd.randint(1, 25) * 1e-7, 7)
+    if rnd.random() < 0.3:
+        return [price, 0, -side], 0.0
+    return [price, rnd.randint(1, 5), -side * round(rnd.uniform(1, 900), 4)], 0.0
+
+
+def run(burst_size, coalesce):
+    rnd = random.Random(5)
+    bitfinex = make_bitfinex()
+    other_asks, other_bids = make_other_books(rnd)
+    scans = [0]
+
+    def scan(exchange):
+        scans[0] += 1
+        for asks_book, bids_book in ((other_asks, exchange.bids_book), (exchange.asks_book, other_bids)):
+            if asks_book.best() is None or bids_book.best() is None:
+                continue
+            asks, bids = scanner.crossing_levels(asks_book, bids_book, 1 + FEE, 1 - FEE)
+            scanner.find_trade(asks, bids, 1 + FEE, 1 - FEE, 10, 10000)
+
+    bitfinex.on_order_book_update = scan
+    snapshot = [level(rnd, side) for side in (1, -1) for _ in range(25)]
+    bursts = [[level(rnd, rnd.choice((1, -1))) for _ in range(burst_size)] for _ in range(BURSTS)]
+
+    decision = Histogram()
+    for items in [snapshot] + bursts:
+        begin = time.perf_counter()
+        if coalesce:
+            bitfinex._process_order_book_batch(items)
+        else:
+            for item in items:
+                bitfinex._process_order_book_batch([item])
+        decision.record(time.perf_counter() - begin)
+    return scans[0], decision
+
+
+def main():
+    print('%6s %10s %10s %12s %12s' % ('burst', 'mode', 'scans', 'p50 us', 'p99 us'))
+    for burst_size in BURST_SIZES:
+        for coalesce in (False, True):
+            scans, decision = run(burst_size, coalesce)
+            print('%6d %10s %10d %12d %12d' % (burst_size, 'drain' if coalesce else 'level', scans,
+                                             decision.percentile(50), decision.percentile(99)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Size and speed of book history in a ColumnStore against JSON lines.
+
+Stores a day of 1 s snapshots of 25 levels per side, then reads one hour
+back: the ColumnStore as a memory-mapped slice, the JSON lines by parsing
+the file up to the end of the hour.
+
+    cd src && python -m bench.bench_columnar
+"""
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from btcbot.columnar import ColumnStore, book_columns
+
+DEPTH = 25
+SNAPSHOTS = 86400
+
+
+def snapshots(rnd):
+    ts = 1523546183.0
+    for i in range(SNAPSHOTS):
+        mid = 0.00084 + rnd.randint(-100, 100) * 1e-8
+        bids = [(mid - (level + 1) * 1e-8, rnd.uniform(1, 900)) for level in range(DEPTH)]
+        asks = [(mid + (level + 1) * 1e-8, rnd.uniform(1, 900)) for level in range(DEPTH)]
+        yield ts + i, bids, asks
+
+
+def main():
+    rnd = random.Random(11)
+    data = list(snapshots(rnd))
+    directory = tempfile.mkdtemp(prefix='btcbot-col-')
+    try:
+        store = ColumnStore(os.path.join(directory, 'store'), book_columns(DEPTH))
+        begin = time.perf_counter()
+        for ts, bids, asks in data:
+            bids, asks = np.array(bids).T, np.array(asks).T
+            store.append(ts=ts, bid_price=bids[0], bid_size=bids[1], ask_price=asks[0], ask_size=asks[1])
+        store.close()
+        column_write = (time.perf_counter() - begin) / len(data)
+        column_size = sum(os.path.getsize(os.path.join(directory, 'store', name)) for name in os.listdir(os.path.join(directory, 'store')))
+
+        json_path = os.path.join(directory, 'books.jsonl')
+        begin = time.perf_counter()
+        with open(json_path, 'w') as f:
+            for ts, bids, asks in data:
+                f.write(json.dumps({'ts': ts, 'bids': bids, 'asks': asks}) + '\n')
+        json_write = (time.perf_counter() - begin) / len(data)
+        json_size = os.path.getsize(json_path)
+
+        start, end = data[0][0] + 12 * 3600, data[0][0] + 13 * 3600
+        begin = time.perf_counter()
+        reader = ColumnStore(os.path.join(directory, 'store'), readonly=True)
+        hour = reader.slice(start, end)
+        mean_spread = float(np.mean(hour['ask_price'][:, 0] - hour['bid_price'][:, 0]))
+        column_read = time.perf_counter() - begin
+
+        begin = time.perf_counter()
+        spreads = []
+        with open(json_path) as f:
+            for line in f:
+                row = json.loads(line)
+                if row['ts'] >= end:
+                    break
+                if row['ts'] >= start:
+                    spreads.append(row['asks'][0][0] - row['bids'][0][0])
+        json_read = time.perf_counter() - begin
+        assert abs(mean_spread - sum(spreads) / len(spreads)) < 1e-12
+    finally:
+        shutil.rmtree(directory)
+
+    print('%d snapshots, %d levels per side, one hour read back' % (SNAPSHOTS, DEPTH))
+    print('%12s %14s %16s %16s' % ('format', 'MB', 'write us/snap', 'read hour ms'))
+    print('%12s %14.1f %16.2f %16.2f' % ('columns', column_size / 1e6, column_write * 1e6, column_read * 1e3))
+    print('%12s %14.1f %16.2f %16.2f' % ('json lines', json_size / 1e6, json_write * 1e6, json_read * 1e3))
+
+
+if __name__ == '__main__':
+    main()
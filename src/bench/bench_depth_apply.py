@@ -0,0 +1,87 @@
+"""Time to apply one Binance depthUpdate to the order books.
+
+Runs a stream of decoded depthUpdate payloads, and a 1000 level REST depth
+snapshot applied to empty books, through the old per-level
+path (tuple unpacking, two float() calls, remove/add_or_update) and through
+LevelParser + OrderBook.apply_levels. Both run alternately and the best of
+``ROUNDS`` runs is kept, the box this runs on is noisy.
+
+    cd src && python -m bench.bench_depth_apply
+"""
+import random
+import time
+
+from btcbot.binance import LevelParser
+from btcbot.exchange import OrderBook
+from bench.bench_json import binance_depth_update
+
+ROUNDS = 10
+
+
+def apply_per_level(book, levels):
+    for item in levels:
+        price, amount, _ = item
+        price = float(price)
+        amount = float(amount)
+        if amount == 0:
+            book.remove(price)
+        else:
+            book.add_or_update(price, amount)
+
+
+def run_per_level(stream):
+    bids_book, asks_book = OrderBook(False), OrderBook(True)
+    begin = time.perf_counter()
+    for payload in stream:
+        apply_per_level(bids_book, payload['b'])
+        apply_per_level(asks_book, payload['a'])
+    return (time.perf_counter() - begin) / len(stream), bids_book.to_list(), asks_book.to_list()
+
+
+def run_batched(stream):
+    bids_book, asks_book = OrderBook(False), OrderBook(True)
+    parser = LevelParser()
+    begin = time.perf_counter()
+    for payload in stream:
+        bids_book.apply_levels(*parser.parse(payload['b']))
+        asks_book.apply_levels(*parser.parse(payload['a']))
+    return (time.perf_counter() - begin) / len(stream), bids_book.to_list(), asks_book.to_list()
+
+
+def depth_snapshot(rnd, count=1000):
+    def levels(base, step):
+        side = [['%.8f' % (base + i * step), '%.8f' % rnd.uniform(1, 900), []] for i in range(count)]
+        rnd.shuffle(side)
+        return side
+    return {'lastUpdateId': 160, 'bids': levels(0.00084, -1e-8), 'asks': levels(0.00085, 1e-8)}
+
+
+def main():
+    rnd = random.Random(5)
+    stream = [binance_depth_update(rnd, i * 4) for i in range(20000)]
+    levels = sum(len(payload['a']) + len(payload['b']) for payload in stream) / len(stream)
+
+    snapshot = depth_snapshot(rnd)
+    snapshot_stream = [{'b': snapshot['bids'], 'a': snapshot['asks']}]
+
+    per_level = batched = float('inf')
+    snapshot_per_level = snapshot_batched = float('inf')
+    for _ in range(ROUNDS):
+        elapsed, bids, asks = run_per_level(stream)
+        per_level = min(per_level, elapsed)
+        elapsed, bids_batched, asks_batched = run_batched(stream)
+        batched = min(batched, elapsed)
+        assert bids == bids_batched and asks == asks_batched
+        snapshot_per_level = min(snapshot_per_level, run_per_level(snapshot_stream)[0])
+        snapshot_batched = min(snapshot_batched, run_batched(snapshot_stream)[0])
+
+    print('depthUpdates: %d, levels per update: %.1f' % (len(stream), levels))
+    print('%20s %12.2f us/update' % ('per level', per_level * 1e6))
+    print('%20s %12.2f us/update' % ('apply_levels', batched * 1e6))
+    print('snapshot: %d levels per side' % len(snapshot['bids']))
+    print('%20s %12.2f us/snapshot' % ('per level', snapshot_per_level * 1e6))
+    print('%20s %12.2f us/snapshot' % ('apply_levels', snapshot_batched * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Decode time per websocket frame for every installed JSON decoder.
+
+Frames are shaped like the ones the bot receives: Binance ``depthUpdate``
+diffs, and a Bitfinex book snapshot plus single level updates. Each
+decoder is timed on the raw bytes, and stdlib json also the old way
+(decode to str first) as the baseline.
+
+    cd src && python -m bench.bench_json
+"""
+import json
+import random
+import time
+
+from btcbot.jsondecode import JSON_DECODERS
+
+
+def binance_depth_update(rnd, update_id):
+    def levels(base, count):
+        return [['%.8f' % (base + rnd.randint(-50, 50) * 1e-8), '%.8f' % rnd.choice([0, rnd.uniform(1, 900)]), []] for _ in range(count)]
+    return {
+        'e': 'depthUpdate', 'E': 1523546183123 + update_id, 's': 'EOSBTC',
+        'U': update_id, 'u': update_id + 3,
+        'b': levels(0.00084, rnd.randint(1, 12)),
+        'a': levels(0.00085, rnd.randint(1, 12)),
+    }
+
+
+def bitfinex_book_snapshot(rnd):
+    levels = [[round(0.00084 - i * 1e-7, 7), rnd.randint(1, 5), round(rnd.uniform(1, 900), 4)] for i in range(25)]
+    levels += [[round(0.00085 + i * 1e-7, 7), rnd.randint(1, 5), -round(rnd.uniform(1, 900), 4)] for i in range(25)]
+    return [17470, levels]
+
+
+def bitfinex_book_update(rnd):
+    return [17470, [round(0.00084 + rnd.randint(-30, 30) * 1e-7, 7), rnd.randint(0, 5), round(rnd.uniform(-900, 900), 4)]]
+
+
+def frames():
+    rnd = random.Random(3)
+    return {
+        'binance depthUpdate': [json.dumps(binance_depth_update(rnd, i * 4)).encode() for i in range(2000)],
+        'bitfinex snapshot': [json.dumps(bitfinex_book_snapshot(rnd)).encode() for _ in range(200)],
+        'bitfinex update': [json.dumps(bitfinex_book_update(rnd)).encode() for _ in range(2000)],
+    }
+
+
+def run(decode, raw_frames, rounds):
+    begin = time.perf_counter()
+    for _ in range(rounds):
+        for raw in raw_frames:
+            decode(raw)
+    return (time.perf_counter() - begin) / (rounds * len(raw_frames))
+
+
+def main():
+    decoders = [('json (str)', lambda raw: json.loads(raw.decode('utf8')))]
+    decoders += [(name + ' (bytes)', loads) for name, loads in JSON_DECODERS if loads is not None]
+    print('%22s %8s %16s %10s' % ('frames', 'bytes', 'decoder', 'us/frame'))
+    for kind, raw_frames in frames().items():
+        size = sum(len(raw) for raw in raw_frames) // len(raw_frames)
+        for name, decode in decoders:
+            print('%22s %8d %16s %10.2f' % (kind, size, name, run(decode, raw_frames, 20) * 1e6))
+
+
+if __name__ == '__main__':
+    main()
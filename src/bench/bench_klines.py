@@ -0,0 +1,80 @@
+"""Client.get_historical_klines against KlineDownloader.
+
+Runs mockex.binance with every REST answer delayed by a fixed latency and
+DAYS days of listing, and downloads every 1m bar: once into a list with
+get_historical_klines (one request after the other, a second of sleep
+every third), then with KlineDownloader into a fresh store with 1, 4 and
+8 workers. Then times the reruns: one after a download that stopped
+half way, one with the store up to date. Reports wall time, requests and
+the peak of Python memory allocated (tracemalloc), and checks the stored
+bars against the list.
+
+    cd src && python -m bench.bench_klines
+"""
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from bench.bench_mock_binance import start_mock
+from binance.client import Client
+from btcbot.history import KlineDownloader, kline_arrays
+
+LATENCY = 0.05
+DAYS = 30
+START = '%d days ago UTC' % (DAYS + 1)
+HALF_WAY = '%d days ago UTC' % (DAYS // 2)
+
+
+def measure(func):
+    tracemalloc.start()
+    begin = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - begin
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    process, api_url, _ = start_mock(0, '--latency', str(LATENCY), '--listed-days', str(DAYS))
+    directory = tempfile.mkdtemp(prefix='btcbot-klines-')
+    results = []
+    try:
+        client = Client('key', 'secret', api_url=api_url)
+        klines, elapsed, peak = measure(lambda: client.get_historical_klines('EOSBTC', '1m', START))
+        # a page of 500 bars takes one request, plus the one coming back short
+        results.append(('get_historical_klines', elapsed, len(klines) // 500 + 1, len(klines), peak))
+
+        for workers in (1, 4, 8):
+            downloader = KlineDownloader(client, '%s/%d' % (directory, workers), workers=workers)
+            store, elapsed, peak = measure(lambda: downloader.download('EOSBTC', '1m', START))
+            results.append(('downloader, %d workers' % workers, elapsed, downloader.request_count, len(store), peak))
+
+        downloader = KlineDownloader(client, '%s/resume' % directory)
+        downloader.download('EOSBTC', '1m', START, HALF_WAY)
+        downloader.request_count = 0
+        store, elapsed, peak = measure(lambda: downloader.download('EOSBTC', '1m', START))
+        results.append(('rerun, half stored', elapsed, downloader.request_count, len(store), peak))
+        downloader.request_count = 0
+        store, elapsed, peak = measure(lambda: downloader.download('EOSBTC', '1m', START))
+        results.append(('rerun, up to date', elapsed, downloader.request_count, len(store), peak))
+
+        # get_historical_klines also returns the bar still open
+        expected = kline_arrays([kline for kline in klines if kline[0] <= store.column('open_time')[-1]])
+        same = all(np.array_equal(store.column(name), expected[name]) for name in expected)
+    finally:
+        process.terminate()
+        process.wait()
+        shutil.rmtree(directory)
+
+    print('%d days of 1m klines, %d ms per request, stored bars match the list: %s' % (DAYS, LATENCY * 1000, same))
+    print('%24s %10s %10s %10s %12s' % ('', 'seconds', 'requests', 'bars', 'peak KiB'))
+    for name, elapsed, requests, bars, peak in results:
+        print('%24s %10.2f %10d %10d %12d' % (name, elapsed, requests, bars, peak // 1024))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""Sustained ingest and order round trip of the Binance stack, offline.
+
+Runs mockex.binance in a child process at increasing depthUpdate rates
+and connects a real Binance exchange (client, websocket thread, queue,
+QueuePoller, order book) to it. For every rate it reports the updates
+applied per second and the queue wait of the poller; a growing queue
+means the rate is past the ingest ceiling. Then times FOK orders through
+Binance.new_order.
+
+    cd src && python -m bench.bench_mock_binance
+"""
+import socket
+import subprocess
+import sys
+import time
+
+import requests
+
+from btcbot.config import ConfigData
+from btcbot.stats import Histogram
+
+RATES = (1000, 5000, 10000, 20000)
+SECONDS = 5
+ORDERS = 200
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_mock(rate, *args):
+    port = free_port()
+    process = subprocess.Popen([sys.executable, '-m', 'mockex.binance', '--port', str(port), '--rate', str(rate), '--seed', '1'] + list(args),
+                               stderr=subprocess.DEVNULL)
+    api_url = 'http://127.0.0.1:%d/api' % port
+    for _ in range(100):
+        try:
+            requests.get(api_url + '/v1/ping', timeout=1)
+            break
+        except requests.ConnectionError:
+            time.sleep(0.05)
+    return process, api_url, 'ws://127.0.0.1:%d/' % port
+
+
+def connect(api_url, stream_url):
+    ConfigData().init({
+        'target_token': 'EOS', 'curency_token': 'BTC',
+        'exchange_list': {'binance': {'api_key': 'key', 'api_secret': 'secret', 'fee': 0.0005,
+                                      'api_url': api_url, 'stream_url': stream_url}},
+    })
+    from btcbot.binance import Binance
+    binance = Binance()
+    binance.connect()
+    binance.order_book_ready.wait(10)
+    return binance
+
+
+def measure_ingest(binance):
+    poller = binance.queue_poller_list[0]
+    time.sleep(1)
+    poller.latency.reset()
+    begin = time.perf_counter()
+    time.sleep(SECONDS)
+    elapsed = time.perf_counter() - begin
+    stat = poller.stat()
+    return stat['latency']['count'] / elapsed, stat['latency'], stat['qsize']
+
+
+def measure_orders(binance):
+    round_trip = Histogram()
+    best_ask, _ = binance.asks_book.best()
+    filled = 0
+    for _ in range(ORDERS):
+        begin = time.perf_counter()
+        ret = binance.new_order(1, round(best_ask * 1.01, 8))
+        round_trip.record(time.perf_counter() - begin)
+        filled += ret is True
+    return round_trip, filled
+
+
+def main():
+    print('%8s %14s %10s %10s %10s' % ('rate/s', 'applied/s', 'p50 us', 'p99 us', 'qsize'))
+    for rate in RATES:
+        process, api_url, stream_url = start_mock(rate)
+        try:
+            binance = connect(api_url, stream_url)
+            applied, latency, qsize = measure_ingest(binance)
+            print('%8d %14.0f %10d %10d %10s' % (rate, applied, latency['p50_us'], latency['p99_us'], qsize))
+            if rate == RATES[0]:
+                round_trip, filled = measure_orders(binance)
+            binance.disconnect()
+        finally:
+            process.terminate()
+            process.wait()
+    print('FOK orders: %d, filled %d, round trip p50 %d us, p99 %d us, max %d us' % (
+        ORDERS, filled, round_trip.percentile(50), round_trip.percentile(99), round_trip.max))
+
+
+if __name__ == '__main__':
+    main()
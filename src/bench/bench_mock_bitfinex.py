@@ -0,0 +1,143 @@
+"""Routing, order round trip and reconnects of the Bitfinex stack, offline.
+
+Runs mockex.bitfinex in a child process and connects a real Bitfinex
+exchange (btfxwss connection, QueueProcessor, QueuePoller, order book) to
+it. Reports the book updates routed and applied per second at increasing
+rates, the FOK round trip through Bitfinex.new_order with and without
+injected latency, and how long the connection is out during a reconnect
+storm (the mock restarts with info 20051 every few seconds).
+
+    cd src && python -m bench.bench_mock_bitfinex
+"""
+import socket
+import subprocess
+import sys
+import time
+
+from btcbot.config import ConfigData
+from btcbot.stats import Histogram
+
+RATES = (1000, 5000, 10000, 20000)
+SECONDS = 5
+ORDERS = 100
+LATENCIES = (0, 0.005)
+STORM_SECONDS = 20
+DROP_EVERY = 2
+RECONNECT_INTERVAL = 0.5
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_mock(*args):
+    port = free_port()
+    process = subprocess.Popen([sys.executable, '-m', 'mockex.bitfinex', '--port', str(port), '--seed', '1'] + list(args),
+                               stderr=subprocess.DEVNULL)
+    for _ in range(100):
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            break
+        except ConnectionError:
+            time.sleep(0.05)
+    return process, 'ws://127.0.0.1:%d/ws/2' % port
+
+
+def connect(stream_url):
+    ConfigData().init({
+        'target_token': 'EOS', 'curency_token': 'BTC',
+        'exchange_list': {'bitfinex': {'api_key': 'key', 'api_secret': 'secret', 'fee': 0.002,
+                                       'stream_url': stream_url, 'rest_url': stream_url.replace('ws', 'http', 1).replace('/ws/2', '/v1')}},
+    })
+    from btcbot.bitfinex import Bitfinex
+    bitfinex = Bitfinex()
+    bitfinex.socket_client.conn.reconnect_interval = RECONNECT_INTERVAL
+    bitfinex.connect()
+    bitfinex.order_book_ready.wait(10)
+    return bitfinex
+
+
+def measure_routing(bitfinex):
+    poller = bitfinex.queue_poller_list[0]
+    time.sleep(1)
+    poller.latency.reset()
+    begin = time.perf_counter()
+    time.sleep(SECONDS)
+    elapsed = time.perf_counter() - begin
+    stat = poller.stat()
+    return stat['latency']['count'] / elapsed, stat['latency'], stat['qsize']
+
+
+def measure_orders(bitfinex):
+    round_trip = Histogram()
+    best_ask, _ = bitfinex.asks_book.best()
+    filled = 0
+    for _ in range(ORDERS):
+        begin = time.perf_counter()
+        ret = bitfinex.new_order(1, round(best_ask * 1.01, 7))
+        round_trip.record(time.perf_counter() - begin)
+        filled += ret is True
+    return round_trip, filled
+
+
+def measure_storm(bitfinex):
+    """Outage per drop: from the connection going down to the next book update applied."""
+    connected = bitfinex.socket_client.conn.connected
+    latency = bitfinex.queue_poller_list[0].latency
+    outages = Histogram()
+    down_at = None
+    end = time.perf_counter() + STORM_SECONDS
+    while time.perf_counter() < end:
+        if down_at is None:
+            if not connected.is_set():
+                down_at = time.perf_counter()
+                count = latency.count()
+        elif connected.is_set() and latency.count() > count:
+            outages.record(time.perf_counter() - down_at)
+            down_at = None
+        time.sleep(0.001)
+    return outages
+
+
+def main():
+    print('%8s %14s %10s %10s %10s' % ('rate/s', 'applied/s', 'p50 us', 'p99 us', 'qsize'))
+    for rate in RATES:
+        process, stream_url = start_mock('--rate', str(rate))
+        try:
+            bitfinex = connect(stream_url)
+            applied, latency, qsize = measure_routing(bitfinex)
+            print('%8d %14.0f %10d %10d %10s' % (rate, applied, latency['p50_us'], latency['p99_us'], qsize))
+            bitfinex.disconnect()
+        finally:
+            process.terminate()
+            process.wait()
+
+    for latency in LATENCIES:
+        process, stream_url = start_mock('--rate', '1000', '--latency', str(latency))
+        try:
+            bitfinex = connect(stream_url)
+            round_trip, filled = measure_orders(bitfinex)
+            bitfinex.disconnect()
+        finally:
+            process.terminate()
+            process.wait()
+        print('FOK orders, %d ms injected: %d, filled %d, round trip p50 %d us, p99 %d us, max %d us' % (
+            latency * 1000, ORDERS, filled, round_trip.percentile(50), round_trip.percentile(99), round_trip.max))
+
+    process, stream_url = start_mock('--rate', '1000', '--drop-every', str(DROP_EVERY))
+    try:
+        bitfinex = connect(stream_url)
+        outages = measure_storm(bitfinex)
+        bitfinex.disconnect()
+    finally:
+        process.terminate()
+        process.wait()
+    print('reconnect storm, drop every %s s for %d s, reconnect interval %s s: %d reconnects, outage p50 %d ms, max %d ms' % (
+        DROP_EVERY, STORM_SECONDS, RECONNECT_INTERVAL, outages.count(),
+        outages.percentile(50) / 1000, outages.max / 1000))
+
+
+if __name__ == '__main__':
+    main()
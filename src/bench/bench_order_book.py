@@ -0,0 +1,83 @@
+"""Per-update latency of btcbot.exchange.OrderBook.
+
+Replays a random mix of level updates, removals and inserts against a book of
+a given depth and reads the ladder the way ``Bot.try_to_trade`` does after
+every update. The previous dict-and-sort implementation is kept here as the
+baseline.
+
+    cd src && python -m bench.bench_order_book
+"""
+import random
+import time
+
+from btcbot.exchange import OrderBook
+
+
+class SortingOrderBook:
+
+    def __init__(self, is_ask=False):
+        self.is_ask = is_ask
+        self.map = {}
+
+    def remove(self, price):
+        if price in self.map:
+            del self.map[price]
+
+    def add_or_update(self, price, amount):
+        amount = abs(amount)
+        self.map[price] = amount
+
+    def to_list(self, limit=None):
+        data = sorted(self.map.items(), reverse=not self.is_ask)
+        return data[:limit]
+
+
+def make_updates(depth, count, seed=7):
+    rnd = random.Random(seed)
+    prices = [round(0.001 + i * 0.0000001, 7) for i in range(depth)]
+    updates = []
+    for _ in range(count):
+        price = rnd.choice(prices)
+        op = rnd.random()
+        if op < 0.15:
+            updates.append((price, 0))
+        else:
+            updates.append((price, rnd.uniform(1, 500)))
+    return prices, updates
+
+
+def run(book_cls, depth, count, read, read_limit=None):
+    prices, updates = make_updates(depth, count)
+    book = book_cls(True)
+    for price in prices:
+        book.add_or_update(price, 100)
+
+    begin = time.perf_counter()
+    for price, amount in updates:
+        if amount == 0:
+            book.remove(price)
+        else:
+            book.add_or_update(price, amount)
+        if read:
+            book.to_list(read_limit)
+    return (time.perf_counter() - begin) / count
+
+
+def main():
+    cases = [('update', False, None), ('+read all', True, None), ('+read top10', True, 10)]
+    header = ['levels', 'updates']
+    for name, _, _ in cases:
+        header += ['sort ' + name, 'ladder ' + name]
+    print(' '.join('%17s' % h for h in header))
+    print(' '.join('%17s' % '' for _ in header[:2]) + ' ' + ' '.join('%17s' % 'us/update' for _ in header[2:]))
+    for depth in (25, 100, 500, 5000):
+        count = 50000 if depth <= 500 else 5000
+        row = ['%17d' % depth, '%17d' % count]
+        for _, read, read_limit in cases:
+            for book_cls in (SortingOrderBook, OrderBook):
+                row.append('%17.3f' % (run(book_cls, depth, count, read, read_limit) * 1e6))
+        print(' '.join(row))
+
+
+if __name__ == '__main__':
+    main()
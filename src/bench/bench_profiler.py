@@ -0,0 +1,57 @@
+"""What the sampling profiler costs a live Binance stack.
+
+Connects the Binance exchange to mockex.binance and measures the poller's
+queue wait with the profiler off and sampling at a few intervals, then
+prints the threads the last profile attributed samples to.
+
+    cd src && python -m bench.bench_profiler
+"""
+import shutil
+import tempfile
+import time
+
+from bench.bench_mock_binance import start_mock, connect
+from btcbot.profiler import Profiler
+
+RATE = 5000
+SECONDS = 5
+INTERVALS = (None, 0.01, 0.005, 0.001)
+
+
+def main():
+    directory = tempfile.mkdtemp(prefix='btcbot-prof-')
+    process, api_url, stream_url = start_mock(RATE)
+    try:
+        binance = connect(api_url, stream_url)
+        poller = binance.queue_poller_list[0]
+        time.sleep(1)
+        print('binance at %d updates/s, %d s per run' % (RATE, SECONDS))
+        print('%12s %10s %10s %10s %10s' % ('interval', 'samples', 'p50 us', 'p99 us', 'p999 us'))
+        for interval in INTERVALS:
+            profiler = Profiler(directory, interval=interval or 1, duration=SECONDS + 1)
+            poller.latency.reset()
+            if interval:
+                profiler.start()
+            time.sleep(SECONDS)
+            stat = poller.latency.stat()
+            samples = profiler.stop()['samples']
+            print('%12s %10d %10d %10d %10d' % (interval or 'off', samples, stat['p50_us'], stat['p99_us'], stat['p999_us']))
+        binance.disconnect()
+
+        threads = {}
+        with open(profiler.last_path) as f:
+            for line in f:
+                stack, _, count = line.rpartition(' ')
+                thread = stack.split(';', 1)[0]
+                threads[thread] = threads.get(thread, 0) + int(count)
+        print('samples per thread in %s:' % profiler.last_path)
+        for thread, count in sorted(threads.items()):
+            print('  %-40s %d' % (thread, count))
+    finally:
+        process.terminate()
+        process.wait()
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
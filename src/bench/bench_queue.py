@@ -0,0 +1,61 @@
+"""End-to-end latency and CPU cost per message of each queue backend.
+
+A producer thread puts depthUpdate-sized payloads in bursts, a consumer
+thread takes them off and records put-to-get latency. CPU time is the
+process time of the whole run divided by the message count, so it includes
+the feeder thread of the multiprocessing backend.
+
+    cd src && python -m bench.bench_queue
+"""
+import time
+from threading import Thread
+
+from btcbot.queues import QUEUE_BACKENDS
+from btcbot.stats import Histogram
+
+PAYLOAD = {
+    'e': 'depthUpdate', 'E': 1523546183123, 's': 'EOSBTC', 'U': 157, 'u': 160,
+    'b': [['0.00084120', '12.34000000', []], ['0.00084110', '0.00000000', []], ['0.00084050', '501.00000000', []]],
+    'a': [['0.00084200', '80.10000000', []], ['0.00084230', '0.00000000', []]],
+}
+
+
+def run(queue_factory, count, burst):
+    queue = queue_factory()
+    latency = Histogram()
+
+    def consume():
+        for _ in range(count):
+            payload, sent_at = queue.get()
+            latency.record(time.perf_counter() - sent_at)
+
+    consumer = Thread(target=consume)
+    consumer.start()
+
+    cpu_begin = time.process_time()
+    begin = time.perf_counter()
+    for i in range(count):
+        queue.put((PAYLOAD, time.perf_counter()))
+        if i % burst == burst - 1:
+            time.sleep(0.001)
+    consumer.join()
+    elapsed = time.perf_counter() - begin
+    cpu = time.process_time() - cpu_begin
+    return latency, elapsed, cpu
+
+
+def main():
+    count = 50000
+    print('%10s %8s %10s %10s %10s %14s %14s' % ('backend', 'burst', 'p50 us', 'p99 us', 'max us', 'cpu us/msg', 'wall us/msg'))
+    for burst in (1, 100):
+        for name, queue_factory in sorted(QUEUE_BACKENDS.items()):
+            n = count if burst > 1 else count // 20
+            latency, elapsed, cpu = run(queue_factory, n, burst)
+            print('%10s %8d %10d %10d %10d %14.2f %14.2f' % (
+                name, burst,
+                latency.percentile(50), latency.percentile(99), latency.max,
+                cpu / n * 1e6, elapsed / n * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Order placement while history downloads drain the request weight bucket.
+
+Runs mockex.binance and, with one RateLimiter shared by every client,
+keeps a few threads downloading klines flat out while another places an
+order every ORDER_INTERVAL. Times create_order() end to end, limiter wait
+included, once with the priority classes and once with every call in the
+default class, as if the bucket were first come first served. The bucket
+is kept small so the downloads run into it within the first second.
+
+    cd src && python -m bench.bench_ratelimit
+"""
+import time
+from threading import Thread, Event
+
+from bench.bench_mock_binance import start_mock
+from binance.client import Client
+from binance.ratelimit import RateLimiter, PRIORITY_DEFAULT, PRIORITY_NAMES
+from btcbot.stats import Histogram
+
+WEIGHT_PER_MINUTE = 300
+DOWNLOADERS = 4
+ORDERS = 50
+ORDER_INTERVAL = 0.1
+KLINES = 10
+
+
+class FlatRateLimiter(RateLimiter):
+    """Same bucket with no priority classes"""
+
+    def acquire(self, weight=1, priority=PRIORITY_DEFAULT):
+        return super(FlatRateLimiter, self).acquire(weight, PRIORITY_DEFAULT)
+
+
+def download(client, stopped, counter):
+    start = int(time.time() * 1000) - 7 * 86400 * 1000
+    while not stopped.is_set():
+        client.get_klines(symbol='EOSBTC', interval='1m', startTime=start, limit=KLINES)
+        counter.append(1)
+
+
+def run(api_url, limiter):
+    stopped = Event()
+    counter = []
+    downloaders = []
+    for _ in range(DOWNLOADERS):
+        thread = Thread(target=download, args=(Client('key', 'secret', api_url=api_url, rate_limiter=limiter), stopped, counter))
+        thread.start()
+        downloaders.append(thread)
+
+    client = Client('key', 'secret', api_url=api_url, rate_limiter=limiter)
+    histogram = Histogram()
+    time.sleep(1)
+    for _ in range(ORDERS):
+        begin = time.perf_counter()
+        client.create_order(symbol='EOSBTC', side='BUY', type='LIMIT', timeInForce='FOK', price=0.0009, quantity=1)
+        histogram.record(time.perf_counter() - begin)
+        time.sleep(ORDER_INTERVAL)
+    stopped.set()
+    for thread in downloaders:
+        thread.join()
+    return histogram, len(counter), limiter.stat()
+
+
+def main():
+    process, api_url, _ = start_mock(0)
+    try:
+        results = [
+            ('priority', run(api_url, RateLimiter(WEIGHT_PER_MINUTE))),
+            ('flat', run(api_url, FlatRateLimiter(WEIGHT_PER_MINUTE))),
+        ]
+    finally:
+        process.terminate()
+        process.wait()
+
+    print('%d klines downloaders, an order every %d ms, %d weight per minute' % (DOWNLOADERS, ORDER_INTERVAL * 1000, WEIGHT_PER_MINUTE))
+    print('%10s %10s %10s %10s %9s   %s' % ('', 'p50 us', 'p99 us', 'max us', 'klines', 'blocked s (count) per class'))
+    for name, (histogram, klines, stat) in results:
+        blocked = ', '.join('%s %.1f (%d)' % (PRIORITY_NAMES[priority], stat[PRIORITY_NAMES[priority]]['blocked_seconds'],
+                                              stat[PRIORITY_NAMES[priority]]['blocked'])
+                            for priority in sorted(PRIORITY_NAMES))
+        stat = histogram.stat()
+        print('%10s %10d %10d %10d %9d   %s' % (name, stat['p50_us'], stat['p99_us'], stat['max_us'], klines, blocked))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Cost of recording a frame on the receive path, and writer throughput.
+
+Times FrameRecorder.record() on depthUpdate-sized frames while the writer
+thread runs, then the time the writer needs to get every frame on disk,
+for each available compression. The recording is read back and compared.
+
+    cd src && python -m bench.bench_recorder
+"""
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from btcbot import recorder
+from btcbot.recorder import FrameRecorder, read_frames
+from btcbot.stats import Histogram
+from bench.bench_json import binance_depth_update
+
+
+def run(directory, compression, raw_frames):
+    frame_recorder = FrameRecorder(directory, compression=compression, segment_size=8 * 1024 * 1024)
+    frame_recorder.start()
+    stream_id = frame_recorder.stream_id('binance/eosbtc@depth')
+    latency = Histogram()
+    record = frame_recorder.record
+    perf_counter = time.perf_counter
+
+    begin = perf_counter()
+    for raw in raw_frames:
+        start = perf_counter()
+        record(stream_id, raw, 1523546183.123)
+        latency.record(perf_counter() - start)
+    receive_path = perf_counter() - begin
+    frame_recorder.close()
+    total = perf_counter() - begin
+
+    size = sum(os.path.getsize(path) for path in recorder.segment_paths(directory))
+    return latency, receive_path, total, size, frame_recorder.stat()['segments']
+
+
+def main():
+    rnd = random.Random(7)
+    raw_frames = [json.dumps(binance_depth_update(rnd, i * 4)).encode() for i in range(200000)]
+    raw_size = sum(len(raw) for raw in raw_frames)
+    compressions = [None]
+    if recorder.zstandard is not None:
+        compressions.append('zstd')
+    if recorder.lz4 is not None:
+        compressions.append('lz4')
+
+    print('frames: %d, %.1f MB' % (len(raw_frames), raw_size / 1e6))
+    print('%8s %10s %10s %14s %14s %10s %9s' % ('codec', 'p50 us', 'p99 us', 'record us/msg', 'write us/msg', 'MB', 'segments'))
+    for compression in compressions:
+        directory = tempfile.mkdtemp(prefix='btcbot-rec-')
+        try:
+            latency, receive_path, total, size, segments = run(directory, compression, raw_frames)
+            read_back = [raw for _, _, raw in read_frames(directory)]
+            assert read_back == raw_frames
+        finally:
+            shutil.rmtree(directory)
+        print('%8s %10d %10d %14.2f %14.2f %10.1f %9d' % (
+            compression or 'none', latency.percentile(50), latency.percentile(99),
+            receive_path / len(raw_frames) * 1e6, total / len(raw_frames) * 1e6, size / 1e6, segments))
+
+
+if __name__ == '__main__':
+    main()
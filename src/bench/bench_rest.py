@@ -0,0 +1,108 @@
+"""Bitfinex REST round trips over fresh connections and over the pooled session.
+
+Runs mockex.bitfinex with a throwaway self-signed certificate, so every
+call goes over TLS like it does against api.bitfinex.com, and times
+balances() the old way, a module level requests.post (new TCP and TLS
+connection per call), against BitfinexRestAuthClient's keep-alive
+session. Also times the first call of a new client with and without
+ping() having warmed the pool.
+
+    cd src && python -m bench.bench_rest
+"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+
+from bench.bench_mock_bitfinex import free_port
+from btfxwss.rest import BitfinexRestAuthClient
+from btcbot.stats import Histogram
+
+CALLS = 300
+FIRST_CALLS = 20
+
+
+def make_certificate(directory):
+    certfile = os.path.join(directory, 'cert.pem')
+    keyfile = os.path.join(directory, 'key.pem')
+    subprocess.check_call(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+                           '-subj', '/CN=127.0.0.1', '-addext', 'subjectAltName=IP:127.0.0.1',
+                           '-keyout', keyfile, '-out', certfile], stderr=subprocess.DEVNULL)
+    return certfile, keyfile
+
+
+def start_mock(certfile, keyfile):
+    port = free_port()
+    process = subprocess.Popen([sys.executable, '-m', 'mockex.bitfinex', '--port', str(port), '--rate', '0',
+                                '--certfile', certfile, '--keyfile', keyfile], stderr=subprocess.DEVNULL)
+    url = 'https://127.0.0.1:%d/v1' % port
+    for _ in range(100):
+        try:
+            requests.get(url + '/symbols', verify=certfile, timeout=1)
+            break
+        except requests.ConnectionError:
+            time.sleep(0.05)
+    return process, url
+
+
+def fresh_connection_balances(client):
+    # what every call did before the session
+    payload = {'request': '/v1/balances', 'nonce': client._nonce}
+    r = requests.post(client.URL + '/balances', headers=client._sign_payload(payload), verify=True)
+    return r.json()
+
+
+def timed(func, calls):
+    histogram = Histogram()
+    for _ in range(calls):
+        begin = time.perf_counter()
+        func()
+        histogram.record(time.perf_counter() - begin)
+    return histogram
+
+
+def main():
+    directory = tempfile.mkdtemp(prefix='btcbot-rest-')
+    certfile, keyfile = make_certificate(directory)
+    # trusted the way a deployment would add a CA, requests reads it for every verify=True
+    os.environ['REQUESTS_CA_BUNDLE'] = certfile
+    process, url = start_mock(certfile, keyfile)
+    try:
+        client = BitfinexRestAuthClient('key', 'secret', url=url)
+        client.ping()
+        results = [
+            ('requests.post', timed(lambda: fresh_connection_balances(client), CALLS)),
+            ('session', timed(client.balances, CALLS)),
+        ]
+
+        cold = Histogram()
+        warm = Histogram()
+        for _ in range(FIRST_CALLS):
+            for histogram, warm_up in ((cold, False), (warm, True)):
+                client = BitfinexRestAuthClient('key', 'secret', url=url)
+                if warm_up:
+                    client.ping()
+                begin = time.perf_counter()
+                client.balances()
+                histogram.record(time.perf_counter() - begin)
+                client.close()
+        results.append(('first, cold', cold))
+        results.append(('first, ping()', warm))
+    finally:
+        process.terminate()
+        process.wait()
+        shutil.rmtree(directory)
+
+    print('balances() against a local https stand-in, %d calls, first call %d times' % (CALLS, FIRST_CALLS))
+    print('%16s %10s %10s %10s' % ('', 'p50 us', 'p99 us', 'max us'))
+    for name, histogram in results:
+        stat = histogram.stat()
+        print('%16s %10d %10d %10d' % (name, stat['p50_us'], stat['p99_us'], stat['max_us']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""Bitfinex book ingest with the arbitrage scan inline and on the strategy thread.
+
+Feeds the Bitfinex book handler 25 level bursts, first flat out and then
+paced with a short sleep standing in for the socket wait, while a scan of
+both directions against a fixed book on the other side runs on every
+notification, either on the ingest thread (inline) or on a StrategyThread
+woken by it. The scan reads the Bitfinex books through snapshot_book()
+like Bot.try_to_trade does. Reports ingest throughput, the time a burst
+holds the ingest thread, the scans run, the lag from the first update a
+scan covers to that scan done, and the book copies taken again.
+
+First checks that snapshot_book() still returns after a book writer
+raised half way, on both exchanges.
+
+    cd src && python -m bench.bench_strategy
+"""
+import random
+import time
+from threading import Thread
+
+from bench.bench_coalesce import make_bitfinex, make_other_books, level, FEE
+from btcbot import scanner
+from btcbot.config import ConfigData
+from btcbot.stats import Histogram
+from btcbot.strategy import StrategyThread
+
+BURSTS = 20000
+BURST_SIZE = 25
+PACE = 0.0002
+
+
+def snapshot_returns(exchange, timeout=1):
+    thread = Thread(target=exchange.snapshot_book, args=(exchange.bids_book,), daemon=True)
+    thread.start()
+    thread.join(timeout)
+    return not thread.is_alive()
+
+
+def check_raising_writer():
+    from btcbot.replay import ReplayBinance, ReplayBitfinex, ReplayClock
+    ConfigData().init({
+        'target_token': 'EOS', 'curency_token': 'BTC',
+        'exchange_list': {name: {'api_key': 'key', 'api_secret': 'secret', 'fee': FEE} for name in ('binance', 'bitfinex')},
+    })
+    bitfinex = ReplayBitfinex(ReplayClock())
+    binance = ReplayBinance(ReplayClock())
+    writes = (
+        (bitfinex, lambda: bitfinex._process_order_book_batch([[0.00085, 1, 10], ['not a level']])),
+        (binance, lambda: binance._update_order_book([['0.00085', '10', []], ['not a price', '1', []]], [])),
+    )
+    for exchange, write in writes:
+        try:
+            write()
+        except Exception:
+            pass
+        else:
+            raise AssertionError('%s: the malformed level was applied' % exchange.name)
+        if not snapshot_returns(exchange):
+            raise AssertionError('%s: snapshot_book() spins after a writer raised, book_version %d'
+                                 % (exchange.name, exchange.book_version))
+    print('snapshot_book() returns after a writer raised: ok')
+
+
+def run(threaded, pace):
+    rnd = random.Random(5)
+    bitfinex = make_bitfinex()
+    other_asks, other_bids = make_other_books(rnd)
+    scans = [0]
+    lag = Histogram()
+    # first notification not yet covered by a scan
+    pending = [None]
+
+    def notify(exchange):
+        if pending[0] is None:
+            pending[0] = time.perf_counter()
+        if strategy is not None:
+            strategy.wake()
+        else:
+            scan()
+
+    def scan(exchange=None):
+        scans[0] += 1
+        since, pending[0] = pending[0], None
+        pairs = ((other_asks, bitfinex.snapshot_book(bitfinex.bids_book)),
+                 (bitfinex.snapshot_book(bitfinex.asks_book), other_bids))
+        for asks_book, bids_book in pairs:
+            if asks_book.best() is None or bids_book.best() is None:
+                continue
+            asks, bids = scanner.crossing_levels(asks_book, bids_book, 1 + FEE, 1 - FEE)
+            scanner.find_trade(asks, bids, 1 + FEE, 1 - FEE, 10, 10000)
+        if since is not None:
+            lag.record(time.perf_counter() - since)
+
+    strategy = None
+    if threaded:
+        strategy = StrategyThread(scan)
+        strategy.start()
+    bitfinex.on_order_book_update = notify
+    snapshot = [level(rnd, side) for side in (1, -1) for _ in range(25)]
+    bursts = [[level(rnd, rnd.choice((1, -1))) for _ in range(BURST_SIZE)] for _ in range(BURSTS)]
+
+    hold = Histogram()
+    perf_counter = time.perf_counter
+    start = perf_counter()
+    for items in [snapshot] + bursts:
+        begin = perf_counter()
+        bitfinex._process_order_book_batch(items)
+        hold.record(perf_counter() - begin)
+        if pace:
+            time.sleep(pace)
+    elapsed = perf_counter() - start
+    if strategy is not None:
+        strategy.stop()
+    return elapsed, hold, scans[0], lag, bitfinex.snapshot_retry_count
+
+
+def main():
+    check_raising_writer()
+    print('%d bursts of %d levels, hold and lag in us' % (BURSTS, BURST_SIZE))
+    print('%8s %8s %10s %9s %9s %9s %8s %9s %9s %8s' % ('pace', 'scan', 'levels/s', 'hold p50', 'hold p99', 'hold max',
+                                                       'scans', 'lag p50', 'lag p99', 'retries'))
+    for pace in (0, PACE):
+        for threaded in (False, True):
+            elapsed, hold, scans, lag, retries = run(threaded, pace)
+            print('%8s %8s %10d %9d %9d %9d %8d %9d %9d %8d' % (
+                '%d us' % (pace * 1e6) if pace else 'none', 'thread' if threaded else 'inline', BURSTS * BURST_SIZE / elapsed,
+                hold.percentile(50), hold.percentile(99), hold.stat()['max_us'], scans, lag.percentile(50), lag.percentile(99), retries))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""Cost of the StageTracer, and the stages of a live session.
+
+First times what tracing adds per message: the decode wrapper, begin()
+in the poller and the apply mark, against the same calls with tracing
+off. dequeue reuses the poller's own latency histogram at no extra cost.
+Then runs the Binance and Bitfinex stacks against mockex for a few
+seconds and prints the per stage table the API serves.
+
+    cd src && python -m bench.bench_trace
+"""
+import json
+import time
+
+from bench import bench_mock_binance, bench_mock_bitfinex
+from btcbot.trace import StageTracer
+
+MESSAGES = 200000
+RATE = 5000
+SECONDS = 5
+
+FRAME = json.dumps({'e': 'depthUpdate', 'E': 1523546183000, 's': 'EOSBTC', 'U': 1, 'u': 1,
+                    'b': [['0.00084000', '12.00000000', []]], 'a': [['0.00085000', '0.00000000', []]]})
+
+
+def per_message(tracer):
+    loads = tracer.timed('decode', json.loads)
+    begin = time.perf_counter()
+    for _ in range(MESSAGES):
+        received_at = time.time()
+        loads(FRAME)
+        tracer.begin(received_at)
+        tracer.mark('apply')
+    return (time.perf_counter() - begin) / MESSAGES
+
+
+def main():
+    tracer = StageTracer()
+    tracer.enabled = False
+    off = min(per_message(tracer) for _ in range(5))
+    tracer.enabled = True
+    on = min(per_message(tracer) for _ in range(5))
+    tracer.reset()
+    print('per message, decode included: tracing off %.2f us, on %.2f us, +%.2f us' % (off * 1e6, on * 1e6, (on - off) * 1e6))
+
+    binance_process, api_url, binance_url = bench_mock_binance.start_mock(RATE)
+    bitfinex_process, bitfinex_url = bench_mock_bitfinex.start_mock('--rate', str(RATE))
+    try:
+        binance = bench_mock_binance.connect(api_url, binance_url)
+        bitfinex = bench_mock_bitfinex.connect(bitfinex_url)
+        time.sleep(1)
+        tracer.reset()
+        time.sleep(SECONDS)
+        stat = tracer.stat()
+        binance.disconnect()
+        bitfinex.disconnect()
+    finally:
+        for process in (binance_process, bitfinex_process):
+            process.terminate()
+            process.wait()
+    print('binance and bitfinex at %d updates/s each for %d s' % (RATE, SECONDS))
+    print('%14s %10s %10s %10s %10s %10s' % ('stage', 'count', 'p50 us', 'p99 us', 'p999 us', 'max us'))
+    for stage in StageTracer.STAGES:
+        data = stat[stage]
+        print('%14s %10d %10d %10d %10d %10d' % (stage, data['count'], data['p50_us'], data['p99_us'], data['p999_us'], data['max_us']))
+
+
+if __name__ == '__main__':
+    main()
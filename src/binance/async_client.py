@@ -0,0 +1,243 @@
+# coding=utf-8
+
+import asyncio
+import json
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from .client import BaseClient
+from .helpers import date_to_milliseconds, interval_to_milliseconds
+from .exceptions import BinanceAPIException, BinanceRequestException, BinanceWithdrawException
+
+import logging
+log = logging.getLogger()
+
+class AsyncClient(BaseClient):
+    """asyncio counterpart of :class:`binance.client.Client`
+
+    Same constants, method names and signing (``_generate_signature``,
+    ``_order_params``), every REST method is a coroutine instead. Requests
+    share one aiohttp session whose connector keeps up to ``pool_size``
+    keep-alive connections, so independent calls can run concurrently:
+
+    .. code-block:: python
+
+        client = await AsyncClient.create(api_key, api_secret)
+        open_orders, account = await asyncio.gather(client.get_open_orders(), client.get_account())
+
+    The session belongs to the event loop it was created on, create the
+    client with :meth:`create` on that loop and :meth:`close` it there.
+    It has the REST api only, websocket streams are served by
+    btcbot.aio.AsyncTransport.
+
+    """
+
+    def __init__(self, api_key, api_secret, requests_params=None, api_url=None, pool_size=10, rate_limiter=None):
+        """Use :meth:`create`, which also opens the session and pre-warms it
+
+        :param api_key: Api Key
+        :type api_key: str.
+        :param api_secret: Api Secret
+        :type api_secret: str.
+        :param requests_params: optional - Dictionary of aiohttp request params to use for all calls
+        :type requests_params: dict.
+        :param api_url: optional - REST base url replacing API_URL, e.g. a local mock server
+        :type api_url: str.
+        :param pool_size: optional - Keep-alive connections kept open
+        :type pool_size: int.
+        :param rate_limiter: optional - Request weight bucket api calls wait on, shared with the threaded Client
+        :type rate_limiter: binance.ratelimit.RateLimiter.
+
+        """
+        if aiohttp is None:
+            raise RuntimeError('AsyncClient needs the aiohttp package')
+
+        super(AsyncClient, self).__init__(api_key, api_secret, requests_params, api_url, rate_limiter)
+        self._pool_size = pool_size
+        self.session = None
+
+    @classmethod
+    async def create(cls, api_key, api_secret, **kwargs):
+        """Creates the client on the running loop and pings, like :class:`binance.client.Client` does on init
+
+        :returns: AsyncClient
+
+        """
+        self = cls(api_key, api_secret, **kwargs)
+        self.session = self._init_session()
+        # init DNS and SSL cert, and leave a connection in the pool
+        await self.ping()
+        return self
+
+    def _init_session(self):
+
+        connector = aiohttp.TCPConnector(limit=self._pool_size)
+        return aiohttp.ClientSession(connector=connector,
+                                     headers={'Accept': 'application/json',
+                                              'User-Agent': 'binance/python',
+                                              'X-MBX-APIKEY': self.API_KEY})
+
+    async def _request(self, method, uri, signed, force_params=False, **kwargs):
+
+        kwargs = self._get_request_kwargs(method, signed, force_params, **kwargs)
+        kwargs['timeout'] = aiohttp.ClientTimeout(total=kwargs['timeout'])
+        # aiohttp takes strings only, requests drops None values
+        for name in ('data', 'params'):
+            if name in kwargs:
+                items = kwargs[name].items() if isinstance(kwargs[name], dict) else kwargs[name]
+                kwargs[name] = [(key, str(value)) for key, value in items if value is not None]
+
+        async with self.session.request(method.upper(), uri, **kwargs) as response:
+            return await self._handle_response(response)
+
+    async def _request_api(self, method, path, signed=False, version=BaseClient.PUBLIC_API_VERSION, **kwargs):
+        uri = self._create_api_uri(path, signed, version)
+
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire_async(*self._request_cost(method, path, kwargs.get('data')))
+        return await self._request(method, uri, signed, **kwargs)
+
+    async def _handle_response(self, response):
+        """Internal helper for handling API responses from the Binance server.
+        Raises the appropriate exceptions when necessary; otherwise, returns the
+        response.
+        """
+        text = await response.text()
+        if not str(response.status).startswith('2'):
+            raise BinanceAPIException(response, response.status, text)
+        try:
+            return json.loads(text)
+        except ValueError:
+            raise BinanceRequestException('Invalid Response: %s' % text)
+
+    # Endpoints post-processing a response, the others return the coroutine of _get, _post...
+
+    async def get_symbol_info(self, symbol):
+        """Return information about a symbol, see :meth:`Client.get_symbol_info`"""
+
+        res = await self._get('exchangeInfo')
+
+        for item in res['symbols']:
+            if item['symbol'] == symbol.upper():
+                return item
+
+        return None
+
+    async def aggregate_trade_iter(self, symbol, start_str=None, last_id=None):
+        """Async iterator over aggregate trade data, see :meth:`Client.aggregate_trade_iter`
+
+        .. code-block:: python
+
+            async for trade in client.aggregate_trade_iter('ETHBTC', '30 minutes ago UTC'):
+                ...
+
+        """
+        if start_str is not None and last_id is not None:
+            raise ValueError(
+                'start_time and last_id may not be simultaneously specified.')
+
+        if last_id is None:
+            if start_str is None:
+                trades = await self.get_aggregate_trades(symbol=symbol, fromId=0)
+            else:
+                start_ts = date_to_milliseconds(start_str)
+                trades = await self.get_aggregate_trades(
+                    symbol=symbol,
+                    startTime=start_ts,
+                    endTime=start_ts + (1000 * 86400 / 2))
+            for t in trades:
+                yield t
+            last_id = trades[-1][self.AGG_ID]
+
+        while True:
+            trades = await self.get_aggregate_trades(symbol=symbol, fromId=last_id)
+            # fromId=n returns a set starting with id n, which was already yielded
+            trades = trades[1:]
+            if len(trades) == 0:
+                return
+            for t in trades:
+                yield t
+            last_id = trades[-1][self.AGG_ID]
+
+    async def get_historical_klines(self, symbol, interval, start_str, end_str=None):
+        """Get Historical Klines from Binance, see :meth:`Client.get_historical_klines`
+
+        :return: list of OHLCV values
+
+        """
+        output_data = []
+        limit = 500
+        timeframe = interval_to_milliseconds(interval)
+        start_ts = date_to_milliseconds(start_str)
+        end_ts = None
+        if end_str:
+            end_ts = date_to_milliseconds(end_str)
+
+        idx = 0
+        # it can be difficult to know when a symbol was listed on Binance so allow start time to be before list date
+        symbol_existed = False
+        while True:
+            temp_data = await self.get_klines(
+                symbol=symbol,
+                interval=interval,
+                limit=limit,
+                startTime=start_ts,
+                endTime=end_ts
+            )
+
+            if not symbol_existed and len(temp_data):
+                symbol_existed = True
+
+            if symbol_existed:
+                output_data += temp_data
+                start_ts = temp_data[-1][0]
+
+            idx += 1
+            if len(temp_data) < limit:
+                break
+
+            start_ts += timeframe
+
+            # sleep after every 3rd call to be kind to the API
+            if idx % 3 == 0:
+                await asyncio.sleep(1)
+
+        return output_data
+
+    async def get_asset_balance(self, asset, **params):
+        """Get current asset balance, see :meth:`Client.get_asset_balance`"""
+        res = await self.get_account(**params)
+        if "balances" in res:
+            for bal in res['balances']:
+                if bal['asset'].lower() == asset.lower():
+                    return bal
+        return None
+
+    async def get_account_status(self, **params):
+        """Get account status detail, see :meth:`Client.get_account_status`"""
+        res = await self._request_withdraw_api('get', 'accountStatus.html', True, data=params)
+        if not res['success']:
+            raise BinanceWithdrawException(res['msg'])
+        return res
+
+    async def withdraw(self, **params):
+        """Submit a withdraw request, see :meth:`Client.withdraw`"""
+        if 'asset' in params and 'name' not in params:
+            params['name'] = params['asset']
+        res = await self._request_withdraw_api('post', 'withdraw.html', True, data=params)
+        if not res['success']:
+            raise BinanceWithdrawException(res['msg'])
+        return res
+
+    async def stream_get_listen_key(self):
+        """Start a new user data stream and return the listen key, see :meth:`Client.stream_get_listen_key`"""
+        res = await self._post('userDataStream', False, data={})
+        return res['listenKey']
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
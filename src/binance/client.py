@@ -4,9 +4,13 @@ import hashlib
 import hmac
 import requests
 import time
-from multiprocessing import Queue
+try:
+    from queue import SimpleQueue
+except ImportError:  # python < 3.7
+    from queue import Queue as SimpleQueue
 from operator import itemgetter
 from .helpers import date_to_milliseconds, interval_to_milliseconds
+from .ratelimit import request_weight, request_priority
 from .exceptions import BinanceAPIException, BinanceRequestException, BinanceWithdrawException
 from .connection import WebSocketConnection
 from threading import Thread, Event, Timer
@@ -14,7 +18,12 @@ from threading import Thread, Event, Timer
 import logging
 log = logging.getLogger()
 
-class Client(object):
+class BaseClient(object):
+    """REST endpoints and request signing, shared by :class:`Client` and
+    :class:`binance.async_client.AsyncClient`.
+
+    """
+
     STREAM_URL = 'wss://stream.binance.com:9443/'
     API_URL = 'https://api.binance.com/api'
     WITHDRAW_API_URL = 'https://api.binance.com/wapi'
@@ -78,8 +87,8 @@ class Client(object):
     AGG_BUYER_MAKES = 'm'
     AGG_BEST_MATCH = 'M'
 
-    def __init__(self, api_key, api_secret, requests_params=None):
-        """Binance API Client constructor
+    def __init__(self, api_key, api_secret, requests_params=None, api_url=None, rate_limiter=None):
+        """Binance REST API constructor
 
         :param api_key: Api Key
         :type api_key: str.
@@ -87,23 +96,19 @@ class Client(object):
         :type api_secret: str.
         :param requests_params: optional - Dictionary of requests params to use for all calls
         :type requests_params: dict.
+        :param api_url: optional - REST base url replacing API_URL, e.g. a local mock server
+        :type api_url: str.
+        :param rate_limiter: optional - Request weight bucket api calls wait on, shared by the clients of an account
+        :type rate_limiter: binance.ratelimit.RateLimiter.
 
         """
 
         self.API_KEY = api_key
         self.API_SECRET = api_secret
-        self.session = self._init_session()
+        if api_url:
+            self.API_URL = api_url
         self._requests_params = requests_params
-
-        self.queue = Queue()
-        self._connection_list = {}
-        self._user_listen_key = None
-
-        self._keepalive_timer = None
-        self._keepalive_interval = 120
-
-        # init DNS and SSL cert
-        self.ping()
+        self.rate_limiter = rate_limiter
 
     def _init_session(self):
 
@@ -150,7 +155,7 @@ class Client(object):
             params.append(('signature', data['signature']))
         return params
 
-    def _request(self, method, uri, signed, force_params=False, **kwargs):
+    def _get_request_kwargs(self, method, signed, force_params=False, **kwargs):
 
         # set default requests timeout
         kwargs['timeout'] = 10
@@ -183,12 +188,23 @@ class Client(object):
             kwargs['params'] = kwargs['data']
             del(kwargs['data'])
 
+        return kwargs
+
+    def _request(self, method, uri, signed, force_params=False, **kwargs):
+
+        kwargs = self._get_request_kwargs(method, signed, force_params, **kwargs)
         response = getattr(self.session, method)(uri, **kwargs)
         return self._handle_response(response)
 
+    def _request_cost(self, method, path, data):
+        """(weight, priority) the rate limiter is asked for before an api call"""
+        return request_weight(path, data), request_priority(method, path)
+
     def _request_api(self, method, path, signed=False, version=PUBLIC_API_VERSION, **kwargs):
         uri = self._create_api_uri(path, signed, version)
 
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(*self._request_cost(method, path, kwargs.get('data')))
         return self._request(method, uri, signed, **kwargs)
 
     def _request_withdraw_api(self, method, path, signed=False, **kwargs):
@@ -1788,11 +1804,60 @@ class Client(object):
         }
         return self._delete('userDataStream', False, data=params)
 
+class Client(BaseClient):
+    """Binance REST API with a requests session, plus the websocket streams put on ``queue``"""
+
+    def __init__(self, api_key, api_secret, requests_params=None, queue_factory=None, json_loads=None, recorder=None,
+                 api_url=None, stream_url=None, rate_limiter=None, decode_bytes=False):
+        """Binance API Client constructor
+
+        :param api_key: Api Key
+        :type api_key: str.
+        :param api_secret: Api Secret
+        :type api_secret: str.
+        :param requests_params: optional - Dictionary of requests params to use for all calls
+        :type requests_params: dict.
+        :param queue_factory: optional - Callable creating the queue stream messages are put on,
+            defaults to queue.SimpleQueue
+        :type queue_factory: callable.
+        :param json_loads: optional - Callable decoding stream frames, defaults to json.loads
+        :type json_loads: callable.
+        :param recorder: optional - Frame recorder the raw stream frames are handed to
+        :type recorder: btcbot.recorder.FrameRecorder.
+        :param api_url: optional - REST base url replacing API_URL, e.g. a local mock server
+        :type api_url: str.
+        :param stream_url: optional - Websocket base url replacing STREAM_URL
+        :type stream_url: str.
+        :param rate_limiter: optional - Request weight bucket api calls wait on, shared by the clients of an account
+        :type rate_limiter: binance.ratelimit.RateLimiter.
+        :param decode_bytes: optional - Hand stream frames to json_loads as undecoded bytes
+        :type decode_bytes: bool.
+
+        """
+
+        super(Client, self).__init__(api_key, api_secret, requests_params, api_url, rate_limiter)
+        if stream_url:
+            self.STREAM_URL = stream_url
+        self.session = self._init_session()
+
+        self.queue = queue_factory() if queue_factory else SimpleQueue()
+        self._json_loads = json_loads
+        self._decode_bytes = decode_bytes
+        self._recorder = recorder
+        self._connection_list = {}
+        self._user_listen_key = None
+
+        self._keepalive_timer = None
+        self._keepalive_interval = 120
+
+        # init DNS and SSL cert
+        self.ping()
+
     def start_user_socket(self):
         if self._user_listen_key:
             return None
         self._user_listen_key = self.stream_get_listen_key()
-        conn_key = self._start_socket(self._user_listen_key)
+        conn_key = self._start_socket(self._user_listen_key, stream='binance/user')
         self._start_timers()
         return conn_key
 
@@ -1802,12 +1867,13 @@ class Client(object):
             path = '{}{}'.format(path, depth)
         return self._start_socket(path)
 
-    def _start_socket(self, path, prefix='ws/'):
+    def _start_socket(self, path, prefix='ws/', stream=None):
         if path in self._connection_list:
             return False
 
         url = self.STREAM_URL + prefix + path
-        connection = WebSocketConnection(url=url, queue=self.queue)
+        connection = WebSocketConnection(url=url, queue=self.queue, json_loads=self._json_loads,
+                                         decode_bytes=self._decode_bytes, recorder=self._recorder, stream=stream if stream else 'binance/' + path)
         self._connection_list[path] = connection
         connection.start()
         return path
@@ -1821,6 +1887,7 @@ class Client(object):
         log.debug("_start_timers()")
         self._stop_timers()
         self._keepalive_timer = Timer(self._keepalive_interval, self._keepalive_user_socket)
+        self._keepalive_timer.name = 'binance.keepalive'
         self._keepalive_timer.start()
 
     def _keepalive_user_socket(self):
@@ -15,10 +15,18 @@ class WebSocketConnection(Thread):
 
     def __init__(self, queue, url, *args, timeout=None, sslopt=None,
                  http_proxy_host=None, http_proxy_port=None, http_proxy_auth=None, http_no_proxy=None,
-                 reconnect_interval=None, **kwargs):
+                 reconnect_interval=None, json_loads=None, decode_bytes=False, recorder=None, stream=None, **kwargs):
 
         self.queue = queue
         self.url = url
+        self.json_loads = json_loads if json_loads else json.loads
+        # frames handed to json_loads as undecoded bytes, for the decoders parsing those directly
+        self.decode_bytes = decode_bytes
+
+        # Raw frame recording, under the url unless a stream name is given
+        self.recorder = recorder
+        self.stream = stream if stream else url
+        self.stream_id = recorder.stream_id(self.stream) if recorder else None
 
         # Connection Settings
         self.socket = None
@@ -36,12 +44,16 @@ class WebSocketConnection(Thread):
         self.reconnect_required = Event()
         self.reconnect_interval = reconnect_interval if reconnect_interval else 10
 
+        # Counters read by the metrics exporter, plain ints: no lock on the hot path
+        self.message_count = 0
+        self.reconnect_count = 0
+
         # Tracks Websocket Connection
         self.connection_timeout_timer = None
         self.connection_timeout = timeout if timeout else 30
 
-        # Call init of Thread and pass remaining args and kwargs
-        Thread.__init__(self)
+        # Named after the stream, profiles and thread dumps tell them apart
+        Thread.__init__(self, name=self.stream + '.connection')
         self.daemon = True
 
     def disconnect(self):
@@ -91,16 +103,21 @@ class WebSocketConnection(Thread):
                         http_proxy_host=self.http_proxy_host,
                         http_proxy_port=self.http_proxy_port,
                         http_proxy_auth=self.http_proxy_auth,
-                        http_no_proxy=self.http_no_proxy)
+                        http_no_proxy=self.http_no_proxy,
+                        skip_utf8_validation=self.decode_bytes)
 
 
     def _on_message(self, ws, message):
+        # with a third party decoder frames arrive as undecoded bytes, it parses them as they are
         raw, received_at = message, time.time()
+        self.message_count += 1
+        if self.recorder is not None:
+            self.recorder.record(self.stream_id, raw, received_at)
         log.debug("_on_message(): Received new message %s at %s",
                        raw, received_at)
         try:
-            data = json.loads(raw)
-        except json.JSONDecodeError:
+            data = self.json_loads(raw)
+        except ValueError:
             # Something wrong with this data, log and discard
             return
 
@@ -116,6 +133,7 @@ class WebSocketConnection(Thread):
         self.is_connected.set()
         self._stop_connection_timeout_timer()
         if self.reconnect_required.is_set():
+            self.reconnect_count += 1
             log.info("_on_open(): Connection re_connected")
 
     def _on_error(self, ws, error):
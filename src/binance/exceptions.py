@@ -1,20 +1,24 @@
 # coding=utf-8
+import json
 
 
 class BinanceAPIException(Exception):
 
     LISTENKEY_NOT_EXIST = '-1125'
 
-    def __init__(self, response):
+    def __init__(self, response, status_code=None, text=None):
+        """``status_code`` and ``text`` are passed by the AsyncClient, its responses are read with await"""
         self.status_code = 0
+        if text is None:
+            text = response.text
         try:
-            json_res = response.json()
+            json_res = json.loads(text)
         except ValueError:
-            self.message = 'Invalid JSON error message from Binance: {}'.format(response.text)
+            self.message = 'Invalid JSON error message from Binance: {}'.format(text)
         else:
             self.code = json_res['code']
             self.message = json_res['msg']
-        self.status_code = response.status_code
+        self.status_code = status_code if status_code is not None else response.status_code
         self.response = response
         self.request = getattr(response, 'request', None)
 
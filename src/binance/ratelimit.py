@@ -0,0 +1,199 @@
+# coding=utf-8
+
+import asyncio
+import time
+from threading import Condition
+
+PRIORITY_ORDER = 0
+PRIORITY_DEFAULT = 1
+PRIORITY_BULK = 2
+
+PRIORITY_NAMES = {
+    PRIORITY_ORDER: 'order',
+    PRIORITY_DEFAULT: 'default',
+    PRIORITY_BULK: 'bulk',
+}
+
+# request weight of the api endpoints, 1 when not listed
+ENDPOINT_WEIGHTS = {
+    'historicalTrades': 5,
+    'allOrders': 5,
+    'account': 5,
+    'myTrades': 5,
+}
+
+# weight of the endpoints answering for every symbol when called without one
+ALL_SYMBOLS_WEIGHTS = {
+    'openOrders': 40,
+    'ticker/24hr': 40,
+    'ticker/price': 2,
+    'ticker/bookTicker': 2,
+}
+
+ENDPOINT_PRIORITIES = {
+    'order': PRIORITY_ORDER,
+    'klines': PRIORITY_BULK,
+    'aggTrades': PRIORITY_BULK,
+    'historicalTrades': PRIORITY_BULK,
+}
+
+def request_weight(path, params=None):
+    """Weight Binance counts for a call of the api endpoint ``path``
+
+    :param path: endpoint path as passed to Client._get, e.g. 'depth'
+    :type path: str
+    :param params: the call's parameters
+    :type params: dict
+
+    :returns: int
+
+    """
+    params = params or {}
+    if path == 'depth':
+        limit = int(params.get('limit') or 100)
+        if limit <= 100:
+            return 1
+        if limit <= 500:
+            return 5
+        return 10
+    if path in ALL_SYMBOLS_WEIGHTS and not params.get('symbol'):
+        return ALL_SYMBOLS_WEIGHTS[path]
+    return ENDPOINT_WEIGHTS.get(path, 1)
+
+def request_priority(method, path):
+    """Priority class of a call, orders first and history downloads last
+
+    :returns: PRIORITY_ORDER, PRIORITY_DEFAULT or PRIORITY_BULK
+
+    """
+    if path == 'order' and method != 'get':
+        return PRIORITY_ORDER
+    if path == 'order':
+        return PRIORITY_DEFAULT
+    return ENDPOINT_PRIORITIES.get(path, PRIORITY_DEFAULT)
+
+class RateLimiter(object):
+    """Token bucket of request weight shared by every client of an account
+
+    The bucket holds ``weight_per_minute`` tokens and refills continuously,
+    a call takes its weight out or waits until it can. Waiters are served
+    by priority class: nothing of a lower class is let through while a
+    call of a higher class waits, and bulk calls leave ``reserve`` tokens
+    in the bucket, so an order never queues behind a history download.
+
+    Both the threaded :class:`binance.client.Client` (acquire) and the
+    :class:`binance.async_client.AsyncClient` (acquire_async) take from the
+    same bucket. Time spent waiting is added up per class, see stat().
+
+    """
+
+    def __init__(self, weight_per_minute=1200, reserve=None):
+        """
+        :param weight_per_minute: Request weight allowed per minute
+        :type weight_per_minute: int
+        :param reserve: optional - Tokens bulk calls leave for the others, a tenth of the bucket by default
+        :type reserve: int
+
+        """
+        self.capacity = float(weight_per_minute)
+        self.rate = self.capacity / 60
+        self.reserve = self.capacity / 10 if reserve is None else float(reserve)
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self._cond = Condition()
+        # priority -> calls waiting
+        self._waiting = {priority: 0 for priority in PRIORITY_NAMES}
+        self.blocked_seconds = {priority: 0.0 for priority in PRIORITY_NAMES}
+        self.blocked_count = {priority: 0 for priority in PRIORITY_NAMES}
+        self.weight_used = {priority: 0 for priority in PRIORITY_NAMES}
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _try_take(self, weight, priority):
+        """Takes the tokens or returns the seconds until they could be there, holding the lock"""
+        now = time.monotonic()
+        self._refill(now)
+        floor = self.reserve if priority == PRIORITY_BULK else 0
+        ahead = any(self._waiting[higher] for higher in PRIORITY_NAMES if higher < priority)
+        if not ahead and self.tokens - weight >= floor:
+            self.tokens -= weight
+            self.weight_used[priority] += weight
+            return 0
+        missing = max(weight + floor - self.tokens, 0)
+        # with a waiter ahead, look again once it may have had its turn
+        return max(missing / self.rate, 0.005 if ahead else 0.001)
+
+    def _cap(self, weight):
+        # a call heavier than the bucket would never fit
+        return min(weight, self.capacity - self.reserve)
+
+    def acquire(self, weight=1, priority=PRIORITY_DEFAULT):
+        """Blocks until ``weight`` tokens are taken
+
+        :returns: seconds blocked
+
+        """
+        weight = self._cap(weight)
+        with self._cond:
+            delay = self._try_take(weight, priority)
+            if not delay:
+                return 0
+            begin = time.monotonic()
+            self._waiting[priority] += 1
+            try:
+                while delay:
+                    self._cond.wait(delay)
+                    delay = self._try_take(weight, priority)
+            finally:
+                self._waiting[priority] -= 1
+                self._cond.notify_all()
+            return self._blocked(priority, time.monotonic() - begin)
+
+    async def acquire_async(self, weight=1, priority=PRIORITY_DEFAULT):
+        """Waits on the event loop until ``weight`` tokens are taken
+
+        :returns: seconds blocked
+
+        """
+        weight = self._cap(weight)
+        with self._cond:
+            delay = self._try_take(weight, priority)
+            if not delay:
+                return 0
+            self._waiting[priority] += 1
+        begin = time.monotonic()
+        try:
+            while delay:
+                await asyncio.sleep(delay)
+                with self._cond:
+                    delay = self._try_take(weight, priority)
+        finally:
+            with self._cond:
+                self._waiting[priority] -= 1
+                self._cond.notify_all()
+                blocked = self._blocked(priority, time.monotonic() - begin)
+        return blocked
+
+    def _blocked(self, priority, seconds):
+        self.blocked_seconds[priority] += seconds
+        self.blocked_count[priority] += 1
+        return seconds
+
+    def stat(self):
+        """Tokens and per class counters, read without the lock the calls wait on
+
+        Attributes a call changes meanwhile may be off by that call.
+        """
+        data = {}
+        tokens, updated = self.tokens, self._updated
+        data['tokens'] = min(self.capacity, tokens + max(time.monotonic() - updated, 0) * self.rate)
+        for priority, name in PRIORITY_NAMES.items():
+            data[name] = {
+                'weight': self.weight_used[priority],
+                'blocked': self.blocked_count[priority],
+                'blocked_seconds': self.blocked_seconds[priority],
+                'waiting': self._waiting[priority],
+            }
+        return data
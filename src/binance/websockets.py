@@ -22,7 +22,7 @@ class BinanceClientProtocol(WebSocketClientProtocol):
     def onMessage(self, payload, isBinary):
         if not isBinary:
             try:
-                payload_obj = json.loads(payload.decode('utf8'))
+                payload_obj = self.factory.json_loads(payload)
             except ValueError:
                 pass
             else:
@@ -42,6 +42,7 @@ class BinanceReconnectingClientFactory(ReconnectingClientFactory):
 class BinanceClientFactory(WebSocketClientFactory, BinanceReconnectingClientFactory):
 
     protocol = BinanceClientProtocol
+    json_loads = staticmethod(json.loads)
     _reconnect_error_payload = {
         'e': 'error',
         'm': 'Max reconnect retries reached'
@@ -68,11 +69,13 @@ class BinanceSocketManager(threading.Thread):
 
     _user_timeout = 30 * 60  # 30 minutes
 
-    def __init__(self, client):
+    def __init__(self, client, json_loads=None):
         """Initialise the BinanceSocketManager
 
         :param client: Binance API client
         :type client: binance.Client
+        :param json_loads: optional - Callable decoding message bytes, defaults to json.loads
+        :type json_loads: callable
 
         """
         threading.Thread.__init__(self)
@@ -81,6 +84,7 @@ class BinanceSocketManager(threading.Thread):
         self._user_listen_key = None
         self._user_callback = None
         self._client = client
+        self._json_loads = json_loads
 
     def _start_socket(self, path, callback, prefix='ws/'):
         if path in self._conns:
@@ -90,6 +94,8 @@ class BinanceSocketManager(threading.Thread):
         factory = BinanceClientFactory(factory_url)
         factory.protocol = BinanceClientProtocol
         factory.callback = callback
+        if self._json_loads:
+            factory.json_loads = self._json_loads
         factory.reconnect = True
         context_factory = ssl.ClientContextFactory()
 
@@ -1,39 +1,82 @@
 import logging
 import time
-import math
 import sys
 
 from btcbot import utils
+from btcbot import scanner
 from btcbot.config import ConfigData
 from btcbot.bitfinex import Bitfinex
 from btcbot.binance import Binance
 from btcbot.data import OrderExecutor
+from btcbot.aio import AsyncTransport
+from btcbot.recorder import FrameRecorder
+from btcbot.columnar import BookSnapshotter
+from btcbot.trace import StageTracer
+from btcbot.metrics import MetricsServer
+from btcbot.profiler import Profiler
+from btcbot.strategy import StrategyThread
 
 import logging
 log = logging.getLogger()
 
 class Bot(metaclass=utils.Singleton):
 
+    scan_count = 0
+    opportunity_count = 0
+
     def start(self):
-        self.bitfinex = Bitfinex(on_order_book_update=self.on_order_book_update)
-        self.binance = Binance(on_order_book_update=self.on_order_book_update)
-        self.bitfinex.connect()
-        self.binance.connect()
-        self.order_executor = OrderExecutor()
+        config = ConfigData().get_config()
+        self.tracer = StageTracer()
+        self.tracer.enabled = config.get('trace', True)
+        self.profiler = Profiler(config.get('profile_dir') or 'profiles', interval=config.get('profile_interval', 0.005),
+                                 duration=config.get('profile_duration', 30))
+        self.recorder = None
+        if config.get('record_dir'):
+            self.recorder = FrameRecorder(config['record_dir'], compression=config.get('record_compression') or None)
+            self.recorder.start()
+        self.bitfinex = Bitfinex(on_order_book_update=self.on_order_book_update, recorder=self.recorder)
+        self.binance = Binance(on_order_book_update=self.on_order_book_update, recorder=self.recorder)
+        self.transport = None
+        if config.get('transport') == 'asyncio':
+            self.transport = AsyncTransport()
+            self.transport.start()
+        self.order_executor = OrderExecutor(transport=self.transport)
+        self.strategy = StrategyThread(self.check_arbitrage)
+        self.strategy.start()
+        if self.transport is not None:
+            self.bitfinex.connect_async(self.transport)
+            self.binance.connect_async(self.transport)
+        else:
+            self.bitfinex.connect()
+            self.binance.connect()
+        self.book_snapshotter = None
+        if config.get('book_history_dir'):
+            self.book_snapshotter = BookSnapshotter(config['book_history_dir'], [self.binance, self.bitfinex],
+                    interval=config.get('book_history_interval', 1), depth=config.get('book_history_depth', 25))
+            self.book_snapshotter.start()
+        self.metrics_server = None
+        if config.get('metrics_port'):
+            self.metrics_server = MetricsServer(self, config.get('metrics_host', '127.0.0.1'), config['metrics_port'])
+            self.metrics_server.start()
 
     def on_order_book_update(self, exchange):
         return
+        self.strategy.wake()
+
+    def check_arbitrage(self, exchange=None):
         if not self.bitfinex.order_book_ready.is_set() or not self.binance.order_book_ready.is_set():
                 return
 
+        self.scan_count += 1
         self.try_to_trade(self.binance, self.bitfinex)
         self.try_to_trade(self.bitfinex, self.binance)
+        self.tracer.mark('scan')
 
     def try_to_trade(self, exchange_buy_from, exchange_sell_to):
-        asks = exchange_buy_from.asks_book.to_list()
-        bids = exchange_sell_to.bids_book.to_list()
+        best_ask = exchange_buy_from.asks_book.best()
+        best_bid = exchange_sell_to.bids_book.best()
 
-        if not asks or not bids:
+        if best_ask is None or best_bid is None:
             return
 
         sell_price_ratio = 1 - exchange_sell_to.config['fee']
@@ -49,65 +92,81 @@ class Bot(metaclass=utils.Singleton):
                 exchange_buy_from.name, exchange_sell_to.name,
                 curency_token, curency_token_has,
                 target_token, target_token_has,
-                asks[0], bids[0],
+                best_ask, best_bid,
                 );
 
-        list = []
-        for ask in asks:
-            buy_price, amount_market_avaiable = ask
-            buy_price_cost = buy_price * buy_price_ratio
-            amount_can_buy = curency_token_has / buy_price
-
-            can_trade = False
-            for bid in bids:
-                sell_price, amount_market_require = bid
-                sell_price_income = sell_price * sell_price_ratio
-                profit_price = sell_price_income - buy_price_cost
-                profit_rate = profit_price / buy_price * 100
-                can_trade = True
-                if profit_price > 0:
-                    amounts = (amount_market_avaiable * 0.5, amount_market_require * 0.5, amount_can_buy, target_token_has)
-                    amount_can_trade = min(*amounts)
-                    amount_can_trade = math.floor(amount_can_trade * 100) / 100.0
-                    amount_can_trade = int(amount_can_trade)
-                    if amount_can_trade < 1:
-                        log.critical('determine_profit: amount_can_trade lower than 0.2: %s => %s, %s %s amount_can_trade: %s %s', exchange_buy_from.name, exchange_sell_to.name, asks[0], bids[0], amount_can_trade, amounts);
-                        continue;
-                    profit = amount_can_trade * profit_price
-                    list.append((amount_can_trade, buy_price, sell_price, profit, (ask, bid, buy_price, buy_price_cost, sell_price, sell_price_income, profit_price, profit_rate, *amounts)))
-                else:
-                    break
-            if not can_trade:
-                break
-
-        if list:
-            log.critical('determine_profit_list: %s => %s, %s %s %s', exchange_buy_from.name, exchange_sell_to.name, asks[0], bids[0], list);
-
-        if not list:
+        # the inside quotes are the most profitable pair, nothing deeper can cross if they don't
+        if best_bid[0] * sell_price_ratio - best_ask[0] * buy_price_ratio <= 0:
+            return
+
+        # the levels are read from copies the feed threads can't change halfway
+        # through the scan, an update the quotes above missed wakes the strategy
+        # thread again; the live quotes size the crossing region, only it and
+        # the level past it are copied
+        ask_limit = exchange_buy_from.asks_book.count_within(best_bid[0] * sell_price_ratio / buy_price_ratio) + 1
+        bid_limit = exchange_sell_to.bids_book.count_within(best_ask[0] * buy_price_ratio / sell_price_ratio) + 1
+        asks_book = exchange_buy_from.snapshot_book(exchange_buy_from.asks_book, ask_limit)
+        bids_book = exchange_sell_to.snapshot_book(exchange_sell_to.bids_book, bid_limit)
+        best_ask = asks_book.best()
+        best_bid = bids_book.best()
+        if best_ask is None or best_bid is None:
             return
+
+        # the region grew between the quotes and the copies, every copied level
+        # crosses and the end of the region is not in the copy: copy it whole
+        if len(asks_book) == ask_limit and asks_book.count_within(best_bid[0] * sell_price_ratio / buy_price_ratio) >= ask_limit:
+            asks_book = exchange_buy_from.snapshot_book(exchange_buy_from.asks_book)
+            best_ask = asks_book.best()
+        if len(bids_book) == bid_limit and bids_book.count_within(best_ask[0] * buy_price_ratio / sell_price_ratio) >= bid_limit:
+            bids_book = exchange_sell_to.snapshot_book(exchange_sell_to.bids_book)
+
+        config = ConfigData().get_config()
+        if config.get('sizing') == 'sweep':
+            asks, bids = scanner.crossing_levels(asks_book, bids_book, buy_price_ratio, sell_price_ratio, config.get('sweep_max_levels'))
+            trade = scanner.find_sweep(asks, bids, buy_price_ratio, sell_price_ratio, curency_token_has, target_token_has)
+        else:
+            asks, bids = scanner.crossing_levels(asks_book, bids_book, buy_price_ratio, sell_price_ratio)
+            trade = scanner.find_trade(asks, bids, buy_price_ratio, sell_price_ratio, curency_token_has, target_token_has)
+        if trade is None:
+            return
+        self.opportunity_count += 1
+
+        log.critical('determine_profit_list: %s => %s, %s %s %s', exchange_buy_from.name, exchange_sell_to.name, best_ask, best_bid, trade);
+
         if self.order_executor.is_busy.is_set():
             log.critical('determine_profit: order_executor is busy')
             return
-        list.sort(key=lambda tup: tup[0])
         log.critical('determine_profit: %s %s', exchange_buy_from, exchange_sell_to)
-        operate_amount, buy_price, sell_price, *_ = list[0]
+        operate_amount, buy_price, sell_price, profit = trade
         self.order_executor.do_trade(exchange_buy_from, exchange_sell_to, operate_amount, buy_price, sell_price)
 
     def test_trade(self):
         exchange_buy_from = self.binance
         exchange_sell_to = self.bitfinex
         operate_amount = 0.2
-        buy_price = exchange_buy_from.asks_book.to_list()[0][0]
-        sell_price = exchange_sell_to.bids_book.to_list()[0][0]
+        buy_price, _ = exchange_buy_from.asks_book.best()
+        sell_price, _ = exchange_sell_to.bids_book.best()
         self.order_executor.do_trade(exchange_buy_from, exchange_sell_to, operate_amount, buy_price, sell_price)
 
     def stop(self):
+        self.profiler.stop()
+        self.strategy.stop()
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+        if self.book_snapshotter is not None:
+            self.book_snapshotter.stop()
         self.bitfinex.disconnect()
         self.binance.disconnect()
+        if self.transport is not None:
+            self.transport.stop()
+        if self.recorder is not None:
+            self.recorder.close()
 
     def stat(self):
 
         data = {}
         data['binance'] = self.binance.stat()
         data['bitfinex'] = self.bitfinex.stat()
+        data['strategy'] = self.strategy.stat()
+        data['trace'] = self.tracer.stat()
         return data
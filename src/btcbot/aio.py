@@ -0,0 +1,174 @@
+import asyncio
+import json
+import time
+from threading import Thread
+
+try:
+    import websockets
+except ImportError:
+    websockets = None
+
+import logging
+log = logging.getLogger()
+
+class EventLoopThread(Thread):
+    """Runs an asyncio event loop on a thread of its own."""
+
+    def __init__(self, *args, **kwargs):
+        super(EventLoopThread, self).__init__(*args, **kwargs)
+        self.daemon = True
+        self.loop = asyncio.new_event_loop()
+
+    def run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro):
+        """Schedules a coroutine from any thread, returns a concurrent Future."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def call(self, coro, timeout=None):
+        """Runs a coroutine on the loop and waits for its result."""
+        return self.submit(coro).result(timeout)
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.join(timeout=1)
+
+class DirectQueue:
+    """Queue stand-in handing every put() straight to a handler.
+
+    Lets the btfxwss QueueProcessor routing deliver into the exchange
+    handlers without a queue and a poller thread in between.
+    """
+
+    def __init__(self, handler):
+        self.put = handler
+
+class AsyncStream:
+    """A websocket stream served by the AsyncTransport loop.
+
+    Connects, decodes every frame and hands it to ``on_message`` as
+    ``(data, received_at)``. Protocol pings keep the socket alive, and when
+    nothing at all arrives for ``timeout`` seconds the stream reconnects,
+    like the connection timers of the thread based connections. With a
+    ``recorder`` every raw frame is recorded under the stream name.
+    """
+
+    def __init__(self, name, url, on_message, on_open=None, json_loads=None, recorder=None,
+                 timeout=30, ping_interval=20, reconnect_interval=10):
+        self.name = name
+        self.url = url
+        self.json_loads = json_loads if json_loads else json.loads
+        self.recorder = recorder
+        self.stream_id = recorder.stream_id(name) if recorder else None
+        self.on_message = on_message
+        self.on_open = on_open
+        self.timeout = timeout
+        self.ping_interval = ping_interval
+        self.reconnect_interval = reconnect_interval
+        self.reconnect_count = 0
+        self.message_count = 0
+        self.socket = None
+        self._closed = False
+
+    async def run(self):
+        while not self._closed:
+            try:
+                async with websockets.connect(self.url, ping_interval=self.ping_interval, max_queue=None) as socket:
+                    self.socket = socket
+                    log.info('stream %s connected: %s', self.name, self.url)
+                    if self.on_open is not None:
+                        await self.on_open(self)
+                    while True:
+                        raw = await asyncio.wait_for(socket.recv(), self.timeout)
+                        received_at = time.time()
+                        self.message_count += 1
+                        if self.recorder is not None:
+                            self.recorder.record(self.stream_id, raw, received_at)
+                        try:
+                            data = self.json_loads(raw)
+                        except ValueError:
+                            continue
+                        try:
+                            self.on_message(data, received_at)
+                        except Exception as e:
+                            log.exception(e)
+            except asyncio.CancelledError:
+                raise
+            except asyncio.TimeoutError:
+                log.info('stream %s timed out', self.name)
+            except Exception as e:
+                log.info('stream %s closed: %s', self.name, e)
+            self.socket = None
+            if not self._closed:
+                self.reconnect_count += 1
+                log.info('Attempting to connect again in %s seconds: %s', self.reconnect_interval, self.url)
+                await asyncio.sleep(self.reconnect_interval)
+
+    async def send(self, payload):
+        if self.socket is None:
+            log.error('send(): stream %s not connected, dropped: %s', self.name, payload)
+            return
+        await self.socket.send(json.dumps(payload))
+
+    async def reconnect(self):
+        if self.socket is not None:
+            await self.socket.close()
+
+    async def close(self):
+        self._closed = True
+        if self.socket is not None:
+            await self.socket.close()
+
+class AsyncTransport(EventLoopThread):
+    """One asyncio loop serving the websocket streams of every exchange.
+
+    Replaces the connection, QueueProcessor and QueuePoller threads of the
+    default transport: frames are decoded on the loop and handed straight to
+    the exchange handlers, heartbeats and reconnects run on the same loop.
+    Blocking calls (REST keepalives) go to the loop's executor.
+    """
+
+    def __init__(self, *args, **kwargs):
+        if websockets is None:
+            raise RuntimeError('the asyncio transport needs the websockets package')
+        super(AsyncTransport, self).__init__(*args, name='AsyncTransport', **kwargs)
+        self.streams = {}
+        self._tasks = []
+
+    def add_stream(self, name, url, on_message, on_open=None, **kwargs):
+        stream = AsyncStream(name, url, on_message, on_open=on_open, **kwargs)
+        self.streams[name] = stream
+        self._tasks.append(self.submit(stream.run()))
+        return stream
+
+    def send(self, name, payload):
+        """Sends a payload on a stream, callable from any thread."""
+        return self.submit(self.streams[name].send(payload))
+
+    def reconnect(self, name):
+        return self.submit(self.streams[name].reconnect())
+
+    def every(self, interval, callback):
+        """Calls a blocking callback every ``interval`` seconds off the loop."""
+        async def repeat():
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    await self.loop.run_in_executor(None, callback)
+                except Exception as e:
+                    log.exception(e)
+        self._tasks.append(self.submit(repeat()))
+
+    def close(self, name=None):
+        names = [name] if name is not None else list(self.streams)
+        for name in names:
+            stream = self.streams.pop(name)
+            self.call(stream.close(), timeout=5)
+
+    def stop(self):
+        self.close()
+        for task in self._tasks:
+            task.cancel()
+        super(AsyncTransport, self).stop()
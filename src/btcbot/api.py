@@ -20,13 +20,11 @@ class API:
         return data
 
     def test_buy(exchange):
-        asks = exchange.asks_book.to_list()
-        price, amount = asks[0]
+        price, amount = exchange.asks_book.best()
         ret = exchange.new_order(0.2, price)
         return ret
 
     def test_sell(exchange):
-        bids = exchange.bids_book.to_list()
-        price, amount = bids[0]
+        price, amount = exchange.bids_book.best()
         ret = exchange.new_order(-0.2, price)
         return ret
@@ -1,10 +1,12 @@
+import asyncio
 import time
 from threading import Thread, Event, Timer
 
 from binance.client import Client as BinanceClient
+from binance.async_client import AsyncClient as BinanceAsyncClient
+from binance.ratelimit import RateLimiter
 from binance.websockets import BinanceSocketManager
 
-from multiprocessing import Queue
 from btcbot import utils
 from btcbot.data import QueuePoller
 from btcbot.exchange import Exchange
@@ -12,6 +14,32 @@ from btcbot.exchange import Exchange
 import logging
 log = logging.getLogger()
 
+class LevelParser:
+    """Turns Binance ``[price, qty, ...]`` string levels into float columns.
+
+    The book keeps moving around the same few prices, so parsed price
+    strings are remembered; the cache is dropped once it grows past
+    ``max_size`` entries.
+    """
+
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self._prices = {}
+
+    def parse(self, levels):
+        if len(self._prices) >= self.max_size:
+            self._prices = {}
+        cache = self._prices
+        try:
+            prices = [cache[level[0]] for level in levels]
+        except KeyError:
+            for level in levels:
+                if level[0] not in cache:
+                    cache[level[0]] = float(level[0])
+            prices = [cache[level[0]] for level in levels]
+        sizes = [float(level[1]) for level in levels]
+        return prices, sizes
+
 class Binance(Exchange):
 
     ORDER_KEYS_MAP = {
@@ -29,14 +57,29 @@ class Binance(Exchange):
         key = self.config['api_key']
         secret = self.config['api_secret']
 
-        self.client = BinanceClient(key, secret)
-        self._debpth_data_buffer = Queue()
+        # the limit is per ip, every client of the exchange takes from one bucket
+        self.rate_limiter = RateLimiter(self.config.get('rate_limit_weight', 1200))
+        self.client = self._create_client(key, secret)
+        # set by connect_async, REST calls then go out from the transport loop
+        self.async_client = None
+        self._debpth_data_buffer = self.queue_factory()
+        self._level_parser = LevelParser()
         self._load_depth_snapshot_thread = None
 
-    def new_order(self, amount, price):
+    def _create_client(self, key, secret):
+        return BinanceClient(key, secret, queue_factory=self.queue_factory, json_loads=self.json_loads,
+                             decode_bytes=self.decode_bytes, recorder=self.recorder,
+                             api_url=self.config.get('api_url'), stream_url=self.config.get('stream_url'),
+                             rate_limiter=self.rate_limiter)
+
+    def _create_async_client(self, key, secret):
+        return BinanceAsyncClient.create(key, secret, api_url=self.config.get('api_url'),
+                                         pool_size=self.config.get('rest_pool_size', 4), rate_limiter=self.rate_limiter)
+
+    def _order_data(self, amount, price):
         type = 'LIMIT'
         side = 'BUY' if amount > 0 else 'SELL'
-        data = {
+        return {
             'price': price,
             'quantity': abs(amount),
             'symbol': self.target_pair,
@@ -44,34 +87,49 @@ class Binance(Exchange):
             'side': side,
             'type': type,
         }
-        log.critical('new_order: %s', data)
-        ret = self.client.create_order(**data)
+
+    def _order_result(self, ret):
         log.critical('new_order: %s', ret)
         if ret['status'] == 'FILLED':
             return True
         else:
             return ret
 
+    def new_order(self, amount, price):
+        if self.async_client is not None:
+            return self.transport.call(self.new_order_async(amount, price))
+        data = self._order_data(amount, price)
+        log.critical('new_order: %s', data)
+        ret = self.client.create_order(**data)
+        return self._order_result(ret)
+
+    async def new_order_async(self, amount, price):
+        data = self._order_data(amount, price)
+        log.critical('new_order: %s', data)
+        ret = await self.async_client.create_order(**data)
+        return self._order_result(ret)
+
     def withdraw(self, token_type, amount, address):
         ret = self.client.withdraw(token_type, amount, address)
         return ret
 
     def _update_order_book_list(self, book, list):
-        for item in list:
-            price, amount, _ = item
-            price = float(price)
-            amount = float(amount)
-            if amount == 0:
-                book.remove(price)
-            else:
-                book.add_or_update(price, amount)
+        prices, amounts = self._level_parser.parse(list)
+        book.apply_levels(prices, amounts)
 
-    def _update_order_book(self, bid_list, ask_list):
+    def _update_order_book(self, bid_list, ask_list, notify=True):
         log.debug('_update_order_book')
-        self._update_order_book_list(self.bids_book, bid_list)
-        self._update_order_book_list(self.asks_book, ask_list)
+        self.book_version += 1
+        try:
+            self._update_order_book_list(self.bids_book, bid_list)
+            self._update_order_book_list(self.asks_book, ask_list)
+        finally:
+            # even after a bad level, an odd version would stall snapshot_book() for good
+            self.book_version += 1
+        self.book_update_count += 1
 
-        self.notify_order_book_update()
+        if notify:
+            self.notify_order_book_update()
 
     def _process_order(self, data, keys=None):
         if keys is not None:
@@ -96,41 +154,87 @@ class Binance(Exchange):
 
     def connect(self):
         self._load_init_data()
-        self._new_queue_poller(self.client.queue, self.process_message)
+        self._new_queue_poller(self.client.queue, self.process_messages, 'stream', batch=True)
         self.client.start_depth_socket(self.target_pair)
         self.client.start_user_socket()
 
+    def connect_async(self, transport):
+        self.transport = transport
+        key = self.config['api_key']
+        secret = self.config['api_secret']
+        self.async_client = transport.call(self._create_async_client(key, secret))
+        transport.call(self._load_init_data_async())
+        self.client._user_listen_key = transport.call(self.async_client.stream_get_listen_key())
+
+        url = self.client.STREAM_URL + 'ws/'
+        transport.add_stream('binance_depth', url + self.target_pair.lower() + '@depth', self._on_stream_message, json_loads=self.json_loads, recorder=self.recorder)
+        transport.add_stream('binance_user', url + self.client._user_listen_key, self._on_stream_message, json_loads=self.json_loads, recorder=self.recorder)
+        transport.every(self.client._keepalive_interval, self.client._keepalive_user_socket)
+
+    def _on_stream_message(self, data, received_at):
+        self.tracer.begin(received_at)
+        self.process_message((data, received_at))
+
     def _load_init_data(self):
         open_orders = self.client.get_open_orders()
+        my_account = self.client.get_account()
+        self._process_init_data(open_orders, my_account)
+
+    async def _load_init_data_async(self):
+        # independent calls, both requests go out at once
+        open_orders, my_account = await asyncio.gather(self.async_client.get_open_orders(), self.async_client.get_account())
+        self._process_init_data(open_orders, my_account)
+
+    def _process_init_data(self, open_orders, my_account):
         for open_order in open_orders:
             self._process_order(open_order)
         log.info('_load_init_data, open_orders: %s', open_orders)
 
-        my_account = self.client.get_account()
         log.info('_load_init_data, my_account: %s', my_account)
+        self.record_response('account', my_account)
         self._process_assets(my_account['balances'])
 
+    def _request_depth_snapshot(self):
+        self._load_depth_snapshot_thread = Thread(target=self._load_depth_data, name=self.name + '.depth_snapshot')
+        self._load_depth_snapshot_thread.start()
+
     def _load_depth_data(self):
         depth_data = self.client.get_order_book(symbol=self.target_pair)
         log.info('_load_init_data, depth_data: %s', depth_data)
+        self.record_response('depth', depth_data)
+        self._apply_depth_snapshot(depth_data)
+
+    def _apply_depth_snapshot(self, depth_data):
         last_update_id = depth_data['lastUpdateId'];
-        self._update_order_book(depth_data['bids'], depth_data['asks'])
+        self._update_order_book(depth_data['bids'], depth_data['asks'], notify=False)
         while not self._debpth_data_buffer.empty():
             item = self._debpth_data_buffer.get()
             if item['u'] <= last_update_id:
                 log.info('_load_init_data, skip: %s', item)
                 continue
             else:
-                self._update_order_book(item['b'], item['a'])
+                self._update_order_book(item['b'], item['a'], notify=False)
         self.order_book_ready.set()
+        self.notify_order_book_update()
         log.info('_load_depth_data finish');
 
-    def _new_queue_poller(self, queue, handler):
-        poller = QueuePoller(queue, handler)
+    def _new_queue_poller(self, queue, handler, name, batch=False):
+        poller = QueuePoller(queue, handler, batch=batch, name=self.name + '.' + name)
         poller.start()
         self.queue_poller_list.append(poller)
 
-    def process_message(self, msg):
+    def _connections(self):
+        return list(self.client._connection_list.values())
+
+    def process_messages(self, items):
+        """Handles a drained batch, the book is notified once after all of its updates."""
+        book_updated = False
+        for msg in items:
+            book_updated = self.process_message(msg, notify=False) or book_updated
+        if book_updated:
+            self.notify_order_book_update()
+
+    def process_message(self, msg, notify=True):
         log.debug('process_message: %s', msg)
         payload, ts = msg
         event = payload['e']
@@ -140,14 +244,20 @@ class Binance(Exchange):
             self._process_assets(payload['B'], {'f': 'free', 'a': 'asset'})
         if event == 'depthUpdate':
             if self.order_book_ready.is_set():
-                self._update_order_book(payload['b'], payload['a'])
+                self._update_order_book(payload['b'], payload['a'], notify)
+                return True
             else:
                 self._debpth_data_buffer.put(payload)
                 if self._debpth_data_buffer.qsize() >= 2 and self._load_depth_snapshot_thread is None:
-                    self._load_depth_snapshot_thread = Thread(target=self._load_depth_data)
-                    self._load_depth_snapshot_thread.start()
+                    self._request_depth_snapshot()
 
     def disconnect(self):
+        if self.transport is not None:
+            self.transport.close('binance_depth')
+            self.transport.close('binance_user')
+        if self.async_client is not None:
+            self.transport.call(self.async_client.close())
+            self.async_client = None
         self.client.close()
 
         for poller in self.queue_poller_list:
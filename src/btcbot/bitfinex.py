@@ -1,11 +1,13 @@
+import asyncio
 import time
-from multiprocessing import Queue
 from queue import Empty
 
 from btfxwss import BtfxWssClient
 from btfxwss.rest import BitfinexRestAuthClient
 
-from btcbot.data import QueuePoller
+from btcbot.aio import DirectQueue
+from btcbot.data import QueuePoller, queue_depth
+from btfxwss.connection import auth_payload
 from btcbot.exchange import Exchange
 from btcbot import utils
 
@@ -53,15 +55,21 @@ class Bitfinex(Exchange):
         super(Bitfinex, self).__init__('bitfinex', *args, **kwargs)
         key = self.config['api_key']
         secret = self.config['api_secret']
-        self.socket_client = BtfxWssClient(key, secret)
+        self.socket_client = BtfxWssClient(key, secret, queue_factory=self.queue_factory, json_loads=self.json_loads,
+                                           decode_bytes=self.decode_bytes, recorder=self.recorder, stream='bitfinex',
+                                           url=self.config.get('stream_url'))
 
-        self.rest_client = BitfinexRestAuthClient(key, secret)
+        processor = self.socket_client.queue_processor
+        processor.process = self.tracer.timed('route', processor.process)
 
-    def new_order(self, amount, price):
+        self.rest_client = BitfinexRestAuthClient(key, secret, url=self.config.get('rest_url'),
+                                                  pool_size=self.config.get('rest_pool_size', 4))
+
+    def _order_data(self, amount, price):
         type = 'EXCHANGE FOK'
         symbol = 't' + self.target_pair
         cid = int(time.time())
-        data = {
+        return {
             'cid': cid,
             'symbol': symbol,
             'type': type,
@@ -72,39 +80,65 @@ class Bitfinex(Exchange):
             'hidden': 0,
             'postonly': 0,
         }
-        log.critical('new_order: %s', data)
-        self.socket_client.new_order(data)
 
-        queue = Queue()
+    def _order_status(self, item):
+        """(done, ret) for an order status update, ret as new_order returns it."""
+        log.critical('new_order status update: %s', item)
+        status, payload = item
+        status = status.lower()
+        if status == 'place_fail':
+            return True, item
+        elif 'executed' in status:
+            return True, True
+        elif 'canceled' in status:
+            return True, item
+        return False, None
+
+    def new_order(self, amount, price):
+        data = self._order_data(amount, price)
+        cid = data['cid']
+        log.critical('new_order: %s', data)
+        # registered before sending, the answers can beat the send call back
+        queue = self.queue_factory()
         self._pending_order_list[cid] = queue
+        if self.transport is not None:
+            self.transport.send('bitfinex', [0, 'on', None, data])
+        else:
+            self.socket_client.new_order(data)
+
         ret = None
         while True:
             try:
                 item = queue.get(timeout=2)
             except Empty:
                 continue
-            log.critical('new_order status update: %s', item)
-            status, payload = item
-            status = status.lower()
-            if status == 'place_fail':
-                ret = item
-                break;
-            elif status == 'place_success':
-                continue
-            elif 'executed' in status:
-                ret = True
-                break;
-            elif 'canceled' in status:
-                ret = item
-                break;
+            done, ret = self._order_status(item)
+            if done:
+                break
         del self._pending_order_list[cid]
         return ret
 
+    async def new_order_async(self, amount, price):
+        """new_order awaited on the transport loop, the status updates arrive on that loop too."""
+        data = self._order_data(amount, price)
+        cid = data['cid']
+        log.critical('new_order: %s', data)
+        queue = asyncio.Queue()
+        self._pending_order_list[cid] = DirectQueue(queue.put_nowait)
+        try:
+            await self.transport.streams['bitfinex'].send([0, 'on', None, data])
+            while True:
+                done, ret = self._order_status(await queue.get())
+                if done:
+                    return ret
+        finally:
+            del self._pending_order_list[cid]
+
     def withdraw(self, token_type, amount, address):
         ret = self.rest_client.withdraw(token_type, amount, address)
         return ret
 
-    def _process_order_book(self, item):
+    def _apply_book_level(self, item):
         payload, ts = item
         price, count, amount = payload
         # bids
@@ -116,6 +150,17 @@ class Bitfinex(Exchange):
             book.remove(price)
         else:
             book.add_or_update(price, amount)
+        self.book_update_count += 1
+
+    def _process_order_book_batch(self, items):
+        # every level is its own item, a snapshot or a burst is applied
+        # in full before the one notification
+        self.book_version += 1
+        try:
+            for item in items:
+                self._apply_book_level(item)
+        finally:
+            self.book_version += 1
         self.order_book_ready.set()
         self.notify_order_book_update()
 
@@ -186,7 +231,15 @@ class Bitfinex(Exchange):
         ts, *_ = data
         self.candles.update(ts, data)
 
+    def _warm_rest_client(self):
+        # open the pooled connection now rather than on the first rest call
+        try:
+            self.rest_client.ping()
+        except Exception as e:
+            log.error('_warm_rest_client: %s', e)
+
     def connect(self):
+        self._warm_rest_client()
 
         target_pair = self.target_pair
         socket_client = self.socket_client
@@ -199,17 +252,112 @@ class Bitfinex(Exchange):
         socket_client.subscribe_to_order_book(target_pair)
         socket_client.subscribe_to_candles(target_pair, '1m')
 
-        self._new_queue_poller(socket_client.books(target_pair), self._process_order_book)
-        self._new_queue_poller(socket_client.account, self.process_account)
-        self._new_queue_poller(socket_client.candles(target_pair), self._process_candles)
+        self._new_queue_poller(socket_client.books(target_pair), self._process_order_book_batch, 'book', batch=True)
+        self._new_queue_poller(socket_client.account, self.process_account, 'account')
+        self._new_queue_poller(socket_client.candles(target_pair), self._process_candles, 'candles')
 
-    def _new_queue_poller(self, queue, handler):
-        poller = QueuePoller(queue, handler)
+    def connect_async(self, transport):
+        self._warm_rest_client()
+        self.transport = transport
+        self._route_to_handlers()
+
+        url = self.socket_client.conn.url
+        transport.add_stream('bitfinex', url, self._on_stream_message, on_open=self._on_stream_open, json_loads=self.json_loads, recorder=self.recorder)
+
+    def _route_to_handlers(self):
+        # route with the btfxwss QueueProcessor, but into the handlers instead of queues
+        target_pair = self.target_pair
+        processor = self.socket_client.queue_processor
+        processor.books[('book', target_pair)] = DirectQueue(self._apply_book_level)
+        processor.candles[('candles', target_pair, '1m')] = DirectQueue(self._process_candles)
+        processor.account = DirectQueue(self.process_account)
+
+    def _subscriptions(self):
+        return [
+            {'event': 'subscribe', 'channel': 'book', 'symbol': self.target_pair},
+            {'event': 'subscribe', 'channel': 'candles', 'key': 'trade:1m:t' + self.target_pair},
+        ]
+
+    async def _on_stream_open(self, stream):
+        await stream.send(auth_payload(self.socket_client.key, self.socket_client.secret))
+        for payload in self._subscriptions():
+            await stream.send(payload)
+
+    async def _resubscribe(self):
+        # the soft resubscribe of btfxwss: every channel unsubscribed, then subscribed again
+        stream = self.transport.streams['bitfinex']
+        subscriptions = self._subscriptions()
+        for payload in reversed(subscriptions):
+            await stream.send(dict(payload, event='unsubscribe'))
+        for payload in subscriptions:
+            await stream.send(payload)
+
+    def _on_stream_info(self, data):
+        # what btfxwss.connection._info_handler does on the threaded transport
+        code = str(data.get('code'))
+        if code == '20051':
+            log.info('_on_stream_message: %s, reconnecting', data)
+            self.transport.reconnect('bitfinex')
+        elif code == '20060':
+            log.info('_on_stream_message: %s, pausing', data)
+            self.socket_client.conn.paused.set()
+        elif code == '20061':
+            log.info('_on_stream_message: %s, unpausing and resubscribing', data)
+            self.socket_client.conn.paused.clear()
+            self.transport.submit(self._resubscribe())
+        else:
+            log.info('_on_stream_message: info %s', data)
+
+    def _on_stream_message(self, data, received_at):
+        processor = self.socket_client.queue_processor
+        if isinstance(data, dict):
+            event = data.pop('event')
+            if event in ('subscribed', 'unsubscribed', 'conf', 'auth', 'unauth'):
+                processor.process((event, data, received_at))
+            elif event == 'info' and self.transport is not None:
+                self._on_stream_info(data)
+            elif event == 'error':
+                log.error('_on_stream_message: %s', data)
+            else:
+                log.info('_on_stream_message: %s %s', event, data)
+        elif data[1] != 'hb':
+            channel = processor.channel_directory.get(data[0])
+            if not channel or channel[0] != 'book':
+                # account and candles, outside the book write window
+                processor.process(('data', data, received_at))
+                return
+            self.tracer.begin(received_at)
+            book_update_count = self.book_update_count
+            self.book_version += 1
+            try:
+                processor.process(('data', data, received_at))
+            finally:
+                self.book_version += 1
+            # a snapshot frame carries every level, notify once it is all in
+            if self.book_update_count != book_update_count:
+                self.order_book_ready.set()
+                self.notify_order_book_update()
+
+    def _new_queue_poller(self, queue, handler, name, batch=False):
+        poller = QueuePoller(queue, handler, batch=batch, name=self.name + '.' + name)
         poller.start()
         self.queue_poller_list.append(poller)
 
+    def _connections(self):
+        return [self.socket_client.conn]
+
+    def queue_depths(self):
+        depths = super(Bitfinex, self).queue_depths()
+        # what the QueueProcessor has yet to route
+        depths[self.name + '.processor'] = queue_depth(self.socket_client.queue_processor.q)
+        return depths
+
     def disconnect(self):
 
+        if self.transport is not None:
+            self.transport.close('bitfinex')
+            return
+
         target_pair = self.target_pair
         socket_client = self.socket_client
 
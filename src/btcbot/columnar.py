@@ -0,0 +1,204 @@
+import json
+import math
+import os
+import time
+from threading import Thread, Event
+
+import numpy as np
+
+import logging
+log = logging.getLogger()
+
+SCHEMA_FILE = 'schema.json'
+
+class ColumnStore:
+    """Append-only table of fixed-width numeric columns in memory-mapped files.
+
+    Every column lives in ``<directory>/<name>.col`` as a raw array of
+    ``width`` values per row, the schema and the committed row count in
+    ``schema.json``. Files grow ``chunk_rows`` rows at a time and rows past
+    the committed count are ignored, so a reader only sees rows a writer
+    flush()ed.
+
+    The ``index`` column (width 1, non-decreasing) orders the rows;
+    ``slice`` bisects it (or another column that never decreases) and
+    returns views into the maps, nothing is read from disk until the
+    arrays are touched.
+    """
+
+    def __init__(self, directory, columns=None, index='ts', readonly=False, chunk_rows=65536):
+        """
+        :param directory: store directory, created when missing
+        :param columns: list of ``(name, dtype, width)``, needed to create a
+                        store, checked against the schema of an existing one
+        :param index: name of the column rows are ordered by
+        :param readonly: map the files read-only, for readers
+        :param chunk_rows: rows added to the files whenever they are full
+        """
+        self.directory = directory
+        self.readonly = readonly
+        self.chunk_rows = chunk_rows
+        schema_path = os.path.join(directory, SCHEMA_FILE)
+        if os.path.exists(schema_path):
+            with open(schema_path) as f:
+                schema = json.load(f)
+            stored = [tuple(column) for column in schema['columns']]
+            if columns is not None and [(name, np.dtype(dtype).str, width) for name, dtype, width in columns] != stored:
+                raise ValueError('columns do not match the store schema: %s' % directory)
+            self.columns = stored
+            self.index = schema['index']
+            self.rows = schema['rows']
+        else:
+            if readonly or columns is None:
+                raise ValueError('no column store in %s' % directory)
+            os.makedirs(directory, exist_ok=True)
+            self.columns = [(name, np.dtype(dtype).str, width) for name, dtype, width in columns]
+            self.index = index
+            self.rows = 0
+            self.flush()
+        if self.index not in [name for name, _, width in self.columns if width == 1]:
+            raise ValueError('index column must be a column of width 1: %s' % self.index)
+        self._maps = {}
+        self.capacity = 0
+        self._map(self.rows)
+
+    def _path(self, name):
+        return os.path.join(self.directory, name + '.col')
+
+    def _map(self, rows):
+        """(Re)maps every column with room for at least ``rows`` rows."""
+        if self.readonly:
+            capacity = rows
+        else:
+            capacity = max(self.chunk_rows, int(math.ceil(rows / self.chunk_rows)) * self.chunk_rows)
+        maps = {}
+        for name, dtype, width in self.columns:
+            path = self._path(name)
+            row_bytes = np.dtype(dtype).itemsize * width
+            if not self.readonly:
+                with open(path, 'ab') as f:
+                    if f.tell() < capacity * row_bytes:
+                        f.truncate(capacity * row_bytes)
+            shape = (capacity,) if width == 1 else (capacity, width)
+            if capacity == 0:
+                maps[name] = np.empty(shape, dtype=dtype)
+            else:
+                maps[name] = np.memmap(path, dtype=dtype, mode='r' if self.readonly else 'r+', shape=shape)
+        self._maps = maps
+        self.capacity = capacity
+
+    def __len__(self):
+        return self.rows
+
+    def append(self, **values):
+        """Appends one row, every column given as a keyword."""
+        self.extend(**{name: [value] for name, value in values.items()})
+
+    def extend(self, **arrays):
+        """Appends equally long batches of rows, every column given as a keyword."""
+        count = len(arrays[self.index])
+        if count == 0:
+            return
+        index = np.asarray(arrays[self.index])
+        if (self.rows and index[0] < self._maps[self.index][self.rows - 1]) or np.any(index[1:] < index[:-1]):
+            raise ValueError('%s must not decrease' % self.index)
+        if self.rows + count > self.capacity:
+            self._map(self.rows + count)
+        for name, _, _ in self.columns:
+            self._maps[name][self.rows:self.rows + count] = arrays[name]
+        self.rows += count
+
+    def flush(self):
+        """Writes the maps out and commits the row count for readers."""
+        for column in getattr(self, '_maps', {}).values():
+            if isinstance(column, np.memmap):
+                column.flush()
+        schema_path = os.path.join(self.directory, SCHEMA_FILE)
+        with open(schema_path + '.tmp', 'w') as f:
+            json.dump({'columns': self.columns, 'index': self.index, 'rows': self.rows}, f)
+        os.replace(schema_path + '.tmp', schema_path)
+
+    def refresh(self):
+        """Picks up the rows a writer committed since the store was opened."""
+        with open(os.path.join(self.directory, SCHEMA_FILE)) as f:
+            rows = json.load(f)['rows']
+        if rows > self.capacity:
+            self._map(rows)
+        self.rows = rows
+
+    def column(self, name):
+        return self._maps[name][:self.rows]
+
+    def slice(self, start=None, end=None, by=None):
+        """Columns of the rows with ``start <= index < end``, as views.
+
+        ``by`` bisects another non-decreasing column of width 1 instead.
+        """
+        index = self._maps[by or self.index][:self.rows]
+        begin = 0 if start is None else int(np.searchsorted(index, start, 'left'))
+        stop = self.rows if end is None else int(np.searchsorted(index, end, 'left'))
+        return {name: column[begin:stop] for name, column in self._maps.items()}
+
+    def close(self):
+        if not self.readonly:
+            self.flush()
+        self._maps = {}
+
+def book_columns(depth):
+    return [
+        ('ts', 'f8', 1),
+        ('bid_price', 'f8', depth),
+        ('bid_size', 'f8', depth),
+        ('ask_price', 'f8', depth),
+        ('ask_size', 'f8', depth),
+    ]
+
+class BookSnapshotter(Thread):
+    """Snapshots the top ``depth`` levels of each exchange's books every
+    ``interval`` seconds into a ColumnStore under ``<directory>/<name>``.
+
+    Missing levels are NaN. The levels are read from Exchange.snapshot_books()
+    copies, so a stored row never mixes two versions of the books.
+    """
+
+    def __init__(self, directory, exchanges, interval=1, depth=25):
+        super(BookSnapshotter, self).__init__(name='BookSnapshotter')
+        self.daemon = True
+        self.exchanges = exchanges
+        self.interval = interval
+        self.depth = depth
+        self.stores = {}
+        for exchange in exchanges:
+            self.stores[exchange.name] = ColumnStore(os.path.join(directory, exchange.name), book_columns(depth))
+        self._stopped = Event()
+
+    def _levels(self, book):
+        levels = np.full((2, self.depth), np.nan)
+        top = book.top(self.depth)
+        if top:
+            levels[:, :len(top)] = np.array(top, dtype='f8').T
+        return levels
+
+    def snapshot(self, exchange, ts):
+        if not exchange.order_book_ready.is_set():
+            return
+        bids_book, asks_book = exchange.snapshot_books(self.depth)
+        bids = self._levels(bids_book)
+        asks = self._levels(asks_book)
+        self.stores[exchange.name].append(ts=ts, bid_price=bids[0], bid_size=bids[1], ask_price=asks[0], ask_size=asks[1])
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            ts = time.time()
+            for exchange in self.exchanges:
+                try:
+                    self.snapshot(exchange, ts)
+                    self.stores[exchange.name].flush()
+                except Exception as e:
+                    log.exception(e)
+
+    def stop(self):
+        self._stopped.set()
+        self.join(timeout=self.interval + 1)
+        for store in self.stores.values():
+            store.close()
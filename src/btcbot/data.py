@@ -1,35 +1,133 @@
+import asyncio
+import time
 from threading import Thread, Event
 from queue import Empty
 
+from btcbot.stats import Histogram
+from btcbot.trace import StageTracer
+
 import logging
 log = logging.getLogger()
 
+class _Stop:
+    """Queued by QueuePoller.join() to wake a blocking get().
+
+    Matched by type rather than identity, a multiprocessing queue hands
+    back a pickled copy.
+    """
+
+def queue_depth(queue):
+    """Items waiting in any of the queue backends, without taking a lock.
+
+    Queue.qsize() takes the lock producers and consumers use, its deque
+    is read directly instead. None when the backend can't tell.
+    """
+    items = getattr(queue, 'queue', None)
+    if items is not None:
+        return len(items)
+    try:
+        return queue.qsize()
+    except NotImplementedError:
+        return None
+
 class QueuePoller(Thread):
+    """Feeds queued messages to a callback.
+
+    By default the poller blocks on the queue and join() wakes it with a
+    sentinel, so an idle poller costs nothing; ``block=False`` restores the
+    100 ms polling loop. Whatever is queued when it wakes up is drained in
+    one go (at most ``max_batch`` items) and handed to the callback either
+    one by one or, with ``batch=True``, as a single list.
 
-    def __init__(self, queue, callback=None,
+    Messages are tuples ending with their receive timestamp, the time from
+    there to the callback is recorded in ``latency``, which also counts
+    towards the dequeue stage of the StageTracer.
+    """
+
+    def __init__(self, queue, callback=None, block=True, batch=False, max_batch=1000,
                  *args, **kwargs):
         self._stopped = Event()
         self._queue = queue
         self._callback = callback
+        self._block = block
+        self._batch = batch
+        self._max_batch = max_batch
+        self.latency = Histogram()
+        self.tracer = StageTracer()
+        self.tracer.share('dequeue', self.latency)
         super(QueuePoller, self).__init__(*args, **kwargs)
 
     def join(self, timeout=None):
         self._stopped.set()
+        if self._block:
+            self._queue.put(_Stop())
         super(QueuePoller, self).join(timeout=timeout)
 
+    def _drain(self, items):
+        while len(items) < self._max_batch:
+            try:
+                data = self._queue.get_nowait()
+            except Empty:
+                break
+            if isinstance(data, _Stop):
+                self._stopped.set()
+                break
+            items.append(data)
+        return items
+
     def run(self):
         while not self._stopped.is_set():
             try:
-                data = self._queue.get(timeout=0.1)
+                if self._block:
+                    data = self._queue.get()
+                else:
+                    data = self._queue.get(timeout=0.1)
             except Empty:
                 continue
-            if self._callback:
-               self._callback(data)
+            if isinstance(data, _Stop):
+                break
+            items = self._drain([data])
+
+            now = time.time()
+            for item in items:
+                self.latency.record(now - item[-1])
+
+            if not self._callback:
+                continue
+            tracer = self.tracer
+            if self._batch:
+                tracer.begin(items[-1][-1])
+                self._callback(items)
+            else:
+                for item in items:
+                    tracer.begin(item[-1])
+                    self._callback(item)
+
+    def depth(self):
+        return queue_depth(self._queue)
+
+    def stat(self):
+        data = {}
+        data['name'] = self.name
+        data['qsize'] = self.depth()
+        data['latency'] = self.latency.stat()
+        return data
 
 class OrderExecutor:
+    """Places both legs of a trade at once.
 
-    def __init__(self):
+    On threads of their own by default. With the asyncio ``transport``
+    both legs are awaited together on its loop instead, through the
+    exchanges' new_order_async(), no thread is started per trade.
+    """
+
+    def __init__(self, transport=None):
+        self.transport = transport
         self.is_busy = Event()
+        self.tracer = StageTracer()
+        # exchange name -> count, for the metrics exporter
+        self.order_count = {}
+        self.fill_count = {}
         self._reset()
 
     def _reset(self):
@@ -44,6 +142,7 @@ class OrderExecutor:
     def do_trade(self, exchange_buy_from, exchange_sell_to, amount, buy_price, sell_price):
         if self.is_busy.is_set():
             return
+        self.tracer.tick_to_trade()
         log.critical('do_trade, %s => %s, %s, %s => %s', exchange_buy_from.name, exchange_sell_to.name, amount, buy_price, sell_price)
         self.is_busy.set()
         self.exchange_buy_from = exchange_buy_from
@@ -53,26 +152,62 @@ class OrderExecutor:
         self.buy_price = buy_price
         self.sell_price = sell_price
 
-        t = Thread(target=self.do_sell_and_buy)
+        if self.transport is not None:
+            self.transport.submit(self.do_sell_and_buy_async())
+            return
+        t = Thread(target=self.do_sell_and_buy, name='OrderExecutor')
         t.start()
 
     def do_sell(self):
         amount = -self.operate_amount
+        begin = time.perf_counter()
         self.sell_ret = self.exchange_sell_to.new_order(amount, self.sell_price)
+        self.tracer.record('order', time.perf_counter() - begin)
+        self._count_order(self.exchange_sell_to, self.sell_ret)
         pass
 
     def do_buy(self):
         amount = self.operate_amount
+        begin = time.perf_counter()
         self.buy_ret = self.exchange_buy_from.new_order(amount, self.buy_price)
+        self.tracer.record('order', time.perf_counter() - begin)
+        self._count_order(self.exchange_buy_from, self.buy_ret)
         pass
 
+    def _count_order(self, exchange, ret):
+        name = exchange.name
+        self.order_count[name] = self.order_count.get(name, 0) + 1
+        if ret is True:
+            self.fill_count[name] = self.fill_count.get(name, 0) + 1
+
     def do_sell_and_buy(self):
         log.critical('do_sell_and_buy begin')
-        t1 = Thread(target=self.do_sell)
-        t2 = Thread(target=self.do_buy)
+        t1 = Thread(target=self.do_sell, name='OrderExecutor.sell')
+        t2 = Thread(target=self.do_buy, name='OrderExecutor.buy')
         t1.start()
         t2.start()
         t1.join()
         t2.join()
         log.critical('do_sell_and_buy finish, buy_ret: %s, sell_ret: %s', self.buy_ret, self.sell_ret)
         self._reset()
+
+    async def _new_order_async(self, exchange, amount, price):
+        begin = time.perf_counter()
+        ret = await exchange.new_order_async(amount, price)
+        self.tracer.record('order', time.perf_counter() - begin)
+        self._count_order(exchange, ret)
+        return ret
+
+    async def do_sell_and_buy_async(self):
+        log.critical('do_sell_and_buy begin')
+        rets = await asyncio.gather(
+                self._new_order_async(self.exchange_sell_to, -self.operate_amount, self.sell_price),
+                self._new_order_async(self.exchange_buy_from, self.operate_amount, self.buy_price),
+                return_exceptions=True)
+        # a failed leg is logged and counts as not placed, the executor is free for the next trade either way
+        for leg, ret in zip(('sell', 'buy'), rets):
+            if isinstance(ret, Exception):
+                log.error('do_sell_and_buy %s leg failed: %r', leg, ret, exc_info=ret)
+        self.sell_ret, self.buy_ret = [None if isinstance(ret, Exception) else ret for ret in rets]
+        log.critical('do_sell_and_buy finish, buy_ret: %s, sell_ret: %s', self.buy_ret, self.sell_ret)
+        self._reset()
@@ -1,27 +1,136 @@
 import abc
+import json
+import time
+from bisect import bisect_left, bisect_right, insort
 from threading import Thread, Event
 
 import logging
 log = logging.getLogger()
 
 from btcbot.config import ConfigData
+from btcbot import queues
+from btcbot.jsondecode import get_json_loads
+from btcbot.trace import StageTracer
 
 class OrderBook:
+    """Price ladder kept in best-first order.
+
+    Levels live in ``map`` (price -> amount) while ``_keys`` holds the sort
+    keys in ascending order: the price itself for asks and the negated price
+    for bids, so index 0 is always the best level. Updates cost a bisect and
+    reads never re-sort.
+
+    The best level is cached and ``top_changed`` is raised whenever its
+    price or amount moves, so readers can tell a deep update from a change
+    of the inside quote.
+    """
+
     def __init__(self, is_ask=False):
         self.is_ask = is_ask
         self.map = {}
+        self._keys = []
+        self._best = None
+        self.top_changed = False
+
+    def __len__(self):
+        return len(self._keys)
 
     def remove(self, price):
         if price in self.map:
             del self.map[price]
+            key = price if self.is_ask else -price
+            index = bisect_left(self._keys, key)
+            del self._keys[index]
+            if index == 0:
+                self._update_best()
 
     def add_or_update(self, price, amount):
         amount = abs(amount)
+        key = price if self.is_ask else -price
+        if price not in self.map:
+            insort(self._keys, key)
         self.map[price] = amount
+        if self._keys[0] == key:
+            self._update_best()
 
-    def to_list(self):
-        data = sorted(self.map.items(), reverse=not self.is_ask)
-        return data
+    def apply_levels(self, prices, sizes):
+        """Applies parallel sequences of levels in one call.
+
+        Sizes must be absolute, a zero size removes the level. The cached
+        best level is refreshed once at the end if the top was touched.
+        Levels applied to an empty book (a depth snapshot) are sorted once
+        instead of inserted one by one.
+        """
+        map = self.map
+        keys = self._keys
+        is_ask = self.is_ask
+        if not keys:
+            map.update(zip(prices, sizes))
+            for price in [price for price, size in map.items() if size == 0]:
+                del map[price]
+            keys[:] = sorted(map) if is_ask else sorted(-price for price in map)
+            self._update_best()
+            return
+        top_touched = False
+        for price, size in zip(prices, sizes):
+            key = price if is_ask else -price
+            if size == 0:
+                if price in map:
+                    del map[price]
+                    index = bisect_left(keys, key)
+                    del keys[index]
+                    top_touched = top_touched or index == 0
+            else:
+                if price not in map:
+                    insort(keys, key)
+                map[price] = size
+                top_touched = top_touched or keys[0] == key
+        if top_touched:
+            self._update_best()
+
+    def _update_best(self):
+        best = None
+        if self._keys:
+            key = self._keys[0]
+            price = key if self.is_ask else -key
+            best = (price, self.map[price])
+        if best != self._best:
+            self._best = best
+            self.top_changed = True
+
+    def best(self):
+        return self._best
+
+    def top(self, n):
+        return self.to_list(n)
+
+    def count_within(self, price):
+        """Number of levels priced at or better than ``price``."""
+        return bisect_right(self._keys, price if self.is_ask else -price)
+
+    def pop_top_changed(self):
+        changed = self.top_changed
+        self.top_changed = False
+        return changed
+
+    def to_list(self, limit=None):
+        keys = self._keys if limit is None else self._keys[:limit]
+        map = self.map
+        if self.is_ask:
+            return [(key, map[key]) for key in keys]
+        return [(-key, map[-key]) for key in keys]
+
+    def copy(self, limit=None):
+        """A new book holding the best ``limit`` levels.
+
+        Raises KeyError when a level goes away under the copy, see
+        Exchange.snapshot_book() for copying while the book is written.
+        """
+        book = OrderBook(self.is_ask)
+        book._keys = self._keys[:limit]
+        book.map = dict(self.to_list(limit)) if limit is not None else dict(self.map)
+        book._best = self._best
+        return book
 
 class Candles:
 
@@ -43,6 +152,7 @@ class Exchange:
             on_order_book_update=None,
             on_account_update=None,
             on_candels_update=None,
+            recorder=None,
             *args, **kwargs):
 
         config_data = ConfigData().get_config();
@@ -54,7 +164,17 @@ class Exchange:
 
         self.name = name
         self.config = exchange_config
+        self.queue_factory = queues.get_queue_factory(config_data.get('queue_backend'))
+        self.tracer = StageTracer()
+        self.json_decoder, json_loads = get_json_loads(config_data.get('json_decoder'))
+        # orjson and ujson parse the undecoded bytes, stdlib json keeps str frames
+        self.decode_bytes = self.json_decoder != 'json'
+        self.json_loads = self.tracer.timed('decode', json_loads)
+        self.recorder = recorder
         self.ready = Event()
+        self.transport = None
+        # REST request weight bucket, for the exchanges that have one
+        self.rate_limiter = None
         self.queue_poller_list = []
         self.asset_list = {}
         self.buy_order_list = {}
@@ -67,21 +187,27 @@ class Exchange:
         self.on_account_update = on_account_update
         self.on_candels_update = on_candels_update
         self.order_book_ready = Event()
+        self.book_update_count = 0
+        # odd while a writer is changing the books, see snapshot_book()
+        self.book_version = 0
+        self.snapshot_retry_count = 0
 
         self.candles = Candles()
 
     def stat(self):
-        buy_price, _ = self.asks_book.to_list()[0]
+        buy_price, _ = self.asks_book.best()
 
         data = {}
         data['name'] = self.name
         data['asset_list'] = self.asset_list
         amount_can_buy = self.asset_list[self.curency_token] / buy_price
         data['target_token_amount'] = self.asset_list[self.target_token] + amount_can_buy
+        if self.rate_limiter is not None:
+            data['rate_limiter'] = self.rate_limiter.stat()
         return data
 
     def run(self):
-        thread = Thread(target=self.connect)
+        thread = Thread(target=self.connect, name=self.name + '.connect')
         thread.start()
         thread.join()
         self.ready.set()
@@ -90,10 +216,28 @@ class Exchange:
     def connect(self):
         pass
 
+    @abc.abstractmethod
+    def connect_async(self, transport):
+        pass
+
     @abc.abstractmethod
     def disconnect(self):
         pass
 
+    @abc.abstractmethod
+    def _connections(self):
+        pass
+
+    def stream_stat(self):
+        """(stream, messages, reconnects) of every websocket of this exchange."""
+        if self.transport is not None:
+            return [(name, stream.message_count, stream.reconnect_count)
+                    for name, stream in list(self.transport.streams.items()) if name.startswith(self.name)]
+        return [(conn.stream, conn.message_count, conn.reconnect_count) for conn in self._connections()]
+
+    def queue_depths(self):
+        return {poller.name: poller.depth() for poller in self.queue_poller_list}
+
     def update_order_list(self, cid, price, amount, is_sell, remove=False):
         map = self.buy_order_list
         if is_sell:
@@ -105,11 +249,52 @@ class Exchange:
             if cid in map:
                 del map[cid]
 
-        self.notify_order_book_update()
+        self.notify_order_book_update(force=True)
 
-    def notify_order_book_update(self):
+    def record_response(self, name, data):
+        """Records a REST response next to the websocket frames, for replay."""
+        if self.recorder is not None:
+            stream_id = self.recorder.stream_id(self.name + '/rest/' + name)
+            self.recorder.record(stream_id, json.dumps(data), time.time())
+
+    def snapshot_book(self, book, limit=None):
+        """A copy of asks_book or bids_book as it was at one moment.
+
+        A seqlock: the thread applying updates bumps book_version before
+        and after touching the books (the second bump in a finally, so a
+        writer that raises never leaves it odd) and never waits, a copy
+        that started on an odd version or saw it move is thrown away and
+        taken again.
+        """
+        return self._snapshot(lambda: book.copy(limit))
+
+    def snapshot_books(self, limit=None):
+        """Copies of bids_book and asks_book, both as they were at the same moment."""
+        return self._snapshot(lambda: (self.bids_book.copy(limit), self.asks_book.copy(limit)))
+
+    def _snapshot(self, copy_books):
+        while True:
+            version = self.book_version
+            if not version & 1:
+                try:
+                    copy = copy_books()
+                except KeyError:
+                    copy = None
+                if copy is not None and self.book_version == version:
+                    return copy
+            self.snapshot_retry_count += 1
+            # hand the GIL to the writer
+            time.sleep(0)
+
+    def notify_order_book_update(self, force=False):
+        if not force:
+            self.tracer.mark('apply')
         if not self.order_book_ready.is_set():
             return
+        top_changed = self.bids_book.pop_top_changed()
+        top_changed = self.asks_book.pop_top_changed() or top_changed
+        if not top_changed and not force:
+            return
         if self.on_order_book_update is not None:
             self.on_order_book_update(self)
 
@@ -133,5 +318,8 @@ class Exchange:
         data['asset_list'] = self.asset_list
         return data
 
+    def queue_stat(self):
+        return [poller.stat() for poller in self.queue_poller_list]
+
     def get_candles(self):
         return self.candles.to_list()
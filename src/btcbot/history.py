@@ -0,0 +1,312 @@
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from binance.client import Client
+from binance.helpers import date_to_milliseconds, interval_to_milliseconds
+from binance.ratelimit import RateLimiter, request_weight, PRIORITY_BULK
+from btcbot.columnar import ColumnStore
+
+import logging
+log = logging.getLogger()
+
+# kline fields in the order the api returns them, the last one is unused
+KLINE_COLUMNS = [
+    ('open_time', 'i8', 1),
+    ('open', 'f8', 1),
+    ('high', 'f8', 1),
+    ('low', 'f8', 1),
+    ('close', 'f8', 1),
+    ('volume', 'f8', 1),
+    ('close_time', 'i8', 1),
+    ('quote_volume', 'f8', 1),
+    ('trades', 'i8', 1),
+    ('taker_buy_volume', 'f8', 1),
+    ('taker_buy_quote_volume', 'f8', 1),
+]
+
+# aggregate trade fields kept, with the api keys they come from
+AGG_TRADE_COLUMNS = [
+    ('id', 'i8', 1),
+    ('price', 'f8', 1),
+    ('qty', 'f8', 1),
+    ('time', 'i8', 1),
+    ('buyer_maker', '?', 1),
+]
+AGG_TRADE_KEYS = {
+    'id': Client.AGG_ID,
+    'price': Client.AGG_PRICE,
+    'qty': Client.AGG_QUANTITY,
+    'time': Client.AGG_TIME,
+    'buyer_maker': Client.AGG_BUYER_MAKES,
+}
+
+def kline_arrays(klines):
+    """Columns of a list of api kline rows, keyword arguments for ColumnStore.extend."""
+    if not klines:
+        return {name: np.empty(0, dtype=dtype) for name, dtype, _ in KLINE_COLUMNS}
+    rows = np.array([kline[:len(KLINE_COLUMNS)] for kline in klines], dtype=object)
+    return {name: rows[:, i].astype('f8').astype(dtype) for i, (name, dtype, _) in enumerate(KLINE_COLUMNS)}
+
+def agg_trade_arrays(trades):
+    """Columns of a list of api aggregate trades, keyword arguments for ColumnStore.extend."""
+    return {name: np.array([trade[AGG_TRADE_KEYS[name]] for trade in trades], dtype=dtype)
+            for name, dtype, _ in AGG_TRADE_COLUMNS}
+
+class HistoryDownloader:
+    """Base of the downloaders, stores live under ``<directory>/<symbol>/``.
+
+    Requests go through the client's rate limiter as bulk calls, orders
+    placed through the same limiter are served first. A client without
+    one is kept under ``weight_per_minute`` by a limiter of the downloader.
+    """
+
+    def __init__(self, client, directory, weight_per_minute=1200):
+        self.client = client
+        self.directory = directory
+        self.rate_limiter = None
+        if getattr(client, 'rate_limiter', None) is None:
+            self.rate_limiter = RateLimiter(weight_per_minute)
+        self.request_count = 0
+
+    def _store(self, symbol, name, columns, index, readonly):
+        path = os.path.join(self.directory, symbol, name)
+        if readonly:
+            return ColumnStore(path, readonly=True)
+        return ColumnStore(path, columns, index=index)
+
+    def _request(self, path, func, **params):
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(request_weight(path), PRIORITY_BULK)
+        self.request_count += 1
+        return func(**params)
+
+class KlineDownloader(HistoryDownloader):
+    """Downloads klines into ColumnStores under ``<directory>/<symbol>/<interval>``.
+
+    The range is cut into chunks of one request (``limit`` bars) each,
+    ``workers`` threads fetch them at once and the chunks are appended in
+    order as they come in, with no more than a few chunks held in memory.
+    The store is flushed after every chunk, so a run that stops half way
+    (an error, ^C) has stored every bar up to the first missing chunk and
+    the next run starts after the last stored bar. Only closed bars are
+    stored.
+    """
+
+    def __init__(self, client, directory, workers=4, limit=500, weight_per_minute=1200):
+        super(KlineDownloader, self).__init__(client, directory, weight_per_minute)
+        self.workers = workers
+        self.limit = limit
+
+    def store(self, symbol, interval, readonly=False):
+        return self._store(symbol, interval, KLINE_COLUMNS, 'open_time', readonly)
+
+    def _get_klines(self, symbol, interval, start, end, limit):
+        return self._request('klines', self.client.get_klines, symbol=symbol, interval=interval,
+                             startTime=start, endTime=end, limit=limit)
+
+    def _first_open_time(self, symbol, interval, start, end):
+        """Open time of the first bar from ``start`` on, skips the time before the listing."""
+        klines = self._get_klines(symbol, interval, start, end, 1)
+        return klines[0][0] if klines else None
+
+    def _fetch(self, symbol, interval, start, end):
+        klines = self._get_klines(symbol, interval, start, end - 1, self.limit)
+        return kline_arrays([kline for kline in klines if start <= kline[0] < end])
+
+    def download(self, symbol, interval, start_str, end_str=None):
+        """Brings the store of ``symbol`` and ``interval`` up to ``end_str``, now by default
+
+        :param start_str: first bar wanted, a date string like Client.get_historical_klines takes,
+                          ignored when the store has bars already
+        :returns: the store, flushed
+        """
+        timeframe = interval_to_milliseconds(interval)
+        if timeframe is None:
+            raise ValueError('invalid interval: %s' % interval)
+        store = self.store(symbol, interval)
+        # open times before end, the bar still open now is left for the next run
+        end = int(time.time() * 1000) // timeframe * timeframe
+        if end_str:
+            end = min(end, date_to_milliseconds(end_str) + 1)
+
+        if len(store):
+            start = int(store.column('open_time')[-1]) + timeframe
+        else:
+            start = date_to_milliseconds(start_str)
+            start = self._first_open_time(symbol, interval, start, end - 1) if start < end else None
+            if start is None:
+                return store
+        if start >= end:
+            return store
+
+        span = self.limit * timeframe
+        chunks = [(chunk, min(chunk + span, end)) for chunk in range(start, end, span)]
+        log.info('KlineDownloader: %s %s, %d bars in %d requests', symbol, interval, (end - start) // timeframe, len(chunks))
+        executor = ThreadPoolExecutor(self.workers, thread_name_prefix='KlineDownloader')
+        pending = []
+        try:
+            for chunk in chunks:
+                pending.append(executor.submit(self._fetch, symbol, interval, *chunk))
+                if len(pending) < 2 * self.workers:
+                    continue
+                self._store_chunk(store, pending.pop(0))
+            for future in pending:
+                self._store_chunk(store, future)
+        finally:
+            # chunks not started yet are dropped, running ones are waited for
+            for future in pending:
+                future.cancel()
+            executor.shutdown()
+            store.flush()
+        return store
+
+    def _store_chunk(self, store, future):
+        store.extend(**future.result())
+        store.flush()
+
+class AggTradeIngestor(HistoryDownloader):
+    """Keeps a tape of aggregate trades in a ColumnStore under ``<directory>/<symbol>/aggTrades``.
+
+    catch_up() pages forward from the last stored aggregate trade id to the
+    latest trade. The request for the next page is sent as soon as a page
+    is in, so it is on the wire while the page is decoded and written.
+    Every page is flushed, an interrupted catch-up loses nothing stored.
+
+    tape() maps the store read-only for readers, also while a catch-up
+    appends to it (refresh() picks up the new rows), e.g. the trades of
+    the last hour::
+
+        trades = ingestor.tape('EOSBTC').slice(now_ms - 3600000, by='time')
+    """
+
+    # empty hours looked at for the first trade before falling back to bisection
+    FIRST_ID_WINDOWS = 24
+
+    def __init__(self, client, directory, limit=500, weight_per_minute=1200):
+        super(AggTradeIngestor, self).__init__(client, directory, weight_per_minute)
+        self.limit = limit
+        self.page_count = 0
+
+    def store(self, symbol, readonly=False):
+        return self._store(symbol, 'aggTrades', AGG_TRADE_COLUMNS, 'id', readonly)
+
+    def tape(self, symbol):
+        return self.store(symbol, readonly=True)
+
+    def _get_agg_trades(self, symbol, **params):
+        return self._request('aggTrades', self.client.get_aggregate_trades, symbol=symbol, **params)
+
+    def _first_id(self, symbol, start):
+        """Id of the first aggregate trade at ``start`` or later.
+
+        Asks for the first trade of the hour from ``start`` on. An empty hour
+        is either before the listing, then the first trade ever is the one,
+        or a quiet stretch, then the hours after are asked in turn. Past
+        FIRST_ID_WINDOWS empty hours it bisects ids instead.
+        """
+        now = int(time.time() * 1000)
+        for window in range(self.FIRST_ID_WINDOWS):
+            if start > now:
+                return None
+            # startTime and endTime are both inclusive and must lie within an hour
+            trades = self._get_agg_trades(symbol, startTime=start, endTime=start + 3600000 - 1, limit=1)
+            if trades:
+                return trades[0][Client.AGG_ID]
+            if window == 0:
+                first = self._get_agg_trades(symbol, fromId=0, limit=1)
+                if not first:
+                    return None
+                if first[0][Client.AGG_TIME] >= start:
+                    return first[0][Client.AGG_ID]
+            start += 3600000
+        return self._bisect_first_id(symbol, start)
+
+    def _bisect_first_id(self, symbol, start):
+        """Id of the first aggregate trade at ``start`` or later, bisected by id."""
+        latest = self._get_agg_trades(symbol, limit=1)
+        if not latest or latest[0][Client.AGG_TIME] < start:
+            return None
+        low, high = 0, latest[0][Client.AGG_ID]
+        while low < high:
+            middle = (low + high) // 2
+            trades = self._get_agg_trades(symbol, fromId=middle, limit=1)
+            if trades and trades[0][Client.AGG_TIME] >= start:
+                high = middle
+            else:
+                low = middle + 1
+        return low
+
+    def catch_up(self, symbol, start_str=None):
+        """Appends the aggregate trades after the last stored one
+
+        :param start_str: where an empty tape starts, a date string like Client.aggregate_trade_iter
+                          takes, the first trade of the symbol by default
+        :returns: the store, flushed
+        """
+        store = self.store(symbol)
+        if len(store):
+            from_id = int(store.column('id')[-1]) + 1
+        elif start_str:
+            from_id = self._first_id(symbol, date_to_milliseconds(start_str))
+            if from_id is None:
+                return store
+        else:
+            from_id = 0
+
+        executor = ThreadPoolExecutor(1, thread_name_prefix='AggTradeIngestor')
+        future = None
+        try:
+            future = executor.submit(self._get_agg_trades, symbol, fromId=from_id, limit=self.limit)
+            while future is not None:
+                trades = future.result()
+                self.page_count += 1
+                future = None
+                # a short page is the end of the tape
+                if len(trades) == self.limit:
+                    future = executor.submit(self._get_agg_trades, symbol, fromId=trades[-1][Client.AGG_ID] + 1, limit=self.limit)
+                if trades:
+                    store.extend(**agg_trade_arrays(trades))
+                    store.flush()
+        finally:
+            if future is not None:
+                future.cancel()
+            executor.shutdown()
+            store.flush()
+        return store
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m btcbot.history', description='Downloads Binance history into column stores.')
+    parser.add_argument('--directory', default='history')
+    parser.add_argument('--api-url', default=None, help='a local mock instead of the real api')
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True  # python < 3.7 has no required argument
+    klines = commands.add_parser('klines', help='klines of an interval, resumes from the last stored bar')
+    klines.add_argument('symbol', help='e.g. EOSBTC')
+    klines.add_argument('interval', help='e.g. 1m, 1h, 1d')
+    klines.add_argument('start', help='first bar, e.g. "1 Jan 2018" or "30 days ago UTC"')
+    klines.add_argument('--end', default=None, help='last bar, now by default')
+    klines.add_argument('--workers', type=int, default=4)
+    trades = commands.add_parser('aggtrades', help='aggregate trades, catches up from the last stored one')
+    trades.add_argument('symbol', help='e.g. EOSBTC')
+    trades.add_argument('--start', default=None, help='where an empty tape starts, the first trade by default')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    client = Client(None, None, api_url=args.api_url, rate_limiter=RateLimiter())
+    symbol = args.symbol.upper()
+    if args.command == 'klines':
+        downloader = KlineDownloader(client, args.directory, workers=args.workers)
+        store = downloader.download(symbol, args.interval, args.start, args.end)
+        log.info('%s %s: %d bars, %d requests', symbol, args.interval, len(store), downloader.request_count)
+    else:
+        downloader = AggTradeIngestor(client, args.directory)
+        store = downloader.catch_up(symbol, args.start)
+        log.info('%s: %d aggregate trades, %d requests', symbol, len(store), downloader.request_count)
+    store.close()
+
+if __name__ == '__main__':
+    main()
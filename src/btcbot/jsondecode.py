@@ -0,0 +1,31 @@
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+# fastest first, every one of them takes bytes as well as str
+JSON_DECODERS = [
+    ('orjson', orjson.loads if orjson else None),
+    ('ujson', ujson.loads if ujson else None),
+    ('json', json.loads),
+]
+
+def get_json_loads(name=None):
+    """Returns (name, loads) of the requested decoder.
+
+    Without a name, or with 'auto', the fastest installed one is picked.
+    Every decoder raises a ValueError subclass on invalid input.
+    """
+    for decoder_name, loads in JSON_DECODERS:
+        if loads is None:
+            continue
+        if name in (None, 'auto', decoder_name):
+            return decoder_name, loads
+    raise ValueError('json decoder not available: %s' % name)
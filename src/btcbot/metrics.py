@@ -0,0 +1,139 @@
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from threading import Thread
+
+import logging
+log = logging.getLogger()
+
+QUANTILES = (0.5, 0.99, 0.999)
+
+class Exposition:
+    """Metrics in the Prometheus text format, samples grouped per metric."""
+
+    def __init__(self):
+        self.metrics = {}
+
+    def add(self, name, kind, help, value, **labels):
+        if name not in self.metrics:
+            self.metrics[name] = (kind, help, [])
+        self.metrics[name][2].append((labels, value))
+
+    def summary(self, name, help, histogram, **labels):
+        """Quantiles and count of a Histogram, the values are kept in microseconds."""
+        for quantile in QUANTILES:
+            self.add(name, 'summary', help, histogram.percentile(quantile * 100) / 1e6, quantile=str(quantile), **labels)
+        self.add(name + '_count', None, None, histogram.count(), **labels)
+
+    def render(self):
+        lines = []
+        for name, (kind, help, samples) in self.metrics.items():
+            if kind is not None:
+                lines.append('# HELP %s %s' % (name, help))
+                lines.append('# TYPE %s %s' % (name, kind))
+            for labels, value in samples:
+                if value is None:
+                    continue
+                if labels:
+                    label_text = ','.join('%s="%s"' % (key, str(val).replace('\\', '\\\\').replace('"', '\\"'))
+                                          for key, val in sorted(labels.items()))
+                    lines.append('%s{%s} %s' % (name, label_text, float(value)))
+                else:
+                    lines.append('%s %s' % (name, float(value)))
+        return '\n'.join(lines) + '\n'
+
+def collect(bot):
+    """Reads the bot's counters as they are.
+
+    Everything read here is a plain int, a len() or a Histogram copy, none
+    of it takes a lock the message path holds; a scrape racing an update
+    sees the value from just before or just after it.
+    """
+    metrics = Exposition()
+    exchanges = [bot.binance, bot.bitfinex]
+    for exchange in exchanges:
+        for queue, depth in sorted(exchange.queue_depths().items()):
+            metrics.add('btcbot_queue_depth', 'gauge', 'Messages waiting in a queue.', depth, exchange=exchange.name, queue=queue)
+    for exchange in exchanges:
+        for stream, messages, _ in exchange.stream_stat():
+            metrics.add('btcbot_stream_messages_total', 'counter', 'Websocket frames received.', messages, exchange=exchange.name, stream=stream)
+    for exchange in exchanges:
+        for stream, _, reconnects in exchange.stream_stat():
+            metrics.add('btcbot_stream_reconnects_total', 'counter', 'Websocket reconnects.', reconnects, exchange=exchange.name, stream=stream)
+    for exchange in exchanges:
+        metrics.add('btcbot_book_levels', 'gauge', 'Price levels in the order book.', len(exchange.bids_book), exchange=exchange.name, side='bid')
+        metrics.add('btcbot_book_levels', 'gauge', 'Price levels in the order book.', len(exchange.asks_book), exchange=exchange.name, side='ask')
+    for exchange in exchanges:
+        metrics.add('btcbot_book_updates_total', 'counter', 'Order book updates applied.', exchange.book_update_count, exchange=exchange.name)
+
+    for exchange in exchanges:
+        metrics.add('btcbot_book_snapshot_retries_total', 'counter', 'Book copies taken again after racing an update.',
+                    exchange.snapshot_retry_count, exchange=exchange.name)
+
+    metrics.add('btcbot_scans_total', 'counter', 'Arbitrage scans run.', bot.scan_count)
+    metrics.add('btcbot_opportunities_total', 'counter', 'Scans that found a profitable trade.', bot.opportunity_count)
+
+    executor = bot.order_executor
+    for exchange in exchanges:
+        metrics.add('btcbot_orders_total', 'counter', 'Orders sent.', executor.order_count.get(exchange.name, 0), exchange=exchange.name)
+    for exchange in exchanges:
+        metrics.add('btcbot_orders_filled_total', 'counter', 'Orders filled in full.', executor.fill_count.get(exchange.name, 0), exchange=exchange.name)
+
+    for exchange in exchanges:
+        if exchange.rate_limiter is None:
+            continue
+        limiter = exchange.rate_limiter.stat()
+        metrics.add('btcbot_rest_weight_available', 'gauge', 'Request weight left in the rate limiter bucket.', limiter['tokens'],
+                    exchange=exchange.name)
+        for priority in ('order', 'default', 'bulk'):
+            metrics.add('btcbot_rest_weight_total', 'counter', 'Request weight taken from the rate limiter.',
+                        limiter[priority]['weight'], exchange=exchange.name, priority=priority)
+        for priority in ('order', 'default', 'bulk'):
+            metrics.add('btcbot_rest_blocked_seconds_total', 'counter', 'Time REST calls waited on the rate limiter.',
+                        limiter[priority]['blocked_seconds'], exchange=exchange.name, priority=priority)
+
+    tracer = bot.tracer
+    for stage in tracer.STAGES:
+        metrics.summary('btcbot_stage_latency_seconds', 'Latency of each pipeline stage, order is the order round trip.',
+                        tracer.histogram(stage), stage=stage)
+
+    if bot.recorder is not None:
+        recorder = bot.recorder.stat()
+        metrics.add('btcbot_recorder_frames_total', 'counter', 'Frames written by the recorder.', recorder['frames'])
+        metrics.add('btcbot_recorder_queue_depth', 'gauge', 'Frames waiting to be written.', recorder['queued'])
+    return metrics
+
+class _Handler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        try:
+            body = collect(self.server.bot).render().encode('utf8')
+        except Exception as e:
+            log.exception(e)
+            self.send_error(500)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        log.debug('metrics: ' + format, *args)
+
+class MetricsServer(Thread):
+    """Serves the bot's counters on http://host:port/metrics for Prometheus."""
+
+    def __init__(self, bot, host='127.0.0.1', port=9108):
+        super(MetricsServer, self).__init__(name='MetricsServer', daemon=True)
+        self.server = HTTPServer((host, port), _Handler)
+        self.server.bot = bot
+        self.port = self.server.server_address[1]
+
+    def run(self):
+        self.server.serve_forever()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,126 @@
+import os
+import sys
+import time
+import threading
+from threading import Thread, Event
+
+import logging
+log = logging.getLogger()
+
+class _Sampler(Thread):
+    """Takes one window of samples and writes it out."""
+
+    def __init__(self, path, interval, duration):
+        super(_Sampler, self).__init__(name='Profiler', daemon=True)
+        self.path = path
+        self.interval = interval
+        self.duration = duration
+        self.sample_count = 0
+        self._stopped = Event()
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+    def run(self):
+        own_ident = threading.get_ident()
+        thread_names = {}
+        # (thread name, code objects root first) -> samples
+        stacks = {}
+        end = time.monotonic() + self.duration
+        while not self._stopped.wait(self.interval) and time.monotonic() < end:
+            frames = sys._current_frames()
+            if not frames.keys() <= thread_names.keys():
+                thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in frames.items():
+                if ident == own_ident:
+                    continue
+                codes = []
+                while frame is not None:
+                    codes.append(frame.f_code)
+                    frame = frame.f_back
+                codes.reverse()
+                key = (thread_names.get(ident, str(ident)), tuple(codes))
+                stacks[key] = stacks.get(key, 0) + 1
+            self.sample_count += 1
+            del frames
+        self._write(stacks)
+
+    def _write(self, stacks):
+        labels = {}
+        lines = []
+        for (thread_name, codes), count in stacks.items():
+            frames = [thread_name.replace(';', ':').replace(' ', '_')]
+            for code in codes:
+                if code not in labels:
+                    labels[code] = '%s (%s:%d)' % (getattr(code, 'co_qualname', code.co_name),
+                                                   os.path.basename(code.co_filename), code.co_firstlineno)
+                frames.append(labels[code])
+            lines.append('%s %d\n' % (';'.join(frames), count))
+        with open(self.path, 'w') as f:
+            f.writelines(sorted(lines))
+        log.info('profile written: %s, %d samples, %d stacks', self.path, self.sample_count, len(lines))
+
+class Profiler:
+    """Wall clock sampling profiler for the running bot.
+
+    While a window is open a thread of its own grabs the stack of every
+    other thread each ``interval`` seconds, from sys._current_frames(),
+    and when the window closes writes them in the collapsed stack format
+    flamegraph.pl and speedscope read, one line per distinct stack, the
+    thread name as the root frame. Threads are sampled whether running
+    or waiting, a blocked poller shows up under its queue get.
+
+    Windows end after ``duration`` seconds or on stop(). start(), stop()
+    and toggle() are reachable through the API dispatch as
+    ``profiler.<method>`` and toggle() from SIGUSR2.
+    """
+
+    def __init__(self, directory, interval=0.005, duration=30):
+        self.directory = directory
+        self.interval = interval
+        self.duration = duration
+        self.last_path = None
+        self._sampler = None
+
+    def is_running(self):
+        return self._sampler is not None and self._sampler.is_alive()
+
+    def _new_path(self):
+        # windows restarted within the same millisecond must not overwrite each other
+        now = time.time()
+        name = 'profile-%s-%03d' % (time.strftime('%Y%m%d-%H%M%S', time.localtime(now)), int(now * 1000) % 1000)
+        path = os.path.join(self.directory, name + '.folded')
+        count = 1
+        while os.path.exists(path):
+            path = os.path.join(self.directory, '%s-%d.folded' % (name, count))
+            count += 1
+        return path
+
+    def start(self, duration=None):
+        if self.is_running():
+            return self.stat()
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._new_path()
+        self._sampler = _Sampler(path, self.interval, duration if duration else self.duration)
+        self._sampler.start()
+        self.last_path = path
+        log.info('profiler started, %s s into %s', self._sampler.duration, path)
+        return self.stat()
+
+    def stop(self):
+        if self._sampler is not None:
+            self._sampler.stop()
+        return self.stat()
+
+    def toggle(self):
+        if self.is_running():
+            return self.stop()
+        return self.start()
+
+    def stat(self):
+        data = {}
+        data['running'] = self.is_running()
+        data['path'] = self.last_path
+        data['samples'] = self._sampler.sample_count if self._sampler is not None else 0
+        return data
@@ -0,0 +1,23 @@
+from multiprocessing import Queue as ProcessQueue
+from queue import Queue
+try:
+    from queue import SimpleQueue
+except ImportError:  # python < 3.7
+    SimpleQueue = Queue
+
+# Producers and consumers of market data are threads of the same process,
+# a multiprocessing queue only adds pickling, a feeder thread and a pipe.
+QUEUE_BACKENDS = {
+    'simple': SimpleQueue,
+    'thread': Queue,
+    'process': ProcessQueue,
+}
+
+DEFAULT_QUEUE_BACKEND = 'simple'
+
+def get_queue_factory(name=None):
+    if name is None:
+        name = DEFAULT_QUEUE_BACKEND
+    if name not in QUEUE_BACKENDS:
+        raise ValueError('unknown queue backend: %s, expected one of %s' % (name, ', '.join(sorted(QUEUE_BACKENDS))))
+    return QUEUE_BACKENDS[name]
@@ -0,0 +1,237 @@
+import glob
+import json
+import os
+import struct
+import time
+from threading import Thread, Lock
+try:
+    from queue import SimpleQueue, Empty
+except ImportError:  # python < 3.7
+    from queue import Queue as SimpleQueue, Empty
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+import logging
+log = logging.getLogger()
+
+# length of the frame, stream id, receive time
+RECORD_HEADER = struct.Struct('<IHd')
+# records of stream 0 name the other streams, json {"id": .., "name": ..}
+STREAM_TABLE_ID = 0
+SEGMENT_MAGIC = b'BTCBOTREC1\n'
+
+COMPRESSIONS = {
+    None: '',
+    'zstd': '.zst',
+    'lz4': '.lz4',
+}
+
+def _open_segment(path, compression, mode):
+    if compression == 'zstd':
+        if zstandard is None:
+            raise RuntimeError('zstd compression needs the zstandard package')
+        if mode == 'wb':
+            return zstandard.ZstdCompressor(level=3).stream_writer(open(path, 'wb'))
+        return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'))
+    if compression == 'lz4':
+        if lz4 is None:
+            raise RuntimeError('lz4 compression needs the lz4 package')
+        return lz4.frame.open(path, mode)
+    return open(path, mode)
+
+class _Stop:
+    pass
+
+class FrameRecorder(Thread):
+    """Appends raw websocket frames to a segmented binary log.
+
+    Every record is a ``RECORD_HEADER`` (frame length, stream id, receive
+    time) followed by the frame bytes. A segment starts with
+    ``SEGMENT_MAGIC`` and the stream table, so each segment can be read on
+    its own; a new one is opened once ``segment_size`` frame bytes went
+    into the current one. Compressed segments are a single zstd or lz4
+    frame each.
+
+    record() only puts a tuple on a queue, the writer thread encodes the
+    records of everything queued so far and hands them to one write().
+    """
+
+    def __init__(self, directory, compression=None, segment_size=64 * 1024 * 1024,
+                 flush_interval=1, max_batch=10000):
+        if compression not in COMPRESSIONS:
+            raise ValueError('unknown compression: %s, expected zstd or lz4' % compression)
+        super(FrameRecorder, self).__init__(name='FrameRecorder')
+        self.daemon = True
+        self.directory = directory
+        self.compression = compression
+        self.segment_size = segment_size
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.streams = {}
+        self._streams_lock = Lock()
+        self.frame_count = 0
+        self.byte_count = 0
+        self._queue = SimpleQueue()
+        self._segment = None
+        self._segment_bytes = 0
+        self._segment_count = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def stream_id(self, name):
+        """Id of the named stream, registered on first use.
+
+        Streams register from their own threads (socket starts, the Binance
+        depth snapshot), the lock keeps two of them off the same id.
+        """
+        stream_id = self.streams.get(name)
+        if stream_id is not None:
+            return stream_id
+        with self._streams_lock:
+            if name not in self.streams:
+                stream_id = len(self.streams) + 1
+                self._queue.put((STREAM_TABLE_ID, time.time(), self._stream_entry(name, stream_id)))
+                self.streams[name] = stream_id
+            return self.streams[name]
+
+    def record(self, stream_id, raw, received_at):
+        self._queue.put((stream_id, received_at, raw))
+
+    def close(self):
+        self._queue.put(_Stop)
+        self.join(timeout=5)
+
+    def _stream_entry(self, name, stream_id):
+        return json.dumps({'id': stream_id, 'name': name}).encode('utf8')
+
+    def _open_next_segment(self):
+        self._close_segment()
+        self._segment_count += 1
+        name = 'frames-%d-%04d.log%s' % (int(time.time()), self._segment_count, COMPRESSIONS[self.compression])
+        path = os.path.join(self.directory, name)
+        log.info('FrameRecorder: new segment %s', path)
+        self._segment = _open_segment(path, self.compression, 'wb')
+        self._segment_bytes = 0
+        table = [SEGMENT_MAGIC]
+        now = time.time()
+        for name, stream_id in sorted(self.streams.items(), key=lambda item: item[1]):
+            entry = self._stream_entry(name, stream_id)
+            table.append(RECORD_HEADER.pack(len(entry), STREAM_TABLE_ID, now))
+            table.append(entry)
+        self._segment.write(b''.join(table))
+
+    def _close_segment(self):
+        if self._segment is not None:
+            self._segment.close()
+            self._segment = None
+
+    def _write(self, batch):
+        if self._segment is None or self._segment_bytes >= self.segment_size:
+            self._open_next_segment()
+        pack = RECORD_HEADER.pack
+        chunks = []
+        size = 0
+        frames = 0
+        for stream_id, received_at, raw in batch:
+            if isinstance(raw, str):
+                raw = raw.encode('utf8')
+            chunks.append(pack(len(raw), stream_id, received_at))
+            chunks.append(raw)
+            size += len(raw)
+            frames += stream_id != STREAM_TABLE_ID
+        self._segment.write(b''.join(chunks))
+        self._segment_bytes += size
+        self.frame_count += frames
+        self.byte_count += size
+
+    def run(self):
+        queue = self._queue
+        last_flush = time.monotonic()
+        stopped = False
+        while not stopped:
+            try:
+                item = queue.get(timeout=self.flush_interval)
+            except Empty:
+                item = None
+            batch = []
+            while item is not None:
+                if item is _Stop:
+                    stopped = True
+                    break
+                batch.append(item)
+                if len(batch) >= self.max_batch:
+                    break
+                try:
+                    item = queue.get_nowait()
+                except Empty:
+                    item = None
+            try:
+                if batch:
+                    self._write(batch)
+                now = time.monotonic()
+                if self._segment is not None and now - last_flush >= self.flush_interval:
+                    self._segment.flush()
+                    last_flush = now
+            except Exception as e:
+                log.exception(e)
+        self._close_segment()
+
+    def stat(self):
+        return {
+            'frames': self.frame_count,
+            'bytes': self.byte_count,
+            'segments': self._segment_count,
+            'queued': self._queue.qsize(),
+        }
+
+def segment_paths(path):
+    """Segment files of a recording directory in write order, or the given file."""
+    if os.path.isdir(path):
+        return sorted(glob.glob(os.path.join(path, 'frames-*.log*')))
+    return [path]
+
+def _read_exact(segment, size):
+    data = segment.read(size)
+    while 0 < len(data) < size:
+        more = segment.read(size - len(data))
+        if not more:
+            break
+        data += more
+    return data
+
+def read_frames(path):
+    """Yields ``(stream name, receive time, frame bytes)`` of a recording.
+
+    ``path`` is a recording directory or a single segment. A segment cut
+    short by a crash ends at its last complete record.
+    """
+    header_size = RECORD_HEADER.size
+    for segment_path in segment_paths(path):
+        compression = None
+        for name, extension in COMPRESSIONS.items():
+            if extension and segment_path.endswith(extension):
+                compression = name
+        streams = {}
+        with _open_segment(segment_path, compression, 'rb') as segment:
+            if _read_exact(segment, len(SEGMENT_MAGIC)) != SEGMENT_MAGIC:
+                raise ValueError('not a frame recording: %s' % segment_path)
+            while True:
+                header = _read_exact(segment, header_size)
+                if len(header) < header_size:
+                    break
+                length, stream_id, received_at = RECORD_HEADER.unpack(header)
+                raw = _read_exact(segment, length)
+                if len(raw) < length:
+                    break
+                if stream_id == STREAM_TABLE_ID:
+                    entry = json.loads(raw.decode('utf8'))
+                    streams[entry['id']] = entry['name']
+                    continue
+                yield streams.get(stream_id, stream_id), received_at, raw
@@ -0,0 +1,203 @@
+import argparse
+import time
+
+from btcbot.binance import Binance
+from btcbot.bitfinex import Bitfinex
+from btcbot.data import OrderExecutor
+from btcbot.recorder import read_frames
+from btcbot.stats import Histogram
+from btcbot.trace import StageTracer
+
+import logging
+log = logging.getLogger()
+
+class ReplayClock:
+    """Virtual time of a replay, the receive time of the current frame."""
+
+    def __init__(self):
+        self.now = 0
+
+class ReplayBinance(Binance):
+    """Binance fed from a recording: no client, orders only logged."""
+
+    def __init__(self, clock, *args, **kwargs):
+        self.clock = clock
+        self.orders = []
+        super(ReplayBinance, self).__init__(*args, **kwargs)
+
+    def _create_client(self, key, secret):
+        return None
+
+    def _request_depth_snapshot(self):
+        # the REST snapshot is recorded as a frame of its own, it is replayed in turn
+        pass
+
+    def new_order(self, amount, price):
+        self.orders.append((self.clock.now, amount, price))
+        return True
+
+class ReplayBitfinex(Bitfinex):
+    """Bitfinex fed from a recording, routed like the asyncio transport."""
+
+    def __init__(self, clock, *args, **kwargs):
+        self.clock = clock
+        self.orders = []
+        super(ReplayBitfinex, self).__init__(*args, **kwargs)
+        self._route_to_handlers()
+
+    def new_order(self, amount, price):
+        self.orders.append((self.clock.now, amount, price))
+        return True
+
+class ReplayExecutor(OrderExecutor):
+    """Keeps every decision and places the orders in line, never busy."""
+
+    def __init__(self, clock):
+        super(ReplayExecutor, self).__init__()
+        self.clock = clock
+        self.decisions = []
+
+    def do_trade(self, exchange_buy_from, exchange_sell_to, amount, buy_price, sell_price):
+        self.decisions.append((self.clock.now, exchange_buy_from.name, exchange_sell_to.name, amount, buy_price, sell_price))
+        exchange_sell_to.new_order(-amount, sell_price)
+        exchange_buy_from.new_order(amount, buy_price)
+
+class Replay:
+    """Drives the exchange handlers and the bot from a frame recording.
+
+    Frames are decoded and dispatched in recorded order on the calling
+    thread, as fast as the handlers go. The virtual clock follows the
+    receive times. Each handler gets its own latency histogram, the bot's
+    check runs inside the book handlers and is also measured on its own.
+    """
+
+    def __init__(self, bot, balances=None, depth_snapshot=True):
+        self.clock = ReplayClock()
+        self.latency = {}
+        self.frame_count = 0
+        self.first_at = None
+        self.elapsed = 0
+
+        bot.transport = None
+        bot.recorder = None
+        bot.tracer = StageTracer()
+        bot.order_executor = ReplayExecutor(self.clock)
+        check_arbitrage = self._timed('bot.check_arbitrage', bot.check_arbitrage)
+        bot.bitfinex = ReplayBitfinex(self.clock, on_order_book_update=check_arbitrage)
+        bot.binance = ReplayBinance(self.clock, on_order_book_update=check_arbitrage)
+        self.bot = bot
+        self.binance = bot.binance
+        self.bitfinex = bot.bitfinex
+        for exchange in (self.binance, self.bitfinex):
+            exchange.asset_list.update(balances or {})
+        if not depth_snapshot:
+            # recordings without the REST snapshot build the book from the diffs alone
+            self.binance._apply_depth_snapshot({'lastUpdateId': 0, 'bids': [], 'asks': []})
+
+        processor = self.bitfinex.socket_client.queue_processor
+        for queue in (processor.books, processor.candles):
+            for key, direct_queue in queue.items():
+                direct_queue.put = self._timed('bitfinex.' + direct_queue.put.__name__, direct_queue.put)
+        processor.account.put = self._timed('bitfinex.process_account', processor.account.put)
+
+        self.handlers = {
+            'binance/rest/depth': self._timed('binance._apply_depth_snapshot', self._binance_depth_snapshot),
+            'binance/rest/account': self._timed('binance._process_assets', self._binance_account),
+        }
+        self._binance_message = self._timed('binance.process_message', self._binance_message)
+        self._bitfinex_message = self._timed('bitfinex._on_stream_message', self._bitfinex_message)
+        self._decode = self.binance.json_loads
+
+    def _timed(self, name, handler):
+        histogram = self.latency[name] = Histogram()
+        perf_counter = time.perf_counter
+
+        def timed(*args):
+            begin = perf_counter()
+            handler(*args)
+            histogram.record(perf_counter() - begin)
+        timed.__name__ = handler.__name__
+        return timed
+
+    def _binance_depth_snapshot(self, data, received_at):
+        self.binance._apply_depth_snapshot(data)
+
+    def _binance_account(self, data, received_at):
+        self.binance._process_assets(data['balances'])
+
+    def _binance_message(self, data, received_at):
+        self.binance.process_message((data, received_at))
+
+    def _bitfinex_message(self, data, received_at):
+        self.bitfinex._on_stream_message(data, received_at)
+
+    def _handler(self, stream):
+        if stream in self.handlers:
+            return self.handlers[stream]
+        if stream.startswith('bitfinex'):
+            handler = self._bitfinex_message
+        elif stream.startswith('binance'):
+            handler = self._binance_message
+        else:
+            log.info('replay: no handler for stream %s, skipped', stream)
+            handler = None
+        self.handlers[stream] = handler
+        return handler
+
+    def run(self, path):
+        decode = self._decode
+        clock = self.clock
+        begin = time.perf_counter()
+        for stream, received_at, raw in read_frames(path):
+            handler = self._handler(stream)
+            if handler is None:
+                continue
+            if self.first_at is None:
+                self.first_at = received_at
+            clock.now = received_at
+            try:
+                data = decode(raw)
+            except ValueError:
+                continue
+            try:
+                handler(data, received_at)
+            except Exception as e:
+                log.exception(e)
+            self.frame_count += 1
+        self.elapsed = time.perf_counter() - begin
+
+    def report(self):
+        lines = []
+        span = self.clock.now - self.first_at if self.first_at is not None else 0
+        rate = self.frame_count / self.elapsed if self.elapsed else 0
+        lines.append('frames: %d in %.3f s, %.0f msg/s, recorded span %.1f s (%.0fx real time)' % (
+            self.frame_count, self.elapsed, rate, span, span / self.elapsed if self.elapsed else 0))
+        lines.append('%32s %10s %10s %10s %10s' % ('handler', 'count', 'p50 us', 'p99 us', 'max us'))
+        for name, histogram in sorted(self.latency.items()):
+            count = histogram.count()
+            if count:
+                lines.append('%32s %10d %10d %10d %10d' % (
+                    name, count, histogram.percentile(50), histogram.percentile(99), histogram.max))
+        decisions = self.bot.order_executor.decisions
+        lines.append('decisions: %d' % len(decisions))
+        for at, buy_from, sell_to, amount, buy_price, sell_price in decisions:
+            lines.append('%.6f %s => %s amount %s buy %.8f sell %.8f' % (at, buy_from, sell_to, amount, buy_price, sell_price))
+        return '\n'.join(lines)
+
+def parse_balance(value):
+    token, _, amount = value.partition('=')
+    return token, float(amount)
+
+def main(bot, argv):
+    parser = argparse.ArgumentParser(prog='app.py replay', description='Replays a frame recording through the bot.')
+    parser.add_argument('path', help='recording directory or segment file')
+    parser.add_argument('--balance', action='append', type=parse_balance, default=[],
+                        metavar='TOKEN=AMOUNT', help='starting balance on both exchanges, repeatable')
+    parser.add_argument('--no-depth-snapshot', action='store_true',
+                        help='the recording has no Binance REST depth snapshot, start from an empty book')
+    args = parser.parse_args(argv)
+
+    replay = Replay(bot, dict(args.balance), depth_snapshot=not args.no_depth_snapshot)
+    replay.run(args.path)
+    print(replay.report())
+    return replay
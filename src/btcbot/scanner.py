@@ -0,0 +1,131 @@
+import math
+
+import numpy as np
+
+import logging
+log = logging.getLogger()
+
+def crossing_levels(asks_book, bids_book, buy_price_ratio, sell_price_ratio, max_levels=None):
+    """Return the ask and bid levels that can cross each other.
+
+    Asks are only worth looking at up to the price where their fee-adjusted
+    cost meets the best bid's income, and the other way round, so the ladders
+    are cut there with a bisect instead of materializing the whole books. One
+    extra level is kept on each side to absorb float rounding of the cut.
+    ``max_levels`` bounds the work per tick when the books cross deeply.
+
+    :return: two float64 arrays of shape (n, 2) holding (price, amount) rows
+    """
+    best_ask, _ = asks_book.best()
+    best_bid, _ = bids_book.best()
+    ask_count = asks_book.count_within(best_bid * sell_price_ratio / buy_price_ratio) + 1
+    bid_count = bids_book.count_within(best_ask * buy_price_ratio / sell_price_ratio) + 1
+    if max_levels is not None:
+        ask_count = min(ask_count, max_levels)
+        bid_count = min(bid_count, max_levels)
+    asks = np.array(asks_book.to_list(ask_count), dtype=np.float64).reshape(-1, 2)
+    bids = np.array(bids_book.to_list(bid_count), dtype=np.float64).reshape(-1, 2)
+    return asks, bids
+
+def find_trade(asks, bids, buy_price_ratio, sell_price_ratio, curency_token_has, target_token_has):
+    """Pick the trade the level-by-level scan in Bot.try_to_trade would pick.
+
+    Every (ask, bid) pair of the crossing region is evaluated at once: a pair
+    is a candidate when it is profitable after fees and at least one whole
+    unit can be traded, capped at half of each level and by both balances.
+    The smallest candidate amount wins, ties going to the better ask and then
+    the better bid, exactly like the stable sort of the candidate list did.
+
+    :return: (amount, buy_price, sell_price, profit) or None
+    """
+    ask_price, ask_amount = asks[:, 0], asks[:, 1]
+    bid_price, bid_amount = bids[:, 0], bids[:, 1]
+
+    buy_price_cost = ask_price * buy_price_ratio
+    sell_price_income = bid_price * sell_price_ratio
+    profit_price = sell_price_income[np.newaxis, :] - buy_price_cost[:, np.newaxis]
+    profitable = profit_price > 0
+    if not profitable.any():
+        return None
+
+    amount_can_buy = curency_token_has / ask_price
+    ask_limit = np.minimum(ask_amount * 0.5, amount_can_buy)
+    amounts = np.minimum(ask_limit[:, np.newaxis], bid_amount[np.newaxis, :] * 0.5)
+    amounts = np.minimum(amounts, target_token_has)
+    amounts = np.trunc(np.floor(amounts * 100) / 100.0)
+
+    tradable = profitable & (amounts >= 1)
+    if not tradable.any():
+        log.critical('find_trade: amount_can_trade lower than 1 for all %s profitable pairs, best pair: %s %s', np.count_nonzero(profitable), asks[0].tolist(), bids[0].tolist())
+        return None
+
+    index = np.argmin(np.where(tradable, amounts, np.inf))
+    i, j = np.unravel_index(index, amounts.shape)
+    amount = int(amounts[i, j])
+    return amount, float(ask_price[i]), float(bid_price[j]), amount * float(profit_price[i, j])
+
+def _curve_at(cum_amount, cum_value, price, amount):
+    """Value of a piecewise linear cumulative curve at ``amount``."""
+    index = np.searchsorted(cum_amount, amount, side='left')
+    prev_amount = cum_amount[index - 1] if index else 0.0
+    prev_value = cum_value[index - 1] if index else 0.0
+    return prev_value + (amount - prev_amount) * price[index], index
+
+def find_sweep(asks, bids, buy_price_ratio, sell_price_ratio, curency_token_has, target_token_has, depth_ratio=0.5):
+    """Size a trade that sweeps as many levels as are worth taking.
+
+    Both ladders are turned into cumulative curves: quantity against the
+    notional paid on the ask side and received on the bid side, each level
+    counted at ``depth_ratio`` of its displayed amount. The marginal profit of
+    one more unit is the fee-adjusted bid income minus the ask cost at that
+    depth; it only decreases, so net profit peaks where it turns negative.
+    That quantity is capped by the sellable balance and by what the buy
+    balance can pay for, and rounded down to whole units.
+
+    The limit price of each leg is the worst level the quantity reaches, so
+    a FOK order at that price fills across every level on the way.
+
+    :return: (amount, buy_price, sell_price, profit) or None
+    """
+    ask_price, bid_price = asks[:, 0], bids[:, 0]
+    ask_amount = asks[:, 1] * depth_ratio
+    bid_amount = bids[:, 1] * depth_ratio
+
+    ask_cum_amount = np.cumsum(ask_amount)
+    bid_cum_amount = np.cumsum(bid_amount)
+    ask_cum_cost = np.cumsum(ask_amount * ask_price)
+    bid_cum_income = np.cumsum(bid_amount * bid_price)
+
+    # segment k of the merged curve ends at breaks[k]; find the level serving it on each side
+    available = min(ask_cum_amount[-1], bid_cum_amount[-1])
+    breaks = np.union1d(ask_cum_amount, bid_cum_amount)
+    breaks = breaks[breaks <= available]
+    ask_index = np.searchsorted(ask_cum_amount, breaks, side='left')
+    bid_index = np.searchsorted(bid_cum_amount, breaks, side='left')
+    marginal = bid_price[bid_index] * sell_price_ratio - ask_price[ask_index] * buy_price_ratio
+
+    losing = np.flatnonzero(marginal <= 0)
+    count = losing[0] if len(losing) else len(marginal)
+    if count == 0:
+        return None
+    best_amount = breaks[count - 1]
+
+    # the most the buy balance pays for, walking the ask notional curve
+    index = np.searchsorted(ask_cum_cost, curency_token_has, side='right')
+    if index < len(ask_cum_cost):
+        prev_amount = ask_cum_amount[index - 1] if index else 0.0
+        prev_cost = ask_cum_cost[index - 1] if index else 0.0
+        amount_can_buy = prev_amount + (curency_token_has - prev_cost) / ask_price[index]
+    else:
+        amount_can_buy = ask_cum_amount[-1]
+    amount_limit = min(available, amount_can_buy, target_token_has)
+
+    amount = math.floor(min(best_amount, amount_limit))
+    if amount < 1:
+        log.critical('find_sweep: amount_can_trade lower than 1, best_amount: %s amount_limit: %s', best_amount, amount_limit)
+        return None
+
+    cost, buy_index = _curve_at(ask_cum_amount, ask_cum_cost, ask_price, amount)
+    income, sell_index = _curve_at(bid_cum_amount, bid_cum_income, bid_price, amount)
+    profit = income * sell_price_ratio - cost * buy_price_ratio
+    return amount, float(ask_price[buy_index]), float(bid_price[sell_index]), float(profit)
@@ -0,0 +1,92 @@
+class Histogram:
+    """Log-linear latency histogram in the spirit of HdrHistogram.
+
+    Values are kept in microseconds. Below ``2 * SUB_BUCKETS`` every value
+    has its own bucket, above that each power of two is split into
+    ``SUB_BUCKETS`` buckets, so a bucket is never wider than ~6% of the
+    values it holds.
+
+    record() is a few integer operations and one list increment with no
+    lock: writers and readers on other threads never wait on each other,
+    and the worst a race can do is drop a count.
+    """
+
+    SUB_BITS = 4
+    SUB_BUCKETS = 1 << SUB_BITS
+    MAX_BITS = 40
+
+    def __init__(self):
+        self.counts = [0] * ((self.MAX_BITS + 2) * self.SUB_BUCKETS)
+        self.max = 0
+
+    def _index(self, value):
+        shift = value.bit_length() - self.SUB_BITS - 1
+        if shift <= 0:
+            return value
+        if shift > self.MAX_BITS:
+            return len(self.counts) - 1
+        return (shift << self.SUB_BITS) + (value >> shift)
+
+    def _value(self, index):
+        shift = (index >> self.SUB_BITS) - 1
+        if shift <= 0:
+            return index
+        return (index - (shift << self.SUB_BITS)) << shift
+
+    def record(self, seconds):
+        value = int(seconds * 1000000)
+        if value < 0:
+            value = 0
+        # _index() inlined, this is on every message path
+        sub_bits = self.SUB_BITS
+        shift = value.bit_length() - sub_bits - 1
+        if shift <= 0:
+            index = value
+        elif shift > self.MAX_BITS:
+            index = len(self.counts) - 1
+        else:
+            index = (shift << sub_bits) + (value >> shift)
+        self.counts[index] += 1
+        if value > self.max:
+            self.max = value
+
+    def count(self):
+        return sum(self.counts)
+
+    def percentile(self, percent):
+        """Lower bound of the bucket holding the given percentile, in microseconds."""
+        counts = list(self.counts)
+        total = sum(counts)
+        if not total:
+            return 0
+        rank = total * percent / 100.0
+        seen = 0
+        for index, count in enumerate(counts):
+            seen += count
+            if count and seen >= rank:
+                return self._value(index)
+        return self.max
+
+    @classmethod
+    def merged(cls, histograms):
+        """A new histogram holding the counts of all the given ones."""
+        merged = cls()
+        for histogram in histograms:
+            for index, count in enumerate(list(histogram.counts)):
+                if count:
+                    merged.counts[index] += count
+            merged.max = max(merged.max, histogram.max)
+        return merged
+
+    def reset(self):
+        self.counts = [0] * len(self.counts)
+        self.max = 0
+
+    def stat(self):
+        data = {}
+        data['count'] = self.count()
+        data['p50_us'] = self.percentile(50)
+        data['p99_us'] = self.percentile(99)
+        data['p999_us'] = self.percentile(99.9)
+        data['max_us'] = self.max
+        return data
@@ -0,0 +1,60 @@
+import time
+from threading import Thread, Event
+
+from btcbot.trace import StageTracer
+
+import logging
+log = logging.getLogger()
+
+class StrategyThread(Thread):
+    """Runs the arbitrage check on a thread of its own.
+
+    The threads applying book updates only call wake(), which sets the
+    "books dirty" event and returns; the check runs here against copies
+    of the books, see Exchange.snapshot_book(), so a slow scan never
+    holds up ingest. Updates arriving while a check runs set the event
+    again and are covered by one more check, however many there were.
+    """
+
+    def __init__(self, check):
+        super(StrategyThread, self).__init__(name='Strategy', daemon=True)
+        self.check = check
+        self.tracer = StageTracer()
+        self.wake_count = 0
+        self.check_count = 0
+        self._dirty = Event()
+        self._stopped = Event()
+        self._received_at = None
+        self._woken_at = None
+
+    def wake(self):
+        self._received_at = self.tracer.received_at()
+        self._woken_at = time.perf_counter()
+        self.wake_count += 1
+        self._dirty.set()
+
+    def run(self):
+        while True:
+            self._dirty.wait()
+            if self._stopped.is_set():
+                break
+            self._dirty.clear()
+            self.check_count += 1
+            if self.tracer.enabled:
+                self.tracer.record('wake', time.perf_counter() - self._woken_at)
+                self.tracer.begin(self._received_at)
+            try:
+                self.check()
+            except Exception as e:
+                log.exception(e)
+
+    def stop(self):
+        self._stopped.set()
+        self._dirty.set()
+        self.join()
+
+    def stat(self):
+        data = {}
+        data['wakes'] = self.wake_count
+        data['checks'] = self.check_count
+        return data
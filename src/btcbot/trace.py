@@ -0,0 +1,107 @@
+import time
+import threading
+
+from btcbot import utils
+from btcbot.stats import Histogram
+
+class StageTracer(metaclass=utils.Singleton):
+    """Where the time goes between a frame arriving and an order going out.
+
+    Every stage has its own Histogram, in pipeline order:
+
+    - decode: json decoding of a frame
+    - route: btfxwss QueueProcessor routing of a message
+    - dequeue: frame received to picked up by its QueuePoller
+    - apply: picked up to the book updated
+    - wake: book updated to the strategy thread picking it up
+    - scan: strategy thread woken to the arbitrage scan done, from book
+      updated when the scan runs on the updating thread
+    - order: new_order sent to answered, per leg
+    - tick_to_trade: frame received to do_trade, for the frame that triggered it
+
+    Stages inside one thread are timed with perf_counter. The ones crossing
+    threads start from the receive timestamp every message already carries,
+    which is wall clock time; a clock step shows up as one zero or one
+    outlier, never as a negative. The message being handled is tracked per
+    thread by begin(), so nothing is added to the messages themselves.
+    """
+
+    STAGES = ('decode', 'route', 'dequeue', 'apply', 'wake', 'scan', 'order', 'tick_to_trade')
+
+    def __init__(self):
+        self.enabled = True
+        self.histograms = {stage: Histogram() for stage in self.STAGES}
+        # histograms kept elsewhere that count towards a stage
+        self._shared = {stage: [] for stage in self.STAGES}
+        self._local = threading.local()
+
+    def timed(self, stage, func):
+        """Wraps func to record every call under stage, func itself when tracing is off."""
+        if not self.enabled:
+            return func
+        histogram = self.histograms[stage]
+        perf_counter = time.perf_counter
+
+        def timed_func(*args, **kwargs):
+            begin = perf_counter()
+            ret = func(*args, **kwargs)
+            histogram.record(perf_counter() - begin)
+            return ret
+        return timed_func
+
+    def share(self, stage, histogram):
+        """Counts histogram, recorded by its owner, towards stage."""
+        self._shared[stage].append(histogram)
+
+    def record(self, stage, seconds):
+        if self.enabled:
+            self.histograms[stage].record(seconds)
+
+    def begin(self, received_at):
+        """Starts following the message received at received_at on this thread."""
+        if self.enabled:
+            local = self._local
+            local.received_at = received_at
+            local.mark = time.perf_counter()
+
+    def received_at(self):
+        """The receive timestamp of this thread's message, to hand it to another thread."""
+        return getattr(self._local, 'received_at', None)
+
+    def mark(self, stage):
+        """Records the time since the previous mark of this thread's message."""
+        if not self.enabled:
+            return
+        local = self._local
+        last = getattr(local, 'mark', None)
+        if last is None:
+            return
+        now = time.perf_counter()
+        self.histograms[stage].record(now - last)
+        local.mark = now
+
+    def tick_to_trade(self):
+        if not self.enabled:
+            return
+        received_at = getattr(self._local, 'received_at', None)
+        if received_at is not None:
+            self.histograms['tick_to_trade'].record(time.time() - received_at)
+
+    def reset(self):
+        for stage in self.STAGES:
+            for histogram in [self.histograms[stage]] + self._shared[stage]:
+                histogram.reset()
+
+    def histogram(self, stage):
+        """The stage's histogram, merged with the ones shared with it."""
+        histogram = self.histograms[stage]
+        if self._shared[stage]:
+            histogram = Histogram.merged([histogram] + self._shared[stage])
+        return histogram
+
+    def stat(self):
+        data = {}
+        data['enabled'] = self.enabled
+        for stage in self.STAGES:
+            data[stage] = self.histogram(stage).stat()
+        return data
@@ -28,18 +28,20 @@ class BtfxWssClient:
     Data can be accessed using the provided methods.
     """
 
-    def __init__(self, key=None, secret=None, **wss_kwargs):
+    def __init__(self, key=None, secret=None, queue_factory=None, **wss_kwargs):
         """
         Initializes BtfxWssClient Instance.
         :param key: Api Key as string
         :param secret: Api secret as string
+        :param queue_factory: callable creating the internal queues
         :param addr: Websocket API Address
         """
         self.key = key if key else ''
         self.secret = secret if secret else ''
 
-        self.conn = WebSocketConnection(**wss_kwargs)
-        self.queue_processor = QueueProcessor(self.conn.q)
+        self.conn = WebSocketConnection(queue_factory=queue_factory, **wss_kwargs)
+        self.queue_processor = QueueProcessor(self.conn.q, queue_factory=queue_factory,
+                                              name=self.conn.stream + '.QueueProcessor')
 
     ##############
     # Properties #
@@ -5,8 +5,11 @@ import time
 import ssl
 import hashlib
 import hmac
-from multiprocessing import Queue
-from threading import Thread, Event, Timer
+try:
+    from queue import SimpleQueue
+except ImportError:  # python < 3.7
+    from queue import Queue as SimpleQueue
+from threading import Thread, Event, Lock
 from collections import OrderedDict
 
 # Import Third-Party
@@ -18,6 +21,75 @@ import websocket
 log = logging.getLogger(__name__)
 
 
+def auth_payload(api_key, secret):
+    """Builds the payload of an 'auth' event.
+
+    :param api_key: Api Key as string
+    :param secret: Api secret as string
+    :return: dict
+    """
+    nonce = str(int(time.time() * 10000000))
+    auth_string = 'AUTH' + nonce
+    auth_sig = hmac.new(secret.encode(), auth_string.encode(),
+                        hashlib.sha384).hexdigest()
+
+    return {'event': 'auth', 'apiKey': api_key, 'authSig': auth_sig,
+            'authPayload': auth_string, 'authNonce': nonce}
+
+
+class ConnectionWatchdog(Thread):
+    """Single thread supervising the timeouts of all connections.
+
+    Connections only stamp ``last_message_at`` when data arrives; the
+    watchdog looks at every registered connection once per ``interval``
+    seconds and lets it send pings or issue reconnects from there, instead
+    of every connection restarting its own timer threads on each message.
+    """
+    _instance = None
+    _instance_lock = Lock()
+
+    @classmethod
+    def instance(cls):
+        """Returns the shared watchdog, starting it on first use.
+
+        :return: ConnectionWatchdog
+        """
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+                cls._instance.start()
+            return cls._instance
+
+    def __init__(self, interval=1):
+        Thread.__init__(self, name='ConnectionWatchdog')
+        self.daemon = True
+        self.interval = interval
+        self._connections = []
+        self._lock = Lock()
+
+    def register(self, conn):
+        with self._lock:
+            if conn not in self._connections:
+                self._connections.append(conn)
+
+    def unregister(self, conn):
+        with self._lock:
+            if conn in self._connections:
+                self._connections.remove(conn)
+
+    def run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                connections = list(self._connections)
+            now = time.monotonic()
+            for conn in connections:
+                try:
+                    conn._check_timers(now)
+                except Exception as e:
+                    log.exception(e)
+
+
 class WebSocketConnection(Thread):
     """Websocket Connection Thread
 
@@ -29,7 +101,8 @@ class WebSocketConnection(Thread):
     """
     def __init__(self, *args, url=None, timeout=None, sslopt=None,
                  http_proxy_host=None, http_proxy_port=None, http_proxy_auth=None, http_no_proxy=None,
-                 reconnect_interval=None, **kwargs):
+                 reconnect_interval=None, queue_factory=None, json_loads=None,
+                 decode_bytes=False, recorder=None, stream=None, **kwargs):
         """Initialize a WebSocketConnection Instance.
 
         :param data_q: Queue(), connection to the Client Class
@@ -43,15 +116,36 @@ class WebSocketConnection(Thread):
         :param timeout: timeout for connection; defaults to 10s
         :param reconnect_interval: interval at which to try reconnecting;
                                    defaults to 10s.
+        :param queue_factory: callable creating the queue passed up to the
+                              client; defaults to queue.SimpleQueue.
+        :param json_loads: callable decoding frames, str or bytes;
+                           defaults to json.loads.
+        :param decode_bytes: hand frames to json_loads as undecoded bytes,
+                             skipping the utf-8 validation of the socket.
+        :param recorder: optional frame recorder, gets every raw frame
+                         with its receive time.
+        :param stream: stream name the frames are recorded and counted under;
+                       defaults to the url.
         :param kwargs: kwargs for Thread.__ini__()
         """
         # Queue used to pass data up to BTFX client
-        self.q = Queue()
+        self.q = queue_factory() if queue_factory else SimpleQueue()
 
         # Connection Settings
         self.socket = None
         self.url = url if url else 'wss://api.bitfinex.com/ws/2'
         self.sslopt = sslopt if sslopt else {}
+        self.json_loads = json_loads if json_loads else json.loads
+        self.decode_bytes = decode_bytes
+
+        # Raw frame recording
+        self.recorder = recorder
+        self.stream = stream if stream else self.url
+        self.stream_id = recorder.stream_id(self.stream) if recorder else None
+
+        # Counters read by the metrics exporter, plain ints: no lock on the hot path
+        self.message_count = 0
+        self.reconnect_count = 0
 
         # Proxy Settings
         self.http_proxy_host = http_proxy_host
@@ -69,22 +163,21 @@ class WebSocketConnection(Thread):
         self.reconnect_interval = reconnect_interval if reconnect_interval else 10
         self.paused = Event()
 
-        # Setup Timer attributes
+        # Setup Timer attributes, checked by the ConnectionWatchdog
         # Tracks API Connection & Responses
-        self.ping_timer = None
+        self.last_message_at = time.monotonic()
         self.ping_interval = 120
 
         # Tracks Websocket Connection
-        self.connection_timer = None
         self.connection_timeout = timeout if timeout else 10
 
         # Tracks responses from send_ping()
-        self.pong_timer = None
-        self.pong_received = False
+        self.ping_sent_at = None
         self.pong_timeout = 30
+        self.watchdog = ConnectionWatchdog.instance()
 
-        # Call init of Thread and pass remaining args and kwargs
-        Thread.__init__(self)
+        # Named after the stream, profiles and thread dumps tell them apart
+        Thread.__init__(self, name=self.stream + '.connection')
         self.daemon = True
 
     def disconnect(self):
@@ -93,6 +186,7 @@ class WebSocketConnection(Thread):
         :return:
         """
         log.debug("disconnect(): Disconnecting from API..")
+        self.watchdog.unregister(self)
         self.reconnect_required.clear()
         self.disconnect_called.set()
         if self.socket:
@@ -134,7 +228,8 @@ class WebSocketConnection(Thread):
                         http_proxy_host=self.http_proxy_host,
                         http_proxy_port=self.http_proxy_port,
                         http_proxy_auth=self.http_proxy_auth,
-                        http_no_proxy=self.http_no_proxy)
+                        http_no_proxy=self.http_no_proxy,
+                        skip_utf8_validation=self.decode_bytes)
 
         while self.reconnect_required.is_set():
             if not self.disconnect_called.is_set():
@@ -150,7 +245,8 @@ class WebSocketConnection(Thread):
                                 http_proxy_host=self.http_proxy_host,
                                 http_proxy_port=self.http_proxy_port,
                                 http_proxy_auth=self.http_proxy_auth,
-                                http_no_proxy=self.http_no_proxy)
+                                http_no_proxy=self.http_no_proxy,
+                                skip_utf8_validation=self.decode_bytes)
 
     def run(self):
         """Main method of Thread.
@@ -165,14 +261,18 @@ class WebSocketConnection(Thread):
 
         :return:
         """
-        self._stop_timers()
+        # We've received data, this is all the watchdog needs
+        self.last_message_at = time.monotonic()
 
         raw, received_at = message, time.time()
+        self.message_count += 1
+        if self.recorder is not None:
+            self.recorder.record(self.stream_id, raw, received_at)
         log.debug("_on_message(): Received new message %s at %s",
                        raw, received_at)
         try:
-            data = json.loads(raw)
-        except json.JSONDecodeError:
+            data = self.json_loads(raw)
+        except ValueError:
             # Something wrong with this data, log and discard
             return
 
@@ -187,20 +287,19 @@ class WebSocketConnection(Thread):
             else:
                 self._data_handler(data, received_at)
 
-        # We've received data, reset timers
-        self._start_timers()
-
     def _on_close(self, ws, *args):
         log.info("Connection closed")
         self.connected.clear()
-        self._stop_timers()
+        self.watchdog.unregister(self)
 
     def _on_open(self, ws):
         log.info("Connection opened")
         self.connected.set()
+        self.last_message_at = time.monotonic()
         self.send_ping()
-        self._start_timers()
+        self.watchdog.register(self)
         if self.reconnect_required.is_set():
+            self.reconnect_count += 1
             log.info("_on_open(): Connection reconnected, re-subscribing..")
             self._resubscribe(soft=False)
 
@@ -209,61 +308,53 @@ class WebSocketConnection(Thread):
         self.reconnect_required.set()
         self.connected.clear()
 
-    def _stop_timers(self):
-        """Stops ping, pong and connection timers.
+    def _check_timers(self, now):
+        """Checks the ping, pong and connection timeouts.
 
-        :return:
-        """
-        if self.ping_timer:
-            self.ping_timer.cancel()
-
-        if self.connection_timer:
-            self.connection_timer.cancel()
-
-        if self.pong_timer:
-            self.pong_timer.cancel()
-        log.debug("_stop_timers(): Timers stopped.")
-
-    def _start_timers(self):
-        """Resets and starts timers for API data and connection.
+        Called by the ConnectionWatchdog thread.
 
+        :param now: time.monotonic() timestamp
         :return:
         """
-        log.debug("_start_timers(): Resetting timers..")
-        self._stop_timers()
-
-        # Sends a ping at ping_interval to see if API still responding
-        self.ping_timer = Timer(self.ping_interval, self.send_ping)
-        self.ping_timer.start()
+        if not self.connected.is_set():
+            return
 
         # Automatically reconnect if we didnt receive data
-        self.connection_timer = Timer(self.connection_timeout,
-                                      self._connection_timed_out)
-        self.connection_timer.start()
+        if now - self.last_message_at > self.connection_timeout:
+            self._connection_timed_out()
+            return
+
+        if self.ping_sent_at is not None:
+            if self.last_message_at >= self.ping_sent_at:
+                # Data arrived since the ping, the API is responding
+                self.ping_sent_at = None
+            elif now - self.ping_sent_at > self.pong_timeout:
+                self._check_pong()
+        elif now - self.last_message_at > self.ping_interval:
+            # Sends a ping at ping_interval to see if API still responding
+            self.send_ping()
 
     def send_ping(self):
-        """Sends a ping message to the API and starts pong timers.
+        """Sends a ping message to the API and starts waiting for the pong.
 
         :return:
         """
         log.debug("send_ping(): Sending ping to API..")
+        self.ping_sent_at = time.monotonic()
         self.socket.send(json.dumps({'event': 'ping'}))
-        self.pong_timer = Timer(self.pong_timeout, self._check_pong)
-        self.pong_timer.start()
 
     def _check_pong(self):
         """Checks if a Pong message was received.
 
         :return:
         """
-        self.pong_timer.cancel()
-        if self.pong_received:
+        if self.ping_sent_at is None:
             log.debug("_check_pong(): Pong received in time.")
-            self.pong_received = False
         else:
             # reconnect
             log.debug("_check_pong(): Pong not received in time."
                            "Issuing reconnect..")
+            self.ping_sent_at = None
             self.reconnect()
 
     def send(self, api_key=None, secret=None, list_data=None, auth=False, **kwargs):
@@ -273,14 +364,7 @@ class WebSocketConnection(Thread):
         :return:
         """
         if auth:
-            nonce = str(int(time.time() * 10000000))
-            auth_string = 'AUTH' + nonce
-            auth_sig = hmac.new(secret.encode(), auth_string.encode(),
-                                hashlib.sha384).hexdigest()
-
-            payload = {'event': 'auth', 'apiKey': api_key, 'authSig': auth_sig,
-                       'authPayload': auth_string, 'authNonce': nonce}
-            payload = json.dumps(payload)
+            payload = json.dumps(auth_payload(api_key, secret))
         elif list_data:
             payload = json.dumps(list_data)
         else:
@@ -335,10 +419,9 @@ class WebSocketConnection(Thread):
 
         :return:
         """
-        # Restart our timers since we received some data
+        # _on_message already stamped last_message_at for the watchdog
         log.debug("_heartbeat_handler(): Received a heart beat "
                        "from connection!")
-        self._start_timers()
 
     def _pong_handler(self):
         """Handle a pong response.
@@ -347,7 +430,7 @@ class WebSocketConnection(Thread):
         """
         # We received a Pong response to our Ping!
         log.debug("_pong_handler(): Received a Pong message!")
-        self.pong_received = True
+        self.ping_sent_at = None
 
     def _system_handler(self, data, ts):
         """Distributes system messages to the appropriate handler.
@@ -414,9 +497,11 @@ class WebSocketConnection(Thread):
             log.info("API version: %i", data['version'])
             return
 
+        # the API sends the codes as numbers
+        code = str(data['code'])
         try:
-            log.info(info_message[data['code']])
-            codes[data['code']]()
+            log.info(info_message[code])
+            codes[code]()
         except KeyError as e:
             log.exception(e)
             log.error("Unknown Info code %s!", data['code'])
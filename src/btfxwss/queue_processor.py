@@ -2,7 +2,10 @@
 import logging
 from threading import Thread, Event
 from queue import Empty
-from multiprocessing import Queue
+try:
+    from queue import SimpleQueue
+except ImportError:  # python < 3.7
+    from queue import Queue as SimpleQueue
 from collections import defaultdict
 
 # Import Third-Party
@@ -23,11 +26,13 @@ class QueueProcessor(Thread):
 
     """
     def __init__(self, data_q,
-                 *args, **kwargs):
+                 *args, queue_factory=None, **kwargs):
         """Initialze a QueueProcessor instance.
 
         :param data_q: Queue()
         :param args: Thread *args
+        :param queue_factory: callable creating the per channel queues;
+                              defaults to queue.SimpleQueue.
         :param kwargs: Thread **kwargs
         """
         super(QueueProcessor, self).__init__(*args, **kwargs)
@@ -55,12 +60,13 @@ class QueueProcessor(Thread):
 
         # Keeps track of last update to a channel by id.
         self.last_update = {}
-        self.tickers = defaultdict(Queue)
-        self.books = defaultdict(Queue)
-        self.raw_books = defaultdict(Queue)
-        self.trades = defaultdict(Queue)
-        self.candles = defaultdict(Queue)
-        self.account = Queue()
+        queue_factory = queue_factory if queue_factory else SimpleQueue
+        self.tickers = defaultdict(queue_factory)
+        self.books = defaultdict(queue_factory)
+        self.raw_books = defaultdict(queue_factory)
+        self.trades = defaultdict(queue_factory)
+        self.candles = defaultdict(queue_factory)
+        self.account = queue_factory()
 
         # Sentinel Event to kill the thread
         self._stopped = Event()
@@ -104,36 +110,42 @@ class QueueProcessor(Thread):
                 message = self.q.get(timeout=0.1)
             except Empty:
                 continue
+            self.process(message)
 
-            dtype, data, ts = message
-            if dtype in ('subscribed', 'unsubscribed', 'conf', 'auth', 'unauth'):
-                try:
-                    self._response_handlers[dtype](dtype, data, ts)
-                except KeyError:
-                    log.error("Dtype '%s' does not have a response "
-                                   "handler! (%s)", dtype, message)
-            elif dtype == 'data':
-                try:
-                    channel_id = data[0]
-                    if channel_id != 0:
-                        # Get channel type associated with this data to the
-                        # associated data type (from 'data' to
-                        # 'book', 'ticker' or similar
-                        channel_type, *_ = self.channel_directory[channel_id]
-
-                        # Run the associated data handler for this channel type.
-                        self._data_handlers[channel_type](channel_type, data, ts)
-                        # Update time stamps.
-                        self.update_timestamps(channel_id, ts)
-                    else:
-                        # This is data from auth channel, call handler
-                        self._handle_account(data=data, ts=ts)
-                except KeyError:
-                    log.error("Channel ID does not have a data handler! %s",
-                                   message)
-            else:
-                log.error("Unknown dtype on queue! %s", message)
-                continue
+    def process(self, message):
+        """Routes a single message from the connection.
+
+        :param message: (dtype, data, ts) tuple
+        :return:
+        """
+        dtype, data, ts = message
+        if dtype in ('subscribed', 'unsubscribed', 'conf', 'auth', 'unauth'):
+            try:
+                self._response_handlers[dtype](dtype, data, ts)
+            except KeyError:
+                log.error("Dtype '%s' does not have a response "
+                               "handler! (%s)", dtype, message)
+        elif dtype == 'data':
+            try:
+                channel_id = data[0]
+                if channel_id != 0:
+                    # Get channel type associated with this data to the
+                    # associated data type (from 'data' to
+                    # 'book', 'ticker' or similar
+                    channel_type, *_ = self.channel_directory[channel_id]
+
+                    # Run the associated data handler for this channel type.
+                    self._data_handlers[channel_type](channel_type, data, ts)
+                    # Update time stamps.
+                    self.update_timestamps(channel_id, ts)
+                else:
+                    # This is data from auth channel, call handler
+                    self._handle_account(data=data, ts=ts)
+            except KeyError:
+                log.error("Channel ID does not have a data handler! %s",
+                               message)
+        else:
+            log.error("Unknown dtype on queue! %s", message)
 
     def _handle_subscribed(self, dtype, data, ts,):
         """Handles responses to subscribe() commands.
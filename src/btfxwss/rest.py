@@ -1,4 +1,5 @@
 import requests
+from requests.adapters import HTTPAdapter
 import json
 import base64
 import hmac
@@ -19,16 +20,49 @@ PATH_ORDERBOOK = "book/%s"
 # HTTP request timeout in seconds
 TIMEOUT = 5.0
 
+# keep-alive connections kept per host
+POOL_SIZE = 4
+
 class BitfinexRestAuthClient(object):
     """
     Authenticated client for trading through Bitfinex API
+
+    Requests go through one requests Session, so the TCP and TLS handshakes
+    are paid once per pooled connection rather than once per call. Call
+    ping() at startup to open the first connection before it is needed.
     """
 
-    def __init__(self, key, secret):
-        self.URL = "{0:s}://{1:s}/{2:s}".format(PROTOCOL, HOST, VERSION)
+    def __init__(self, key, secret, url=None, pool_size=POOL_SIZE, timeout=TIMEOUT):
+        """
+        :param key: Api Key
+        :param secret: Api Secret
+        :param url: optional - base url of the v1 api, a local stand-in for testing
+        :param pool_size: optional - keep-alive connections kept open, one per thread calling at once
+        :param timeout: optional - seconds to wait for a response
+        """
+        self.URL = url or "{0:s}://{1:s}/{2:s}".format(PROTOCOL, HOST, VERSION)
         self.KEY = key
         self.SECRET = secret
-        pass
+        self.timeout = timeout
+        self.session = self._init_session(pool_size)
+
+    def _init_session(self, pool_size):
+        session = requests.session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers.update({'Accept': 'application/json'})
+        return session
+
+    def ping(self):
+        """
+        Fetch the symbols, a public call that leaves a connection open in the pool
+        """
+        r = self.session.get(self.URL + "/" + PATH_SYMBOLS, timeout=self.timeout)
+        return r.json()
+
+    def close(self):
+        self.session.close()
 
     @property
     def _nonce(self):
@@ -75,7 +109,7 @@ class BitfinexRestAuthClient(object):
         }
 
         signed_payload = self._sign_payload(payload)
-        r = requests.post(self.URL + "/order/new", headers=signed_payload, verify=True)
+        r = self.session.post(self.URL + "/order/new", headers=signed_payload, timeout=self.timeout)
         json_resp = r.json()
 
         try:
@@ -98,7 +132,7 @@ class BitfinexRestAuthClient(object):
         }
 
         signed_payload = self._sign_payload(payload)
-        r = requests.post(self.URL + "/order/cancel", headers=signed_payload, verify=True)
+        r = self.session.post(self.URL + "/order/cancel", headers=signed_payload, timeout=self.timeout)
         json_resp = r.json()
 
         try:
@@ -119,7 +153,7 @@ class BitfinexRestAuthClient(object):
         }
 
         signed_payload = self._sign_payload(payload)
-        r = requests.post(self.URL + "/order/cancel/all", headers=signed_payload, verify=True)
+        r = self.session.post(self.URL + "/order/cancel/all", headers=signed_payload, timeout=self.timeout)
         json_resp = r.json()
         return json_resp
 
@@ -136,7 +170,7 @@ class BitfinexRestAuthClient(object):
         }
 
         signed_payload = self._sign_payload(payload)
-        r = requests.post(self.URL + "/order/status", headers=signed_payload, verify=True)
+        r = self.session.post(self.URL + "/order/status", headers=signed_payload, timeout=self.timeout)
         json_resp = r.json()
 
         try:
@@ -157,7 +191,7 @@ class BitfinexRestAuthClient(object):
         }
 
         signed_payload = self._sign_payload(payload)
-        r = requests.post(self.URL + "/orders", headers=signed_payload, verify=True)
+        r = self.session.post(self.URL + "/orders", headers=signed_payload, timeout=self.timeout)
         json_resp = r.json()
 
         return json_resp
@@ -173,7 +207,7 @@ class BitfinexRestAuthClient(object):
         }
 
         signed_payload = self._sign_payload(payload)
-        r = requests.post(self.URL + "/positions", headers=signed_payload, verify=True)
+        r = self.session.post(self.URL + "/positions", headers=signed_payload, timeout=self.timeout)
         json_resp = r.json()
         return json_resp
 
@@ -190,7 +224,7 @@ class BitfinexRestAuthClient(object):
         }
 
         signed_payload = self._sign_payload(payload)
-        r = requests.post(self.URL + "/position/claim", headers=signed_payload, verify=True)
+        r = self.session.post(self.URL + "/position/claim", headers=signed_payload, timeout=self.timeout)
         json_resp = r.json()
 
         return json_resp
@@ -210,7 +244,7 @@ class BitfinexRestAuthClient(object):
         }
 
         signed_payload = self._sign_payload(payload)
-        r = requests.post(self.URL + "/mytrades", headers=signed_payload, verify=True)
+        r = self.session.post(self.URL + "/mytrades", headers=signed_payload, timeout=self.timeout)
         json_resp = r.json()
 
         return json_resp
@@ -235,7 +269,7 @@ class BitfinexRestAuthClient(object):
         }
 
         signed_payload = self._sign_payload(payload)
-        r = requests.post(self.URL + "/offer/new", headers=signed_payload, verify=True)
+        r = self.session.post(self.URL + "/offer/new", headers=signed_payload, timeout=self.timeout)
         json_resp = r.json()
 
         return json_resp
@@ -252,7 +286,7 @@ class BitfinexRestAuthClient(object):
         }
 
         signed_payload = self._sign_payload(payload)
-        r = requests.post(self.URL + "/offer/cancel", headers=signed_payload, verify=True)
+        r = self.session.post(self.URL + "/offer/cancel", headers=signed_payload, timeout=self.timeout)
         json_resp = r.json()
 
         return json_resp
@@ -269,7 +303,7 @@ class BitfinexRestAuthClient(object):
         }
 
         signed_payload = self._sign_payload(payload)
-        r = requests.post(self.URL + "/offer/status", headers=signed_payload, verify=True)
+        r = self.session.post(self.URL + "/offer/status", headers=signed_payload, timeout=self.timeout)
         json_resp = r.json()
 
         return json_resp
@@ -285,7 +319,7 @@ class BitfinexRestAuthClient(object):
         }
 
         signed_payload = self._sign_payload(payload)
-        r = requests.post(self.URL + "/offers", headers=signed_payload, verify=True)
+        r = self.session.post(self.URL + "/offers", headers=signed_payload, timeout=self.timeout)
         json_resp = r.json()
 
         return json_resp
@@ -301,7 +335,7 @@ class BitfinexRestAuthClient(object):
         }
 
         signed_payload = self._sign_payload(payload)
-        r = requests.post(self.URL + "/balances", headers=signed_payload, verify=True)
+        r = self.session.post(self.URL + "/balances", headers=signed_payload, timeout=self.timeout)
         json_resp = r.json()
 
         return json_resp
@@ -326,7 +360,7 @@ class BitfinexRestAuthClient(object):
             "wallet": wallet
         }
         signed_payload = self._sign_payload(payload)
-        r = requests.post(self.URL + "/history", headers=signed_payload, verify=True)
+        r = self.session.post(self.URL + "/history", headers=signed_payload, timeout=self.timeout)
         json_resp = r.json()
 
         return json_resp
@@ -341,7 +375,7 @@ class BitfinexRestAuthClient(object):
             'address': address,
         }
         signed_payload = self._sign_payload(payload)
-        r = requests.post(self.URL + "/withdraw", headers=signed_payload, verify=True)
+        r = self.session.post(self.URL + "/withdraw", headers=signed_payload, timeout=self.timeout)
         json_resp = r.json()
 
         return json_resp
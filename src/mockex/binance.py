@@ -0,0 +1,343 @@
+"""Local stand-in for the Binance REST API and streams the bot uses.
+
+    cd src && python -m mockex.binance --port 9000 --rate 10000
+
+and point the bot at it in app.yml::
+
+    exchange_list:
+        binance:
+            api_url: 'http://127.0.0.1:9000/api'
+            stream_url: 'ws://127.0.0.1:9000/'
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+
+from mockex.server import MockServer
+
+import logging
+log = logging.getLogger()
+
+class MockBinance:
+    """One symbol of a Binance-like exchange.
+
+    Serves ping, depth, klines, aggTrades, account, openOrders, order (LIMIT
+    FOK) and the listenKey endpoints, the ``<symbol>@depth`` diff stream
+    and the user streams. The book is a random walk around a fixed mid
+    price, changed by ``rate`` depthUpdate events per second; FOK orders
+    fill against it in full or expire, and report to the user streams like
+    Binance does. Signatures are not checked.
+
+    History starts ``listed_days`` ago: klines, and an aggregate trade
+    every ``60 / trades_per_minute`` seconds with ids counting from 0. Both
+    are the same for every request.
+    """
+
+    def __init__(self, symbol='EOSBTC', quote='BTC', mid_price=0.00085, tick=1e-8,
+                 levels=100, rate=1000, balances=None, host='127.0.0.1', port=0, seed=None, latency=0, listed_days=30,
+                 trades_per_minute=10):
+        self.symbol = symbol
+        self.base = symbol[:-len(quote)]
+        self.quote = quote
+        self.mid_price = mid_price
+        self.tick = tick
+        self.levels = levels
+        self.rate = rate
+        self.balances = dict(balances) if balances else {self.base: 10000.0, quote: 10.0}
+        self.random = random.Random(seed)
+        self.bids = {}
+        self.asks = {}
+        self.update_id = 1
+        self.order_id = 1
+        self.depth_sockets = set()
+        self.user_sockets = {}
+        self.sent_count = 0
+        self.listed_at = (int(time.time()) - listed_days * 86400) // 86400 * 86400 * 1000
+        self.trade_spacing = 60000 // trades_per_minute
+        self._tasks = []
+
+        for level in range(1, levels + 1):
+            self.bids[self._price(-level)] = self._quantity()
+            self.asks[self._price(level)] = self._quantity()
+
+        server = self.server = MockServer(host, port, latency=latency)
+        server.route('GET', '/api/v1/ping', lambda request: (200, {}))
+        server.route('GET', '/api/v1/time', lambda request: (200, {'serverTime': self._now()}))
+        server.route('GET', '/api/v1/depth', self.get_depth)
+        server.route('GET', '/api/v1/klines', self.get_klines)
+        server.route('GET', '/api/v1/aggTrades', self.get_agg_trades)
+        server.route('GET', '/api/v3/account', self.get_account)
+        server.route('GET', '/api/v3/openOrders', lambda request: (200, []))
+        server.route('POST', '/api/v3/order', self.create_order)
+        server.route('POST', '/api/v1/userDataStream', self.new_listen_key)
+        server.route('PUT', '/api/v1/userDataStream', lambda request: (200, {}))
+        server.route('DELETE', '/api/v1/userDataStream', self.close_listen_key)
+        server.websocket('/ws/', self.stream)
+
+    def _now(self):
+        return int(time.time() * 1000)
+
+    def _price(self, ticks):
+        return round(self.mid_price + ticks * self.tick, 8)
+
+    def _quantity(self):
+        return round(self.random.uniform(1, 900), 2)
+
+    def _levels(self, book, reverse, limit=None):
+        prices = sorted(book, reverse=reverse)[:limit]
+        return [['%.8f' % price, '%.8f' % book[price], []] for price in prices]
+
+    # REST
+
+    def get_depth(self, request):
+        limit = int(request.params.get('limit', 100))
+        return 200, {
+            'lastUpdateId': self.update_id,
+            'bids': self._levels(self.bids, True, limit),
+            'asks': self._levels(self.asks, False, limit),
+        }
+
+    def _kline(self, open_time, interval_ms):
+        rnd = random.Random(open_time)
+        prices = [self.mid_price + rnd.randint(-50, 50) * self.tick for _ in range(4)]
+        volume = rnd.uniform(100, 10000)
+        return [open_time, '%.8f' % prices[0], '%.8f' % max(prices), '%.8f' % min(prices), '%.8f' % prices[3],
+                '%.8f' % volume, open_time + interval_ms - 1, '%.8f' % (volume * prices[3]), rnd.randint(10, 500),
+                '%.8f' % (volume / 2), '%.8f' % (volume * prices[3] / 2), '0']
+
+    def get_klines(self, request):
+        params = request.params
+        if params.get('symbol') != self.symbol:
+            return 400, {'code': -1121, 'msg': 'Invalid symbol.'}
+        interval = params.get('interval', '')
+        unit = {'m': 60000, 'h': 3600000, 'd': 86400000, 'w': 604800000}.get(interval[-1:])
+        if unit is None or not interval[:-1].isdigit():
+            return 400, {'code': -1120, 'msg': 'Invalid interval.'}
+        interval_ms = int(interval[:-1]) * unit
+        limit = min(int(params.get('limit', 500)), 1000)
+        now = self._now()
+        start = max(int(params.get('startTime', now - limit * interval_ms)), self.listed_at)
+        end = min(int(params.get('endTime', now)), now)
+        open_time = -(-start // interval_ms) * interval_ms
+        klines = []
+        while open_time <= end and len(klines) < limit:
+            klines.append(self._kline(open_time, interval_ms))
+            open_time += interval_ms
+        return 200, klines
+
+    def _agg_trade(self, agg_id):
+        rnd = random.Random(agg_id)
+        return {'a': agg_id, 'p': '%.8f' % self._price(rnd.randint(-50, 50)), 'q': '%.8f' % rnd.uniform(1, 500),
+                'f': agg_id * 2, 'l': agg_id * 2 + 1, 'T': self.listed_at + agg_id * self.trade_spacing,
+                'm': rnd.random() < 0.5, 'M': True}
+
+    def get_agg_trades(self, request):
+        params = request.params
+        if params.get('symbol') != self.symbol:
+            return 400, {'code': -1121, 'msg': 'Invalid symbol.'}
+        limit = min(int(params.get('limit', 500)), 1000)
+        last_id = (self._now() - self.listed_at) // self.trade_spacing
+        if 'fromId' in params:
+            first_id = max(int(params['fromId']), 0)
+        elif 'startTime' in params:
+            first_id = max(-(-(int(params['startTime']) - self.listed_at) // self.trade_spacing), 0)
+        else:
+            first_id = max(last_id - limit + 1, 0)
+        if 'endTime' in params:
+            last_id = min(last_id, (int(params['endTime']) - self.listed_at) // self.trade_spacing)
+        return 200, [self._agg_trade(agg_id) for agg_id in range(first_id, min(first_id + limit, last_id + 1))]
+
+    def _account_balances(self):
+        return [{'asset': asset, 'free': '%.8f' % free, 'locked': '0.00000000'} for asset, free in sorted(self.balances.items())]
+
+    def get_account(self, request):
+        return 200, {
+            'makerCommission': 10, 'takerCommission': 10,
+            'canTrade': True, 'canWithdraw': True, 'canDeposit': True,
+            'updateTime': self._now(),
+            'balances': self._account_balances(),
+        }
+
+    def new_listen_key(self, request):
+        listen_key = uuid.uuid4().hex
+        self.user_sockets[listen_key] = set()
+        return 200, {'listenKey': listen_key}
+
+    def close_listen_key(self, request):
+        for socket in self.user_sockets.pop(request.params.get('listenKey'), ()):
+            socket.close()
+        return 200, {}
+
+    def create_order(self, request):
+        params = request.params
+        if params.get('symbol') != self.symbol:
+            return 400, {'code': -1121, 'msg': 'Invalid symbol.'}
+        if params.get('type') != 'LIMIT' or params.get('timeInForce') != 'FOK':
+            return 400, {'code': -1116, 'msg': 'Only LIMIT FOK orders are supported by the mock.'}
+        side = params['side']
+        price = float(params['price'])
+        quantity = float(params['quantity'])
+        is_buy = side == 'BUY'
+        if is_buy and self.balances.get(self.quote, 0) < price * quantity:
+            return 400, {'code': -2010, 'msg': 'Account has insufficient balance for requested action.'}
+        if not is_buy and self.balances.get(self.base, 0) < quantity:
+            return 400, {'code': -2010, 'msg': 'Account has insufficient balance for requested action.'}
+
+        order_id = self.order_id
+        self.order_id += 1
+        fills = self._match(self.asks if is_buy else self.bids, price, quantity, is_buy)
+        status = 'FILLED' if fills else 'EXPIRED'
+        executed = quantity if fills else 0
+        if fills:
+            cost = sum(fill_price * fill_quantity for fill_price, fill_quantity in fills)
+            sign = 1 if is_buy else -1
+            self.balances[self.base] = self.balances.get(self.base, 0) + sign * quantity
+            self.balances[self.quote] = self.balances.get(self.quote, 0) - sign * cost
+        self._send_user({
+            'e': 'executionReport', 'E': self._now(), 's': self.symbol, 'c': params.get('newClientOrderId', ''),
+            'S': side, 'o': 'LIMIT', 'f': 'FOK', 'q': '%.8f' % quantity, 'p': '%.8f' % price,
+            'x': 'TRADE' if fills else 'EXPIRED', 'X': status, 'i': order_id,
+            'z': '%.8f' % executed, 'T': self._now(),
+        })
+        if fills:
+            self._send_user({
+                'e': 'outboundAccountInfo', 'E': self._now(),
+                'B': [{'a': item['asset'], 'f': item['free'], 'l': item['locked']} for item in self._account_balances()],
+            })
+        return 200, {
+            'symbol': self.symbol, 'orderId': order_id, 'clientOrderId': params.get('newClientOrderId', ''),
+            'transactTime': self._now(), 'price': '%.8f' % price, 'origQty': '%.8f' % quantity,
+            'executedQty': '%.8f' % executed, 'status': status, 'timeInForce': 'FOK', 'type': 'LIMIT', 'side': side,
+        }
+
+    def _match(self, book, price, quantity, is_buy):
+        """Takes ``quantity`` from the levels priced at or better than ``price``, all or nothing."""
+        prices = sorted((level for level in book if (level <= price if is_buy else level >= price)), reverse=not is_buy)
+        fills = []
+        left = quantity
+        for level in prices:
+            if left <= 0:
+                break
+            taken = min(left, book[level])
+            fills.append((level, taken))
+            left -= taken
+        if left > 1e-12:
+            return []
+        changes = []
+        for level, taken in fills:
+            book[level] = round(book[level] - taken, 8)
+            if book[level] <= 0:
+                del book[level]
+            changes.append(['%.8f' % level, '%.8f' % book.get(level, 0), []])
+        self._send_depth(changes if not is_buy else [], changes if is_buy else [])
+        return fills
+
+    # streams
+
+    async def stream(self, socket):
+        name = socket.path[len('/ws/'):]
+        if name == self.symbol.lower() + '@depth':
+            sockets = self.depth_sockets
+        elif name in self.user_sockets:
+            sockets = self.user_sockets[name]
+        else:
+            log.info('mock binance: unknown stream %s', name)
+            return
+        sockets.add(socket)
+        try:
+            async for _ in socket.messages():
+                pass
+        finally:
+            sockets.discard(socket)
+
+    def _send_depth(self, bids, asks):
+        self.update_id += 1
+        if not self.depth_sockets:
+            return
+        frame = json.dumps({
+            'e': 'depthUpdate', 'E': self._now(), 's': self.symbol,
+            'U': self.update_id, 'u': self.update_id, 'b': bids, 'a': asks,
+        })
+        for socket in list(self.depth_sockets):
+            socket.send(frame)
+        self.sent_count += 1
+
+    def _send_user(self, data):
+        for sockets in self.user_sockets.values():
+            for socket in list(sockets):
+                socket.send_json(data)
+
+    def _random_change(self, book, side):
+        ticks = self.random.randint(1, self.levels) * side
+        price = self._price(ticks)
+        if price in book and self.random.random() < 0.3:
+            del book[price]
+            return ['%.8f' % price, '0.00000000', []]
+        book[price] = self._quantity()
+        return ['%.8f' % price, '%.8f' % book[price], []]
+
+    def depth_event(self):
+        bids = [self._random_change(self.bids, -1) for _ in range(self.random.randint(0, 3))]
+        asks = [self._random_change(self.asks, 1) for _ in range(self.random.randint(0 if bids else 1, 3))]
+        self._send_depth(bids, asks)
+
+    async def feed(self, interval=0.005):
+        """Sends ``rate`` depthUpdate events a second, catching up after slow ticks."""
+        begin = time.monotonic()
+        sent = 0
+        while True:
+            await asyncio.sleep(interval)
+            due = int((time.monotonic() - begin) * self.rate)
+            # never burst more than a second's worth after a stall
+            sent = max(sent, due - self.rate)
+            while sent < due:
+                self.depth_event()
+                sent += 1
+
+    async def start(self):
+        await self.server.start()
+        self._tasks.append(asyncio.ensure_future(self.feed()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await self.server.stop()
+
+    @property
+    def api_url(self):
+        return 'http://%s:%d/api' % (self.server.host, self.server.port)
+
+    @property
+    def stream_url(self):
+        return 'ws://%s:%d/' % (self.server.host, self.server.port)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m mockex.binance', description='Local Binance REST and stream stand-in.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9000)
+    parser.add_argument('--symbol', default='EOSBTC')
+    parser.add_argument('--quote', default='BTC')
+    parser.add_argument('--rate', type=int, default=1000, help='depthUpdate events per second')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--latency', type=float, default=0, help='seconds every REST answer is delayed')
+    parser.add_argument('--listed-days', type=int, default=30, help='days of klines and aggregate trades served')
+    parser.add_argument('--trades-per-minute', type=int, default=10, help='aggregate trades served per minute of history')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    loop = asyncio.get_event_loop()
+    mock = MockBinance(args.symbol, args.quote, rate=args.rate, host=args.host, port=args.port, seed=args.seed,
+                       latency=args.latency, listed_days=args.listed_days,
+                       trades_per_minute=args.trades_per_minute)
+    loop.run_until_complete(mock.start())
+    log.info('api_url: %s, stream_url: %s', mock.api_url, mock.stream_url)
+    try:
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,395 @@
+"""Local stand-in for the Bitfinex v2 websocket and v1 REST api the bot uses.
+
+    cd src && python -m mockex.bitfinex --port 9001 --rate 5000 --latency 0.002
+
+and point the bot at it in app.yml::
+
+    exchange_list:
+        bitfinex:
+            stream_url: 'ws://127.0.0.1:9001/ws/2'
+            rest_url: 'http://127.0.0.1:9001/v1'
+
+With --certfile and --keyfile it serves https and wss instead.
+"""
+import argparse
+import asyncio
+import base64
+import json
+import random
+import ssl
+import time
+
+from mockex.server import MockServer
+
+import logging
+log = logging.getLogger()
+
+BOOK_LEN = 25
+
+class MockBitfinex:
+    """One pair of a Bitfinex-like v2 websocket.
+
+    Speaks info, auth, conf, ping, subscribe/unsubscribe of the book (P0)
+    and candles channels, heartbeats, and ``on`` order commands answered
+    with the ``n``/``on``/``oc`` and wallet account events. Only
+    ``EXCHANGE FOK`` orders are taken: they fill in full against the book
+    or are canceled, ``fill_probability`` kills a share of the fillable
+    ones too. Signatures are not checked.
+
+    ``rate`` book updates per second churn the book, ``latency`` seconds
+    delay every answer to a client command, and with ``drop_every`` every
+    client gets an info 20051 (restart, reconnect) and is disconnected
+    that often.
+
+    The v1 REST calls of BitfinexRestAuthClient the bot makes answer from
+    the same state: symbols, balances, orders, mytrades and withdraw.
+    """
+
+    def __init__(self, pair='EOSBTC', quote='BTC', mid_price=0.00085, tick=1e-7,
+                 rate=1000, latency=0, fill_probability=1.0, heartbeat=15, drop_every=None,
+                 balances=None, host='127.0.0.1', port=0, seed=None, ssl=None):
+        self.pair = pair
+        self.symbol = 't' + pair
+        self.base = pair[:-len(quote)]
+        self.quote = quote
+        self.mid_price = mid_price
+        self.tick = tick
+        self.rate = rate
+        self.latency = latency
+        self.fill_probability = fill_probability
+        self.heartbeat = heartbeat
+        self.drop_every = drop_every
+        self.balances = dict(balances) if balances else {self.base: 10000.0, quote: 10.0}
+        self.random = random.Random(seed)
+        # price -> (count, amount), amounts of asks are negative
+        self.bids = {}
+        self.asks = {}
+        self.candles = []
+        self.order_id = 1
+        self.chan_id = 1
+        self.clients = set()
+        self.sent_count = 0
+        self.connect_count = 0
+        self._tasks = []
+
+        for level in range(1, BOOK_LEN + 1):
+            self.bids[self._price(-level)] = (self._count(), self._amount())
+            self.asks[self._price(level)] = (self._count(), -self._amount())
+        now = int(time.time()) // 60 * 60 * 1000
+        for minute in range(10):
+            self.candles.insert(0, self._candle(now - minute * 60000))
+
+        self.withdraw_id = 1
+
+        self.server = MockServer(host, port, ssl)
+        self.server.websocket('/ws/2', self.serve)
+        self.server.route('GET', '/v1/symbols', lambda request: (200, [self.pair.lower()]))
+        self.server.route('POST', '/v1/balances', self.get_balances)
+        self.server.route('POST', '/v1/orders', lambda request: (200, []))
+        self.server.route('POST', '/v1/mytrades', lambda request: (200, []))
+        self.server.route('POST', '/v1/withdraw', self.withdraw)
+
+    def _price(self, ticks):
+        return round(self.mid_price + ticks * self.tick, 7)
+
+    def _count(self):
+        return self.random.randint(1, 5)
+
+    def _amount(self):
+        return round(self.random.uniform(1, 900), 4)
+
+    def _candle(self, mts):
+        open_price = self.mid_price + self.random.randint(-5, 5) * self.tick
+        close_price = self.mid_price + self.random.randint(-5, 5) * self.tick
+        return [mts, open_price, close_price, max(open_price, close_price) + self.tick,
+                min(open_price, close_price) - self.tick, round(self.random.uniform(100, 10000), 4)]
+
+    def _book_snapshot(self):
+        bids = sorted(self.bids.items(), reverse=True)[:BOOK_LEN]
+        asks = sorted(self.asks.items())[:BOOK_LEN]
+        return [[price, count, amount] for price, (count, amount) in bids + asks]
+
+    def _wallets(self):
+        return [['exchange', currency, balance, 0, balance] for currency, balance in sorted(self.balances.items())]
+
+    def _order(self, order_id, data, amount, status, price_avg=0):
+        now = int(time.time() * 1000)
+        order = [None] * 26
+        order[0] = order_id
+        order[2] = data.get('cid')
+        order[3] = data.get('symbol')
+        order[4] = order[5] = now
+        order[6] = amount
+        order[7] = float(data.get('amount', 0))
+        order[8] = data.get('type')
+        order[12] = 0
+        order[13] = status
+        order[16] = float(data.get('price', 0))
+        order[17] = price_avg
+        order[23] = 0
+        order[24] = 0
+        return order
+
+    # connection
+
+    async def serve(self, socket):
+        client = _Client(socket)
+        self.clients.add(client)
+        self.connect_count += 1
+        socket.send_json({'event': 'info', 'version': 2, 'serverId': 'mockex', 'platform': {'status': 1}})
+        try:
+            async for text in socket.messages():
+                try:
+                    message = json.loads(text)
+                except ValueError:
+                    continue
+                self.handle(client, message)
+        finally:
+            self.clients.discard(client)
+
+    def reply(self, client, data):
+        if self.latency:
+            asyncio.get_event_loop().call_later(self.latency, client.socket.send_json, data)
+        else:
+            client.socket.send_json(data)
+
+    def handle(self, client, message):
+        if isinstance(message, list):
+            _, command, _, data = message
+            if command == 'on' and client.authed:
+                self.new_order(client, data)
+            return
+        event = message.get('event')
+        if event == 'ping':
+            self.reply(client, {'event': 'pong', 'ts': int(time.time() * 1000), 'cid': message.get('cid')})
+        elif event == 'conf':
+            self.reply(client, {'event': 'conf', 'status': 'OK', 'flags': message.get('flags')})
+        elif event == 'auth':
+            client.authed = True
+            self.reply(client, {'event': 'auth', 'status': 'OK', 'chanId': 0, 'userId': 1, 'caps': {}})
+            self.reply(client, [0, 'ps', []])
+            self.reply(client, [0, 'ws', self._wallets()])
+            self.reply(client, [0, 'os', []])
+        elif event == 'subscribe':
+            self.subscribe(client, message)
+        elif event == 'unsubscribe':
+            chan_id = message.get('chanId')
+            if client.channels.pop(chan_id, None) is None:
+                self.reply(client, {'event': 'error', 'msg': 'unsubscribe: invalid', 'code': 10400})
+            else:
+                self.reply(client, {'event': 'unsubscribed', 'status': 'OK', 'chanId': chan_id})
+        else:
+            self.reply(client, {'event': 'error', 'msg': 'unknown event', 'code': 10000})
+
+    def subscribe(self, client, message):
+        channel = message.get('channel')
+        chan_id = self.chan_id
+        if channel == 'book' and message.get('symbol') in (self.pair, self.symbol):
+            self.chan_id += 1
+            client.channels[chan_id] = 'book'
+            self.reply(client, {'event': 'subscribed', 'channel': 'book', 'chanId': chan_id, 'symbol': self.symbol,
+                                'prec': 'P0', 'freq': 'F0', 'len': str(BOOK_LEN), 'pair': self.pair})
+            self.reply(client, [chan_id, self._book_snapshot()])
+        elif channel == 'candles' and message.get('key') == 'trade:1m:' + self.symbol:
+            self.chan_id += 1
+            client.channels[chan_id] = 'candles'
+            self.reply(client, {'event': 'subscribed', 'channel': 'candles', 'chanId': chan_id, 'key': message['key']})
+            self.reply(client, [chan_id, self.candles])
+        else:
+            self.reply(client, {'event': 'error', 'msg': 'subscribe: unknown channel', 'code': 10302})
+
+    def publish(self, channel, data):
+        for client in list(self.clients):
+            for chan_id, name in client.channels.items():
+                if name == channel:
+                    client.socket.send_json([chan_id, data])
+        self.sent_count += 1
+
+    # orders
+
+    def new_order(self, client, data):
+        order_id = self.order_id
+        self.order_id += 1
+        amount = float(data.get('amount', 0))
+        price = float(data.get('price', 0))
+        if data.get('type') != 'EXCHANGE FOK' or data.get('symbol') != self.symbol or not amount:
+            order = self._order(order_id, data, amount, 'ERROR')
+            self.reply(client, [0, 'n', [int(time.time() * 1000), 'on-req', None, None, order, None, 'ERROR',
+                                         'Invalid order: only EXCHANGE FOK on %s' % self.symbol]])
+            return
+        self.reply(client, [0, 'n', [int(time.time() * 1000), 'on-req', None, None, self._order(order_id, data, amount, 'ACTIVE'),
+                                     None, 'SUCCESS', 'Submitting exchange fok order for %s %s.' % (amount, self.base)]])
+        self.reply(client, [0, 'on', self._order(order_id, data, amount, 'ACTIVE')])
+
+        fills = None
+        if self.random.random() < self.fill_probability:
+            fills = self._match(amount, price)
+        if not fills:
+            self.reply(client, [0, 'oc', self._order(order_id, data, amount, 'CANCELED')])
+            return
+        cost = sum(fill_price * fill_amount for fill_price, fill_amount in fills)
+        price_avg = cost / abs(amount)
+        self.balances[self.base] = self.balances.get(self.base, 0) + amount
+        self.balances[self.quote] = self.balances.get(self.quote, 0) - cost * (1 if amount > 0 else -1)
+        self.reply(client, [0, 'oc', self._order(order_id, data, 0, 'EXECUTED @ %.7f(%s)' % (price_avg, amount), price_avg)])
+        for wallet in self._wallets():
+            self.reply(client, [0, 'wu', wallet])
+
+    def _match(self, amount, price):
+        """Takes ``|amount|`` from the levels priced at or better than ``price``, all or nothing."""
+        is_buy = amount > 0
+        book = self.asks if is_buy else self.bids
+        prices = sorted((level for level in book if (level <= price if is_buy else level >= price)), reverse=not is_buy)
+        fills = []
+        left = abs(amount)
+        for level in prices:
+            if left <= 0:
+                break
+            taken = min(left, abs(book[level][1]))
+            fills.append((level, taken))
+            left -= taken
+        if left > 1e-12:
+            return []
+        for level, taken in fills:
+            count, level_amount = book[level]
+            left_amount = round(abs(level_amount) - taken, 8)
+            if left_amount <= 0:
+                del book[level]
+                self.publish('book', [level, 0, 1 if level_amount > 0 else -1])
+            else:
+                book[level] = (count, left_amount if level_amount > 0 else -left_amount)
+                self.publish('book', [level, count, book[level][1]])
+        return fills
+
+    # rest v1
+
+    def _payload(self, request):
+        return json.loads(base64.standard_b64decode(request.headers['x-bfx-payload']))
+
+    def get_balances(self, request):
+        self._payload(request)
+        return 200, [{'type': 'exchange', 'currency': currency.lower(), 'amount': str(balance), 'available': str(balance)}
+                     for currency, balance in sorted(self.balances.items())]
+
+    def withdraw(self, request):
+        payload = self._payload(request)
+        withdraw_id = self.withdraw_id
+        self.withdraw_id += 1
+        return 200, [{'status': 'success', 'message': 'Your withdrawal request has been successfully submitted.',
+                      'withdrawal_id': withdraw_id, 'amount': payload.get('amount')}]
+
+    # feeds
+
+    def book_event(self):
+        side = self.random.choice((1, -1))
+        book = self.asks if side > 0 else self.bids
+        price = self._price(side * self.random.randint(1, BOOK_LEN))
+        if price in book and self.random.random() < 0.3:
+            del book[price]
+            self.publish('book', [price, 0, -side])
+        else:
+            count, amount = self._count(), -side * self._amount()
+            book[price] = (count, amount)
+            self.publish('book', [price, count, amount])
+
+    async def feed(self, interval=0.005):
+        """Sends ``rate`` book updates a second, catching up after slow ticks."""
+        begin = time.monotonic()
+        sent = 0
+        while True:
+            await asyncio.sleep(interval)
+            due = int((time.monotonic() - begin) * self.rate)
+            sent = max(sent, due - self.rate)
+            while sent < due:
+                self.book_event()
+                sent += 1
+
+    async def candle_feed(self):
+        while True:
+            await asyncio.sleep(1)
+            mts = int(time.time()) // 60 * 60 * 1000
+            if self.candles[0][0] != mts:
+                self.candles.insert(0, self._candle(mts))
+                del self.candles[240:]
+            self.publish('candles', self.candles[0])
+
+    async def heartbeats(self):
+        while True:
+            await asyncio.sleep(self.heartbeat)
+            for client in list(self.clients):
+                for chan_id in list(client.channels) + ([0] if client.authed else []):
+                    client.socket.send_json([chan_id, 'hb'])
+
+    async def drops(self):
+        while True:
+            await asyncio.sleep(self.drop_every)
+            log.info('mock bitfinex: restarting, dropping %d clients', len(self.clients))
+            for client in list(self.clients):
+                client.socket.send_json({'event': 'info', 'code': 20051, 'msg': 'Stopping. Please try to reconnect'})
+                client.socket.close()
+
+    async def start(self):
+        await self.server.start()
+        self._tasks.append(asyncio.ensure_future(self.feed()))
+        self._tasks.append(asyncio.ensure_future(self.candle_feed()))
+        self._tasks.append(asyncio.ensure_future(self.heartbeats()))
+        if self.drop_every:
+            self._tasks.append(asyncio.ensure_future(self.drops()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await self.server.stop()
+
+    @property
+    def stream_url(self):
+        return '%s://%s:%d/ws/2' % ('wss' if self.server.ssl else 'ws', self.server.host, self.server.port)
+
+    @property
+    def rest_url(self):
+        return '%s://%s:%d/v1' % ('https' if self.server.ssl else 'http', self.server.host, self.server.port)
+
+class _Client:
+
+    def __init__(self, socket):
+        self.socket = socket
+        self.authed = False
+        # chanId -> channel name
+        self.channels = {}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m mockex.bitfinex', description='Local Bitfinex v2 websocket stand-in.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9001)
+    parser.add_argument('--pair', default='EOSBTC')
+    parser.add_argument('--quote', default='BTC')
+    parser.add_argument('--rate', type=int, default=1000, help='book updates per second')
+    parser.add_argument('--latency', type=float, default=0, help='seconds every answer to a client command is delayed')
+    parser.add_argument('--fill-probability', type=float, default=1.0, help='share of fillable FOK orders that fill')
+    parser.add_argument('--heartbeat', type=float, default=15, help='seconds between channel heartbeats')
+    parser.add_argument('--drop-every', type=float, default=None, help='restart (info 20051 and disconnect) every N seconds')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--certfile', default=None, help='serve https and wss with this certificate')
+    parser.add_argument('--keyfile', default=None)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    context = None
+    if args.certfile:
+        context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        context.load_cert_chain(args.certfile, args.keyfile)
+
+    loop = asyncio.get_event_loop()
+    mock = MockBitfinex(args.pair, args.quote, rate=args.rate, latency=args.latency,
+                        fill_probability=args.fill_probability, heartbeat=args.heartbeat,
+                        drop_every=args.drop_every, host=args.host, port=args.port, seed=args.seed, ssl=context)
+    loop.run_until_complete(mock.start())
+    log.info('stream_url: %s', mock.stream_url)
+    log.info('rest_url: %s', mock.rest_url)
+    try:
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+import asyncio
+import base64
+import hashlib
+import json
+import struct
+from urllib.parse import urlsplit, parse_qsl
+
+import logging
+log = logging.getLogger()
+
+WEBSOCKET_GUID = b'258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+OPCODE_TEXT = 0x1
+OPCODE_CLOSE = 0x8
+OPCODE_PING = 0x9
+OPCODE_PONG = 0xA
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed'}
+
+def encode_frame(payload, opcode=OPCODE_TEXT):
+    """A single unmasked server frame."""
+    length = len(payload)
+    if length < 126:
+        header = struct.pack('!BB', 0x80 | opcode, length)
+    elif length < 65536:
+        header = struct.pack('!BBH', 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack('!BBQ', 0x80 | opcode, 127, length)
+    return header + payload
+
+async def read_frame(reader):
+    """Reads one client frame, returns (opcode, payload)."""
+    first, second = await reader.readexactly(2)
+    opcode = first & 0x0F
+    length = second & 0x7F
+    if length == 126:
+        length, = struct.unpack('!H', await reader.readexactly(2))
+    elif length == 127:
+        length, = struct.unpack('!Q', await reader.readexactly(8))
+    mask = await reader.readexactly(4) if second & 0x80 else None
+    payload = await reader.readexactly(length)
+    if mask is not None:
+        # xor a whole word at a time
+        key = int.from_bytes((mask * (length // 4 + 1))[:length], 'little')
+        payload = (int.from_bytes(payload, 'little') ^ key).to_bytes(length, 'little')
+    return opcode, payload
+
+class WebSocket:
+    """Server side of an upgraded connection."""
+
+    # a client this far behind is cut off, like the real exchanges do
+    MAX_BUFFER = 16 * 1024 * 1024
+
+    def __init__(self, path, reader, writer):
+        self.path = path
+        self.reader = reader
+        self.writer = writer
+        self.closed = False
+        self.sent_count = 0
+
+    def send(self, text):
+        """Queues a text frame, never waits; a client that fell too far behind is closed."""
+        if self.closed:
+            return
+        self.writer.write(encode_frame(text.encode('utf8')))
+        self.sent_count += 1
+        if self.writer.transport.get_write_buffer_size() > self.MAX_BUFFER:
+            log.info('websocket %s: client too slow, closing', self.path)
+            self.close()
+
+    def send_json(self, data):
+        self.send(json.dumps(data))
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.writer.close()
+
+    async def messages(self):
+        """Yields the text payloads sent by the client, answers pings and closes."""
+        while not self.closed:
+            try:
+                opcode, payload = await read_frame(self.reader)
+            except (asyncio.IncompleteReadError, ConnectionError):
+                break
+            if opcode == OPCODE_TEXT:
+                yield payload.decode('utf8')
+            elif opcode == OPCODE_PING:
+                self.writer.write(encode_frame(payload, OPCODE_PONG))
+            elif opcode == OPCODE_CLOSE:
+                self.writer.write(encode_frame(payload[:2], OPCODE_CLOSE))
+                break
+        self.close()
+
+class Request:
+
+    def __init__(self, method, path, query, headers, body):
+        self.method = method
+        self.path = path
+        self.headers = headers
+        self.body = body
+        # query string and form body, like the exchanges accept them
+        self.params = dict(parse_qsl(query))
+        if body and headers.get('content-type', '').startswith('application/x-www-form-urlencoded'):
+            self.params.update(parse_qsl(body.decode('utf8')))
+
+    def json(self):
+        return json.loads(self.body.decode('utf8'))
+
+class MockServer:
+    """Minimal HTTP/1.1 and websocket server on asyncio streams.
+
+    REST handlers are registered per (method, path) and return
+    ``(status, data)``, data sent as JSON. Websocket handlers are
+    coroutines registered per path prefix, called with the WebSocket once
+    the upgrade is done. Everything runs on the one event loop. With an
+    ``ssl`` context it serves HTTPS and wss instead, ``latency`` seconds
+    delay every REST answer.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, ssl=None, latency=0):
+        self.host = host
+        self.port = port
+        self.ssl = ssl
+        self.latency = latency
+        self.routes = {}
+        self.websocket_routes = []
+        self.server = None
+
+    def route(self, method, path, handler):
+        self.routes[(method, path)] = handler
+
+    def websocket(self, prefix, handler):
+        self.websocket_routes.append((prefix, handler))
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._serve, self.host, self.port, ssl=self.ssl)
+        self.port = self.server.sockets[0].getsockname()[1]
+        log.info('mock server listening on %s:%s', self.host, self.port)
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _serve(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode('latin1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = (await reader.readline()).decode('latin1').strip()
+                    if not line:
+                        break
+                    name, _, value = line.partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get('content-length', 0))
+                body = await reader.readexactly(length) if length else b''
+                url = urlsplit(target)
+                if headers.get('upgrade', '').lower() == 'websocket':
+                    await self._upgrade(url.path, headers, reader, writer)
+                    return
+                await self._respond(writer, Request(method, url.path, url.query, headers, body))
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, request):
+        handler = self.routes.get((request.method, request.path))
+        if handler is None:
+            allowed = any(path == request.path for _, path in self.routes)
+            status, data = (405, {'msg': 'method not allowed'}) if allowed else (404, {'msg': 'not found'})
+        else:
+            try:
+                status, data = handler(request)
+            except Exception as e:
+                log.exception(e)
+                status, data = 400, {'code': -1000, 'msg': str(e)}
+        body = json.dumps(data).encode('utf8')
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        writer.write(('HTTP/1.1 %d %s\r\nContent-Type: application/json\r\nContent-Length: %d\r\n\r\n' % (
+            status, REASONS.get(status, 'Error'), len(body))).encode('latin1') + body)
+        await writer.drain()
+
+    async def _upgrade(self, path, headers, reader, writer):
+        for prefix, handler in self.websocket_routes:
+            if path.startswith(prefix):
+                break
+        else:
+            writer.write(b'HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\n\r\n')
+            return
+        accept = base64.b64encode(hashlib.sha1(headers['sec-websocket-key'].encode('latin1') + WEBSOCKET_GUID).digest())
+        writer.write(b'HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n'
+                     b'Sec-WebSocket-Accept: ' + accept + b'\r\n\r\n')
+        socket = WebSocket(path, reader, writer)
+        try:
+            await handler(socket)
+        finally:
+            socket.close()